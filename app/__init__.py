@@ -6,7 +6,8 @@ from flask import Flask
 from flask_socketio import SocketIO
 
 from app.services.config_manager import ConfigManager
-from app.services.builder import MicroserviceBuilder
+from app.services.builder import BuildConfig, MicroserviceBuilder
+from app.services.build_queue import BuildQueue
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -18,6 +19,8 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 # Initialize services
 config_manager = ConfigManager()
 builder = MicroserviceBuilder()
+build_queue = BuildQueue(builder, history_file=str(builder.build_cache.cache_dir / "jobs.json"),
+                         config_type=BuildConfig)
 
 
 def emit_log(message):
@@ -42,6 +45,6 @@ def create_app():
     from app.routes import register_routes
 
     # Register all routes
-    register_routes(app, socketio, config_manager, builder)
+    register_routes(app, socketio, config_manager, builder, build_queue)
 
     return app, socketio
\ No newline at end of file
@@ -4,7 +4,6 @@ Added performance toggles and offline mode
 """
 
 from flask import request, jsonify, render_template_string
-import threading
 from app.templates import HTML_TEMPLATE
 from app.services.gitlab_client import GitLabClient
 from app.services.builder import BuildConfig
@@ -16,9 +15,21 @@ cached_groups = []
 cached_projects = {}
 
 
-def register_routes(app, socketio, config_manager, builder):
+def register_routes(app, socketio, config_manager, builder, build_queue):
     global gitlab_client, cached_groups, cached_projects
 
+    def on_job_finished(job):
+        socketio.emit('build_complete', dict(job.summary(), analysis=builder.history.get_report(job.job_id)))
+
+    build_queue.add_listener(on_job_finished)
+
+    saved = config_manager.load_gitlab_config()
+    if saved.get('git_concurrency'):
+        builder.set_git_concurrency(int(saved['git_concurrency']))
+    if 'workspace_quota_gb' in saved or 'workspace_min_free_gb' in saved:
+        builder.workspace.configure(quota_gb=saved.get('workspace_quota_gb'),
+                                    min_free_gb=saved.get('workspace_min_free_gb'))
+
     @app.route('/')
     def index():
         return render_template_string(HTML_TEMPLATE)
@@ -28,7 +39,8 @@ def register_routes(app, socketio, config_manager, builder):
         config = config_manager.load_gitlab_config()
         return jsonify({
             'gitlab_url': config.get('gitlab_url', 'https://gitlab.com'),
-            'maven_path': config.get('maven_path', '')
+            'maven_path': config.get('maven_path', ''),
+            'git_concurrency': config.get('git_concurrency', builder.git_concurrency)
         })
 
     @app.route('/api/system-info')
@@ -70,6 +82,27 @@ def register_routes(app, socketio, config_manager, builder):
             'message': 'Maven path saved'
         })
 
+    @app.route('/api/set-git-concurrency', methods=['POST'])
+    def set_git_concurrency():
+        data = request.json
+        try:
+            limit = int(data.get('git_concurrency', 0))
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            return jsonify({'success': False, 'error': 'git_concurrency must be a positive number'}), 400
+
+        config = config_manager.load_gitlab_config()
+        config['git_concurrency'] = limit
+        config_manager.save_gitlab_config(config)
+        builder.set_git_concurrency(limit)
+
+        return jsonify({
+            'success': True,
+            'git_concurrency': limit,
+            'message': 'Git network concurrency saved'
+        })
+
     @app.route('/api/connect', methods=['POST'])
     def connect_gitlab():
         global gitlab_client, cached_groups
@@ -204,6 +237,20 @@ def register_routes(app, socketio, config_manager, builder):
         skip_javadoc = data.get('skip_javadoc', True)
         skip_source = data.get('skip_source', True)
         aggressive_parallel = data.get('aggressive_parallel', True)
+        incremental = data.get('incremental', False)
+        maven_backend = data.get('maven_backend', 'mvn')
+        artifact_cache = data.get('artifact_cache', False)
+        fast_sync = data.get('fast_sync', False)
+        full_history = data.get('full_history', False)
+        try:
+            fetch_depth = int(data.get('fetch_depth', 1))
+        except (TypeError, ValueError):
+            fetch_depth = -1
+        if fetch_depth < 0:
+            # 0 fetches the whole branch (BuildConfig.fetch_depth)
+            return jsonify({'error': 'fetch_depth must be a number of commits, or 0 for the whole branch'}), 400
+        worktrees = data.get('worktrees', False)
+        preflight = data.get('preflight', False)
 
         if not group_id or not build_configs:
             return jsonify({'error': 'Invalid request: Missing group_id or build_configs'}), 400
@@ -219,12 +266,19 @@ def register_routes(app, socketio, config_manager, builder):
         print(f"Group ID: {group_id}")
         print(f"Services: {len(build_configs)}")
         print(f"Force rebuild: {force}")
-        print(f"Max workers: {max_workers}")
+        print(f"Max workers: {max_workers} (upper bound, admission-controlled)")
         print(f"Offline mode: {offline_mode}")
         print(f"Skip tests: {skip_tests}")
         print(f"Skip javadoc: {skip_javadoc}")
         print(f"Skip source: {skip_source}")
         print(f"Aggressive parallel: {aggressive_parallel}")
+        print(f"Incremental: {incremental}")
+        print(f"Maven backend: {maven_backend}")
+        print(f"Artifact cache: {artifact_cache}")
+        print(f"Fast sync: {fast_sync}")
+        print(f"History: {'full' if full_history else f'depth {fetch_depth}' if fetch_depth else 'whole branch'}")
+        print(f"Worktrees: {worktrees}")
+        print(f"Preflight: {preflight}")
 
         configs = []
         for idx, conf in enumerate(build_configs, 1):
@@ -241,7 +295,8 @@ def register_routes(app, socketio, config_manager, builder):
                 if not selected_branch:
                     selected_branch = default_branch
 
-                force_fetch = (selected_branch != default_branch)
+                # Any branch is fetched on its own at fetch_depth; full history only on request
+                force_fetch = bool(conf.get('full_history', full_history))
 
                 # Get Maven threads from settings or use system recommendation
                 maven_threads = settings.get('maven_threads', SystemInfo().recommended_maven_threads)
@@ -256,6 +311,14 @@ def register_routes(app, socketio, config_manager, builder):
                     jvm_options=settings.get('jvm_options', ''),
                     maven_threads=maven_threads,
                     force_full_fetch=force_fetch,
+                    incremental=incremental,
+                    maven_backend=maven_backend,
+                    artifact_cache=artifact_cache,
+                    fast_sync=fast_sync,
+                    fetch_depth=fetch_depth,
+                    worktrees=worktrees,
+                    sparse_modules=conf.get('sparse_modules') or [],
+                    preflight=preflight,
                     # NEW: Performance flags
                     skip_tests=skip_tests,
                     skip_javadoc=skip_javadoc,
@@ -277,41 +340,45 @@ def register_routes(app, socketio, config_manager, builder):
         print(f"Expected time reduction: {max_workers}x faster (parallel)")
         print(f"{'='*60}\n")
 
-        builder.max_workers = max_workers
-
-        def build_thread():
-            try:
-                results = builder.build_services(configs, force=force)
-                success = sum(1 for r in results if r['status'] == 'success')
-                skipped = sum(1 for r in results if r['status'] == 'skipped')
-                failed = len(results) - success - skipped
-
-                socketio.emit('build_complete', {
-                    'success': success,
-                    'failed': failed,
-                    'skipped': skipped,
-                    'total': len(results)
-                })
-            except Exception as e:
-                print(f"❌ Build thread error: {e}")
-                import traceback
-                traceback.print_exc()
-                socketio.emit('build_complete', {
-                    'success': 0,
-                    'failed': len(configs),
-                    'skipped': 0,
-                    'total': len(configs)
-                })
-
-        threading.Thread(target=build_thread, daemon=True).start()
+        job = build_queue.submit(group_id, configs, force=force, max_workers=max_workers)
 
         return jsonify({
             'success': True,
-            'message': f'Started ULTRA-FAST build for {len(configs)} services',
+            'job_id': job.job_id,
+            'message': f'Queued ULTRA-FAST build for {len(configs)} services (job {job.job_id})',
             'services': [c.service_name for c in configs],
             'estimated_speedup': f"{max_workers}x"
         })
 
+    @app.route('/api/jobs')
+    def list_jobs():
+        jobs = build_queue.list_jobs()
+        return jsonify({'jobs': jobs, 'count': len(jobs)})
+
+    @app.route('/api/jobs/<job_id>')
+    def get_job(job_id):
+        job = build_queue.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        status = job.summary()
+        status['pipeline'] = builder.pipeline_status().get('jobs', {}).get(job_id)
+        return jsonify(status)
+
+    @app.route('/api/jobs/<job_id>/result')
+    def get_job_result(job_id):
+        job = build_queue.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'job_id': job_id, 'status': job.status, 'results': job.results})
+
+    @app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_job(job_id):
+        if not build_queue.get(job_id):
+            return jsonify({'error': 'Job not found'}), 404
+        if not build_queue.cancel(job_id):
+            return jsonify({'error': 'Job already finished'}), 409
+        return jsonify({'success': True, 'message': f'Cancel requested for job {job_id}'})
+
     @app.route('/api/settings-files')
     def list_settings_files():
         return jsonify({'files': config_manager.list_settings_files()})
@@ -363,23 +430,119 @@ def register_routes(app, socketio, config_manager, builder):
             'path': xml_path
         })
 
+    @app.route('/api/build/status')
+    def get_build_status():
+        return jsonify(builder.pipeline_status())
+
+    @app.route('/api/admission')
+    def get_admission_status():
+        return jsonify(builder.admission.snapshot())
+
+    @app.route('/api/telemetry')
+    def get_telemetry():
+        return jsonify({'services': builder.telemetry_summary()})
+
+    @app.route('/api/telemetry/<service_name>')
+    def get_service_telemetry(service_name):
+        try:
+            points = int(request.args.get('points', 600))
+        except ValueError:
+            points = 0
+        if points < 1:
+            return jsonify({'error': 'points must be a positive number'}), 400
+        points = min(points, 5000)
+        data = builder.telemetry_series(service_name, points)
+        if data is None:
+            return jsonify({'error': 'No telemetry for this service'}), 404
+        return jsonify(data)
+
+    @app.route('/api/traces')
+    def list_traces():
+        return jsonify({'traces': builder.history.traces()})
+
+    @app.route('/api/jobs/<job_id>/trace')
+    def get_job_trace(job_id):
+        trace = builder.get_trace(job_id)
+        if trace is None:
+            return jsonify({'error': 'No trace for this job'}), 404
+        response = jsonify(trace)
+        response.headers['Content-Disposition'] = f'attachment; filename=trace-{job_id}.json'
+        return response
+
+    @app.route('/api/jobs/<job_id>/analysis')
+    def get_job_analysis(job_id):
+        report = builder.history.get_report(job_id)
+        if report is None:
+            return jsonify({'error': 'No analysis for this job'}), 404
+        return jsonify(report)
+
+    @app.route('/api/history')
+    def get_history():
+        service = request.args.get('service')
+        try:
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({'error': 'limit must be a positive number'}), 400
+        limit = min(limit, 1000)
+        return jsonify({'builds': builder.history.builds(service, limit)})
+
+    @app.route('/api/history/services')
+    def get_history_services():
+        return jsonify({'services': builder.history.service_stats()})
+
     @app.route('/api/cache/clear', methods=['POST'])
     def clear_cache():
         builder.build_cache.clear()
+        builder.artifact_store.clear()
         return jsonify({'message': 'Cache cleared'})
 
     @app.route('/api/cache/info')
     def get_cache_info():
         data = [
             {
-                'service': k,
-                'branch': v.get('branch', ''),
-                'commit': v.get('commit', '')[:8],
-                'time': v.get('timestamp', '')
+                'service': e['service'],
+                'key': e['key'],
+                'branch': e.get('branch', ''),
+                'commit': (e.get('commit') or '')[:8],
+                'profiles': e.get('profiles', []),
+                'current': e['current'],
+                'hits': e.get('hits', 0),
+                'misses': e.get('misses', 0),
+                'time': e.get('timestamp', '')
             }
-            for k, v in builder.build_cache.cache.items()
+            for e in builder.build_cache.entries()
         ]
-        return jsonify({'cache': data, 'count': len(data)})
+        return jsonify({
+            'cache': data,
+            'count': len(data),
+            'stats': builder.build_cache.stats(),
+            'artifacts': builder.artifact_store.stats()
+        })
+
+    @app.route('/api/workspace')
+    def get_workspace_usage():
+        return jsonify(builder.workspace.usage())
+
+    @app.route('/api/workspace/settings', methods=['POST'])
+    def save_workspace_settings():
+        data = request.json or {}
+        try:
+            quota_gb = float(data['quota_gb']) if 'quota_gb' in data else None
+            min_free_gb = float(data['min_free_gb']) if 'min_free_gb' in data else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'quota_gb and min_free_gb must be numbers'}), 400
+
+        config = config_manager.load_gitlab_config()
+        if quota_gb is not None:
+            config['workspace_quota_gb'] = quota_gb
+        if min_free_gb is not None:
+            config['workspace_min_free_gb'] = min_free_gb
+        config_manager.save_gitlab_config(config)
+        builder.workspace.configure(quota_gb=quota_gb, min_free_gb=min_free_gb)
+
+        return jsonify({'success': True, 'message': 'Workspace settings saved'})
 
     @socketio.on('connect')
     def on_connect():
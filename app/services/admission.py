@@ -0,0 +1,210 @@
+"""
+Memory- and CPU-aware admission control for parallel builds
+A build only starts when its projected heap/RSS and CPU share fit the live budget
+"""
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+import psutil
+
+MB = 1024 * 1024
+
+
+@dataclass
+class ResourceEstimate:
+    """Projected footprint of one Maven build"""
+    heap_mb: int
+    rss_mb: int
+    cpu_cores: float
+    source: str = "default"
+
+
+def parse_heap_mb(jvm_options: str) -> Optional[int]:
+    """Extract -Xmx from a JVM option string, in MB"""
+    match = re.search(r'-Xmx(\d+)([kKmMgG]?)', jvm_options or '')
+    if not match:
+        return None
+    value, unit = int(match.group(1)), match.group(2).lower()
+    if unit == 'g':
+        return value * 1024
+    if unit == 'k':
+        return max(1, value // 1024)
+    if unit == 'm':
+        return value
+    return max(1, value // MB)
+
+
+class AdmissionController:
+    """
+    Keeps a live memory and CPU budget and admits builds that fit it
+
+    Memory is checked twice: the sum of projected RSS of running builds must
+    stay under the usable memory measured when the batch started, and the
+    build must also fit what psutil reports as available right now minus the
+    part of recently started builds that has not materialized yet.
+    """
+
+    def __init__(self, default_heap_mb: int = 2048, reserve_mb: int = 1024,
+                 cpu_overcommit: float = 1.5, cpu_ceiling: float = 90.0,
+                 ramp_seconds: float = 60.0,
+                 profile_file: str = ".build_cache/resource_profile.json"):
+        self.default_heap_mb = default_heap_mb
+        self.reserve_mb = reserve_mb
+        self.cpu_overcommit = cpu_overcommit
+        self.cpu_ceiling = cpu_ceiling
+        self.ramp_seconds = ramp_seconds
+        self.poll_interval = 1.0
+        self.max_slots: Optional[int] = None
+        self.cpu_count = psutil.cpu_count(logical=True) or 1
+
+        self.profile_file = Path(profile_file)
+        self.profile: Dict[str, Dict] = self._load_profile()
+
+        self.lock = threading.Lock()
+        self.running: Dict[int, Dict] = {}
+        self.waiting_owners: Dict[str, float] = {}
+        self.last_grant: Dict[str, float] = {}
+        self.next_token = 1
+        self.capacity_mb = 0
+        self.last_cpu_percent = 0.0
+        self.reset()
+
+    def _load_profile(self) -> Dict:
+        if self.profile_file.exists():
+            try:
+                with open(self.profile_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def _save_profile(self):
+        self.profile_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.profile_file, 'w') as f:
+            json.dump(self.profile, f, indent=2)
+
+    def reset(self):
+        """Re-measure usable memory; call at the start of each batch"""
+        with self.lock:
+            committed = sum(r['estimate'].rss_mb for r in self.running.values())
+            available = psutil.virtual_memory().available // MB
+            self.capacity_mb = max(0, available + committed - self.reserve_mb)
+        psutil.cpu_percent(interval=None)
+
+    def estimate(self, service_name: str, jvm_options: str = '') -> ResourceEstimate:
+        """Projected footprint from the recorded profile, falling back to the heap setting"""
+        heap_mb = parse_heap_mb(jvm_options) or self.default_heap_mb
+        observed = self.profile.get(service_name)
+        if observed and observed.get('peak_rss_mb'):
+            return ResourceEstimate(
+                heap_mb=heap_mb,
+                rss_mb=int(observed['peak_rss_mb'] * 1.1),
+                cpu_cores=max(0.5, observed.get('avg_cpu_cores', 2.0)),
+                source="observed"
+            )
+        # Maven JVM plus forked compiler JVM, metaspace and native overhead
+        return ResourceEstimate(heap_mb=heap_mb, rss_mb=int(heap_mb * 1.5) + 512, cpu_cores=2.0)
+
+    def record_usage(self, service_name: str, peak_rss_mb: float, avg_cpu_cores: Optional[float] = None):
+        """Feed a measured peak back into the per-service profile"""
+        with self.lock:
+            entry = self.profile.setdefault(service_name, {})
+            previous = entry.get('peak_rss_mb')
+            # Blend with history but never drop far below the worst recent run
+            entry['peak_rss_mb'] = round(peak_rss_mb if previous is None
+                                         else max(peak_rss_mb, 0.7 * previous + 0.3 * peak_rss_mb), 1)
+            if avg_cpu_cores is not None:
+                entry['avg_cpu_cores'] = round(avg_cpu_cores, 2)
+            entry['samples'] = entry.get('samples', 0) + 1
+            self._save_profile()
+
+    def try_acquire(self, service_name: str, estimate: ResourceEstimate,
+                    owner: Optional[str] = None) -> Optional[int]:
+        """
+        Reserve resources for a build; returns a token, or None if it doesn't fit yet
+
+        When several owners (build jobs) are asking, the one served least
+        recently goes first, so concurrent jobs interleave instead of the
+        first job taking every slot.
+        """
+        with self.lock:
+            now = time.time()
+            if owner is not None:
+                self.waiting_owners[owner] = now
+                if self._other_owner_first(owner, now):
+                    return None
+            if self.max_slots is not None and len(self.running) >= self.max_slots:
+                return None
+            if self.running and not self._fits(estimate):
+                return None
+            token = self.next_token
+            self.next_token += 1
+            self.running[token] = {
+                'service': service_name,
+                'owner': owner,
+                'estimate': estimate,
+                'started': now
+            }
+            if owner is not None:
+                self.waiting_owners.pop(owner, None)
+                self.last_grant[owner] = now
+            return token
+
+    def _other_owner_first(self, owner: str, now: float) -> bool:
+        stale = now - 3 * self.poll_interval
+        for other, asked in list(self.waiting_owners.items()):
+            if asked < stale:
+                del self.waiting_owners[other]
+            elif other != owner and self.last_grant.get(other, 0.0) < self.last_grant.get(owner, 0.0):
+                return True
+        return False
+
+    def forget_owner(self, owner: str):
+        """Drop fairness bookkeeping for a finished job"""
+        with self.lock:
+            self.waiting_owners.pop(owner, None)
+            self.last_grant.pop(owner, None)
+
+    def release(self, token: Optional[int]):
+        with self.lock:
+            self.running.pop(token, None)
+
+    def _fits(self, estimate: ResourceEstimate) -> bool:
+        committed_mb = sum(r['estimate'].rss_mb for r in self.running.values())
+        if committed_mb + estimate.rss_mb > self.capacity_mb:
+            return False
+
+        now = time.time()
+        ramping_mb = sum(r['estimate'].rss_mb for r in self.running.values()
+                         if now - r['started'] < self.ramp_seconds)
+        available_mb = psutil.virtual_memory().available // MB
+        if estimate.rss_mb > available_mb - self.reserve_mb - ramping_mb:
+            return False
+
+        committed_cpu = sum(r['estimate'].cpu_cores for r in self.running.values())
+        if committed_cpu + estimate.cpu_cores > self.cpu_count * self.cpu_overcommit:
+            return False
+
+        self.last_cpu_percent = psutil.cpu_percent(interval=None)
+        return self.last_cpu_percent < self.cpu_ceiling
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            running = list(self.running.values())
+        return {
+            'running': [r['service'] for r in running],
+            'max_slots': self.max_slots,
+            'committed_mb': sum(r['estimate'].rss_mb for r in running),
+            'committed_cpu': round(sum(r['estimate'].cpu_cores for r in running), 1),
+            'capacity_mb': self.capacity_mb,
+            'available_mb': psutil.virtual_memory().available // MB,
+            'cpu_percent': self.last_cpu_percent,
+            'profile': {name: dict(entry) for name, entry in self.profile.items()},
+            'estimates': {r['service']: asdict(r['estimate']) for r in running}
+        }
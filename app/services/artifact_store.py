@@ -0,0 +1,219 @@
+"""
+Content-addressed artifact store
+Build outputs are archived under a hash of every build input, so a fresh
+workspace, a branch switch or another machine can restore them instead of
+running Maven again
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .dependency_graph import collect_reactor
+
+# Packaged outputs worth keeping from target/ (classes and reports are not restored)
+ARTIFACT_SUFFIXES = (".jar", ".war", ".ear", ".pom", ".zip", ".tar.gz")
+
+
+def hash_file(path: Path, digest=None):
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest
+
+
+class ArtifactStore:
+    """Size-bounded LRU store of build outputs keyed on a hash of the build inputs"""
+
+    def __init__(self, store_dir: str = ".build_cache/artifacts", max_size_gb: float = 20.0):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.store_dir / "index.json"
+        self.max_bytes = int(max_size_gb * 1024 ** 3)
+        self.lock = threading.Lock()
+        self.index: Dict[str, Dict] = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self) -> Dict:
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r') as f:
+                    index = json.load(f)
+                # Drop entries whose archive disappeared
+                return {k: v for k, v in index.items() if self._archive(k).exists()}
+            except (OSError, ValueError):
+                return {}
+        return {}
+
+    def _save_index(self):
+        tmp_file = self.index_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.index, f)
+        tmp_file.replace(self.index_file)
+
+    def _archive(self, key: str) -> Path:
+        return self.store_dir / key[:2] / f"{key}.tar"
+
+    @staticmethod
+    def input_key(parts: Dict[str, str]) -> str:
+        """Hash the named build inputs into a store key"""
+        digest = hashlib.sha256()
+        for name in sorted(parts):
+            digest.update(f"{name}={parts[name]}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def contains(self, key: str) -> bool:
+        with self.lock:
+            return key in self.index
+
+    def _artifact_files(self, repo_dir: Path, local_repo: Path) -> List[tuple]:
+        """(absolute path, archive name) for every packaged output and installed artifact"""
+        files = []
+        for pom in collect_reactor(repo_dir):
+            module_dir = repo_dir / pom.path if pom.path else repo_dir
+            target = module_dir / "target"
+            if target.is_dir():
+                for item in target.iterdir():
+                    if item.is_file() and item.name.endswith(ARTIFACT_SUFFIXES):
+                        files.append((item, f"target/{pom.path or '.'}/{item.name}"))
+
+            if not (pom.group_id and pom.artifact_id and pom.version) or "${" in pom.version:
+                continue
+            installed = local_repo.joinpath(*pom.group_id.split('.'), pom.artifact_id, pom.version)
+            if installed.is_dir():
+                for item in installed.iterdir():
+                    if item.is_file():
+                        rel = item.relative_to(local_repo).as_posix()
+                        files.append((item, f"m2/{rel}"))
+        return files
+
+    def save(self, key: str, repo_dir: Path, local_repo: Path, service: str = "") -> bool:
+        """Archive the outputs of a successful build under key"""
+        files = self._artifact_files(Path(repo_dir), Path(local_repo))
+        if not files:
+            return False
+
+        archive = self._archive(key)
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        tmp_archive = archive.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        # Jars are already compressed, so the archive itself is not
+        with tarfile.open(tmp_archive, 'w') as tar:
+            for path, name in files:
+                tar.add(str(path), arcname=name)
+        tmp_archive.replace(archive)
+
+        with self.lock:
+            now = time.time()
+            self.index[key] = {
+                'service': service,
+                'size': archive.stat().st_size,
+                'files': len(files),
+                'created': now,
+                'last_used': now
+            }
+            self._evict()
+            self._save_index()
+        return True
+
+    def restore(self, key: str, repo_dir: Path, local_repo: Path) -> bool:
+        """
+        Extract the archived outputs into target/ and the local repository
+
+        Files are extracted next to their destination and only moved into
+        place once the whole archive has been read, so a missing or corrupt
+        archive (evicted by a concurrent save, say) leaves the outputs as they
+        were; it counts as a miss and its entry is dropped.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+        archive = self._archive(key)
+        if entry is None or not archive.exists():
+            with self.lock:
+                self.misses += 1
+            return False
+
+        repo_dir, local_repo = Path(repo_dir).resolve(), Path(local_repo).resolve()
+        staged = []
+        try:
+            with tarfile.open(archive, 'r') as tar:
+                for member in tar.getmembers():
+                    if not member.isfile():
+                        continue
+                    kind, _, rel = member.name.partition('/')
+                    if kind == "target":
+                        module, _, name = rel.rpartition('/')
+                        dest = (repo_dir / module / "target" / name).resolve()
+                        root = repo_dir
+                    elif kind == "m2":
+                        dest = (local_repo / rel).resolve()
+                        root = local_repo
+                    else:
+                        continue
+                    if root not in dest.parents:
+                        continue  # refuse anything that would escape its root
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.restore")
+                    staged.append((tmp, dest))
+                    with tar.extractfile(member) as src, open(tmp, 'wb') as out:
+                        shutil.copyfileobj(src, out)
+            for tmp, dest in staged:
+                os.replace(tmp, dest)
+        except (OSError, tarfile.TarError):
+            for path in [tmp for tmp, _ in staged] + [archive]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            with self.lock:
+                self.misses += 1
+                if self.index.pop(key, None) is not None:
+                    self._save_index()
+            return False
+
+        with self.lock:
+            self.hits += 1
+            if key in self.index:
+                self.index[key]['last_used'] = time.time()
+                self._save_index()
+        return True
+
+    def _evict(self):
+        """Drop least recently used archives until the store fits its size budget"""
+        total = sum(e['size'] for e in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]['size']
+            del self.index[key]
+            try:
+                self._archive(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.index):
+                try:
+                    self._archive(key).unlink()
+                except OSError:
+                    pass
+            self.index = {}
+            self._save_index()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'entries': len(self.index),
+                'size_mb': round(sum(e['size'] for e in self.index.values()) / (1024 ** 2), 1),
+                'max_size_mb': round(self.max_bytes / (1024 ** 2), 1),
+                'hits': self.hits,
+                'misses': self.misses
+            }
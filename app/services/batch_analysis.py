@@ -0,0 +1,174 @@
+"""
+Post-batch analysis
+Reads a batch's trace and answers where the wall time went: the critical
+path, how busy the build slots were, whether idle slots were waiting on git,
+and how close the batch came to the best makespan its durations allow
+"""
+
+from typing import Dict, List, Tuple
+
+from .dependency_graph import DependencyGraph
+
+US = 1e6
+
+
+def _stage_spans(trace: Dict) -> Tuple[Dict[str, Dict[str, Tuple[float, float, int]]], Dict[int, str]]:
+    """{service: {stage: (start_s, end_s, lane)}} and {lane: thread name} from a Chrome trace"""
+    services: Dict[str, Dict[str, Tuple[float, float, int]]] = {}
+    lanes: Dict[int, str] = {}
+    for event in trace.get("traceEvents", []):
+        if event.get("ph") == "M" and event.get("name") == "thread_name":
+            lanes[event["tid"]] = event["args"]["name"]
+        elif event.get("ph") == "X" and event.get("cat") == "stage":
+            args = event.get("args", {})
+            start = event["ts"] / US
+            services.setdefault(args.get("service"), {})[args.get("stage")] = \
+                (start, start + event["dur"] / US, event["tid"])
+    return services, lanes
+
+
+def _span_total(trace: Dict, cat: str) -> float:
+    return sum(e["dur"] for e in trace.get("traceEvents", [])
+               if e.get("ph") == "X" and e.get("cat") == cat) / US
+
+
+def _critical_path(graph: DependencyGraph, weights: Dict[str, float]) -> Tuple[List[str], float]:
+    """Heaviest dependency chain through the services that ran"""
+    only = set(weights)
+    lengths = graph.critical_path_lengths(weights, only=only)
+    if not lengths:
+        return [], 0.0
+    node = max(lengths, key=lengths.get)
+    path = [node]
+    while True:
+        children = [c for c in graph.downstream.get(node, ()) if c in lengths]
+        if not children:
+            break
+        node = max(children, key=lengths.get)
+        path.append(node)
+    return path, max(lengths.values())
+
+
+def analyze_batch(trace: Dict, graph: DependencyGraph, build_slots: int) -> Dict:
+    """Critical path, slot utilization, idle attribution and the makespan lower bound"""
+    services, lanes = _stage_spans(trace)
+    services.pop(None, None)
+    spans = [span for stages in services.values() for span in stages.values()]
+    if not spans:
+        return {"services": 0}
+
+    start = min(s[0] for s in spans)
+    end = max(s[1] for s in spans)
+    makespan = max(end - start, 1e-6)
+
+    # Observed time of every service without its waits, and its build-stage time
+    durations = {name: sum(e - s for s, e, _ in stages.values()) for name, stages in services.items()}
+    build_times = {name: stages["build"][1] - stages["build"][0]
+                   for name, stages in services.items() if "build" in stages}
+    # Slots beyond the number of builds could never have been used
+    slots = max(1, min(build_slots, len(build_times) or 1))
+
+    path, path_length = _critical_path(graph, durations)
+    lead = min((sum(e - s for st, (s, e, _) in stages.items() if st in ("sync", "check"))
+                for stages in services.values()), default=0.0)
+    work_bound = lead + sum(build_times.values()) / slots
+    best = max(path_length, work_bound)
+
+    # Per-lane utilization of the build slots
+    lane_busy: Dict[int, float] = {}
+    for stages in services.values():
+        if "build" in stages:
+            s, e, lane = stages["build"]
+            lane_busy[lane] = lane_busy.get(lane, 0.0) + (e - s)
+    slot_utilization = [
+        {"lane": lanes.get(lane, str(lane)), "busy_s": round(busy, 1),
+         "utilization": round(busy / makespan, 3)}
+        for lane, busy in sorted(lane_busy.items())
+    ]
+    build_busy = sum(lane_busy.values())
+    utilization = min(1.0, build_busy / (slots * makespan))
+
+    # Sweep the timeline: build slots idle while a sync/check is running count as waiting on git
+    boundaries = []
+    for stages in services.values():
+        for stage, (s, e, _) in stages.items():
+            kind = "build" if stage == "build" else ("prep" if stage in ("sync", "check") else None)
+            if kind:
+                boundaries.append((s, kind, 1))
+                boundaries.append((e, kind, -1))
+    boundaries.sort(key=lambda b: (b[0], b[2]))
+    active = {"build": 0, "prep": 0}
+    peak_builds = 0
+    idle_git = idle_other = 0.0
+    last = start
+    for t, kind, delta in boundaries:
+        idle = max(0, slots - active["build"]) * (t - last)
+        if active["prep"]:
+            idle_git += idle
+        else:
+            idle_other += idle
+        active[kind] += delta
+        peak_builds = max(peak_builds, active["build"])
+        last = t
+    idle_other += slots * (end - last)
+
+    idle_total = idle_git + idle_other
+    peak_utilization = build_busy / (max(1, peak_builds) * makespan)
+    if utilization >= 0.85:
+        bottleneck = "workers"
+        advice = "Build slots were saturated; more workers (or fewer/faster builds) would shorten the batch."
+    elif peak_builds < slots and peak_utilization >= 0.85:
+        bottleneck = "admission"
+        advice = (f"Memory/CPU admission never let more than {peak_builds} of {slots} builds run at once; "
+                  f"more RAM or cores, or smaller heaps, would help most.")
+    elif idle_total and idle_git / idle_total >= 0.5:
+        bottleneck = "git"
+        advice = "Most idle slot time was spent waiting for git sync/check; faster git would help most."
+    elif path_length >= 0.9 * makespan:
+        bottleneck = "critical_path"
+        advice = (f"The dependency chain {' → '.join(path)} sets the makespan; "
+                  f"speed up the services on it.")
+    else:
+        bottleneck = "ordering"
+        advice = (f"The batch took {makespan / best:.1f}x its lower bound with slots idle; "
+                  f"better ordering or admission would help most.")
+
+    return {
+        "services": len(services),
+        "build_slots": slots,
+        "makespan_s": round(makespan, 1),
+        "best_makespan_s": round(best, 1),
+        "efficiency": round(best / makespan, 3),
+        "critical_path": path,
+        "critical_path_s": round(path_length, 1),
+        "work_bound_s": round(work_bound, 1),
+        "build_utilization": round(utilization, 3),
+        "peak_concurrent_builds": peak_builds,
+        "slots": slot_utilization,
+        "time_s": {
+            "git": round(sum(st["sync"][1] - st["sync"][0] for st in services.values() if "sync" in st), 1),
+            "check": round(sum(st["check"][1] - st["check"][0] for st in services.values() if "check" in st), 1),
+            "maven": round(_span_total(trace, "maven"), 1),
+            "record": round(sum(st["record"][1] - st["record"][0] for st in services.values() if "record" in st), 1),
+        },
+        "idle_slot_s": {
+            "waiting_on_git": round(idle_git, 1),
+            "other": round(idle_other, 1),
+        },
+        "bottleneck": bottleneck,
+        "advice": advice,
+    }
+
+
+def format_report(report: Dict) -> List[str]:
+    """Log lines for a report"""
+    if not report.get("services"):
+        return []
+    return [
+        f"Makespan {report['makespan_s']:.0f}s vs best {report['best_makespan_s']:.0f}s "
+        f"(efficiency {report['efficiency'] * 100:.0f}%)",
+        f"Critical path {report['critical_path_s']:.0f}s: {' → '.join(report['critical_path'])}",
+        f"Build slots {report['build_utilization'] * 100:.0f}% busy; idle {report['idle_slot_s']['waiting_on_git']:.0f}s "
+        f"waiting on git, {report['idle_slot_s']['other']:.0f}s other",
+        f"Bottleneck: {report['bottleneck']} - {report['advice']}",
+    ]
@@ -1,35 +1,71 @@
 """
 Build cache management - Fixed for Windows long paths
+Holds several entries per service (one per branch/commit/profiles/flags/settings
+combination) so switching between branches doesn't throw earlier builds away.
+Entries live in an append-only journal, so concurrent builds never rewrite
+the whole cache file
 """
 
 import json
 import hashlib
 import subprocess
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from .journal_store import JournalStore
+from .source_hasher import SourceHasher
 
 
 class BuildCache:
     """Manages build cache to skip unchanged builds"""
 
-    def __init__(self, cache_dir: str = ".build_cache"):
+    def __init__(self, cache_dir: str = ".build_cache", max_entries_per_service: int = 8,
+                 max_entries: int = 500):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.cache_file = self.cache_dir / "cache.json"
-        self.cache = self._load_cache()
-
-    def _load_cache(self) -> Dict:
-        """Load cache from file"""
-        if self.cache_file.exists():
+        self.max_entries_per_service = max_entries_per_service
+        self.max_entries = max_entries
+        # Keys: "entry/<service>/<key>" -> entry, "current/<service>[@<copy>]" -> key, "stats" -> counters
+        self.store = JournalStore(str(self.cache_dir / "cache.journal"))
+        self.lock = threading.Lock()
+        # Misses for keys that have no entry yet, folded in once the key is built
+        self.pending_misses: Dict[str, int] = {}
+        self._import_json_cache()
+        self.hasher = SourceHasher(str(self.cache_dir / "stat_cache"))
+        # Earlier versions kept every tree's stat cache in one file; it only saves re-reads
+        legacy_stat_cache = self.cache_dir / "stat_cache.json"
+        if legacy_stat_cache.exists():
+            legacy_stat_cache.unlink()
+
+    def _import_json_cache(self):
+        """Move a cache.json written by earlier versions into the journal"""
+        if not self.cache_file.exists():
+            return
+        try:
             with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        return {}
-
-    def _save_cache(self):
-        """Save cache to file"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        # Single-entry caches carry no key fields and are dropped
+        if isinstance(data.get("services"), dict):
+            for name, service in data["services"].items():
+                for key, entry in service.get("entries", {}).items():
+                    self.store.put(f"entry/{name}/{key}", entry)
+                if service.get("current"):
+                    self.store.put(f"current/{name}", service["current"])
+            self.store.put("stats", {"hits": data.get("hits", 0), "misses": data.get("misses", 0)})
+        self.cache_file.unlink()
+
+    def _count(self, field: str):
+        def bump(stats):
+            stats = dict(stats or {"hits": 0, "misses": 0})
+            stats[field] += 1
+            return stats
+        self.store.update("stats", bump)
 
     def get_commit_hash(self, repo_path: str) -> Optional[str]:
         """Get current commit hash"""
@@ -46,55 +82,148 @@ class BuildCache:
         except:
             return None
 
-    def get_pom_hash(self, repo_path: str) -> Optional[str]:
-        """Get hash of pom.xml"""
-        pom_file = Path(repo_path) / "pom.xml"
-        if pom_file.exists():
-            with open(pom_file, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
-        return None
-
-    def should_build(self, service_name: str, repo_path: str) -> bool:
+    def get_source_hash(self, repo_path: str) -> Optional[str]:
+        """Merkle digest of every source file (all poms included, build output excluded)"""
+        if not (Path(repo_path) / "pom.xml").exists():
+            return None
+        return self.hasher.hash_tree(Path(repo_path)).root
+
+    @staticmethod
+    def make_key(branch: str, commit: Optional[str], profiles: List[str], flags: str = "",
+                 settings_hash: str = "") -> str:
+        """Cache key of one build variant of a service"""
+        raw = "\n".join([branch or "", commit or "", ",".join(sorted(profiles or [])), flags, settings_hash])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    def lookup(self, service_name: str, key: str, source_hash: Optional[str]) -> Optional[Dict]:
+        """Entry built from exactly these inputs, counting a hit or a miss for the key"""
+        hit = None
+
+        def record(entry):
+            nonlocal hit
+            if entry is None:
+                return None
+            entry = dict(entry)
+            if source_hash and entry.get("source") == source_hash:
+                entry["hits"] = entry.get("hits", 0) + 1
+                entry["last_used"] = time.time()
+                hit = entry
+            else:
+                entry["misses"] = entry.get("misses", 0) + 1
+            return entry
+
+        if self.store.update(f"entry/{service_name}/{key}", record) is None:
+            with self.lock:
+                self.pending_misses[key] = self.pending_misses.get(key, 0) + 1
+        self._count("hits" if hit else "misses")
+        return hit
+
+    @staticmethod
+    def _current_key(service_name: str, copy: Optional[str] = None) -> str:
+        """A service has one working copy, or one per branch (copy) with worktrees"""
+        return f"current/{service_name}@{copy}" if copy else f"current/{service_name}"
+
+    def _current_keys(self, service_name: str) -> List[str]:
+        return [self._current_key(service_name)] + \
+            [k for k, _ in self.store.items(f"current/{service_name}@")]
+
+    def is_current(self, service_name: str, key: str, copy: Optional[str] = None) -> bool:
+        """Whether the working copy still holds the outputs of the build stored under key"""
+        return self.store.get(self._current_key(service_name, copy)) == key
+
+    def should_build(self, service_name: str, repo_path: str, key: str,
+                     source_hash: Optional[str] = None, copy: Optional[str] = None) -> bool:
         """Check if service needs to be built"""
-        commit_hash = self.get_commit_hash(repo_path)
-        pom_hash = self.get_pom_hash(repo_path)
-
-        if not commit_hash or not pom_hash:
-            return True
-
-        cache_key = service_name
-        if cache_key in self.cache:
-            cached = self.cache[cache_key]
-            if (cached.get("commit") == commit_hash and
-                    cached.get("pom") == pom_hash):
-                return False
-
-        return True
-
-    def mark_built(self, service_name: str, repo_path: str, branch: str = ""):
-        """Mark service as built"""
-        commit_hash = self.get_commit_hash(repo_path)
-        pom_hash = self.get_pom_hash(repo_path)
-
-        self.cache[service_name] = {
-            "commit": commit_hash,
-            "pom": pom_hash,
-            "branch": branch,
-            "timestamp": datetime.now().isoformat()
+        source_hash = source_hash or self.get_source_hash(repo_path)
+        entry = self.lookup(service_name, key, source_hash)
+        return not (entry and self.is_current(service_name, key, copy))
+
+    def mark_built(self, service_name: str, repo_path: str, branch: str = "", key: Optional[str] = None,
+                   artifact_key: Optional[str] = None, profiles: Optional[List[str]] = None,
+                   commit: Optional[str] = None, copy: Optional[str] = None,
+                   source_hash: Optional[str] = None):
+        """Mark service as built; commit and source_hash save a rev-parse and a tree walk when the caller knows them"""
+        commit_hash = commit or self.get_commit_hash(repo_path)
+        key = key or self.make_key(branch, commit_hash, profiles or [])
+        source_hash = source_hash or self.get_source_hash(repo_path)
+        with self.lock:
+            pending = self.pending_misses.pop(key, 0)
+
+        def build_entry(previous):
+            previous = previous or {}
+            return {
+                "commit": commit_hash,
+                "source": source_hash,
+                "branch": branch,
+                "profiles": list(profiles or []),
+                "artifact_key": artifact_key,
+                "hits": previous.get("hits", 0),
+                "misses": previous.get("misses", 0) + pending,
+                "last_used": time.time(),
+                "timestamp": datetime.now().isoformat()
+            }
+
+        self.store.update(f"entry/{service_name}/{key}", build_entry)
+        self.store.put(self._current_key(service_name, copy), key)
+        self._evict(service_name)
+
+    def _drop(self, service_name: str, key: str):
+        self.store.delete(f"entry/{service_name}/{key}")
+        for current_key in self._current_keys(service_name):
+            self.store.update(current_key, lambda current: None if current == key else current)
+
+    def _evict(self, service_name: str):
+        """LRU eviction: first within the service, then across all services"""
+        own = sorted((e["last_used"], k.rsplit("/", 1)[1])
+                     for k, e in self.store.items(f"entry/{service_name}/"))
+        for _, key in own[:max(0, len(own) - self.max_entries_per_service)]:
+            self._drop(service_name, key)
+
+        everything = sorted((e["last_used"], k) for k, e in self.store.items("entry/"))
+        for _, full_key in everything[:max(0, len(everything) - self.max_entries)]:
+            _, name, key = full_key.split("/", 2)
+            self._drop(name, key)
+
+    def forget_copy(self, service_name: str, copy: Optional[str] = None):
+        """The working copy was deleted, so it no longer holds any build's outputs"""
+        self.store.delete(self._current_key(service_name, copy))
+
+    def get_cache_info(self, service_name: str, copy: Optional[str] = None) -> Optional[Dict]:
+        """Get cache information for the build currently in the service's working copy"""
+        current = self.store.get(self._current_key(service_name, copy))
+        return self.store.get(f"entry/{service_name}/{current}") if current else None
+
+    def entries(self) -> List[Dict]:
+        """Every cached build, most recently used first"""
+        rows = []
+        for full_key, entry in self.store.items("entry/"):
+            _, name, key = full_key.split("/", 2)
+            current = any(self.store.get(k) == key for k in self._current_keys(name))
+            rows.append(dict(entry, service=name, key=key, current=current))
+        return sorted(rows, key=lambda r: r["last_used"], reverse=True)
+
+    def stats(self) -> Dict:
+        counters = self.store.get("stats") or {"hits": 0, "misses": 0}
+        entries = self.store.items("entry/")
+        return {
+            "entries": len(entries),
+            "services": len({k.split("/", 2)[1] for k, _ in entries}),
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "max_entries_per_service": self.max_entries_per_service,
+            "max_entries": self.max_entries,
+            "journal": self.store.stats()
         }
-        self._save_cache()
-
-    def get_cache_info(self, service_name: str) -> Optional[Dict]:
-        """Get cache information for a service"""
-        return self.cache.get(service_name)
 
     def clear(self):
         """Clear all cache"""
-        self.cache = {}
-        self._save_cache()
+        with self.lock:
+            self.pending_misses = {}
+        self.store.clear()
 
     def clear_service(self, service_name: str):
         """Clear cache for specific service"""
-        if service_name in self.cache:
-            del self.cache[service_name]
-            self._save_cache()
\ No newline at end of file
+        for full_key, _ in self.store.items(f"entry/{service_name}/"):
+            self.store.delete(full_key)
+        for current_key in self._current_keys(service_name):
+            self.store.delete(current_key)
@@ -0,0 +1,194 @@
+"""
+Build history database
+Every finished service build is recorded in SQLite; per-service duration
+percentiles drive the scheduler's weights and the batch ETA
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT,
+    service TEXT NOT NULL,
+    branch TEXT,
+    commit_sha TEXT,
+    status TEXT NOT NULL,
+    finished REAL NOT NULL,
+    duration REAL,
+    sync_s REAL,
+    check_s REAL,
+    build_s REAL,
+    record_s REAL,
+    backend TEXT,
+    build_mode TEXT,
+    peak_rss_mb REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_service ON builds (service, finished);
+CREATE TABLE IF NOT EXISTS traces (
+    job_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    services INTEGER,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    job_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+STAGE_COLUMNS = {"sync": "sync_s", "check": "check_s", "build": "build_s", "record": "record_s"}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, q in 0..100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BuildHistory:
+    """SQLite store of past build results"""
+
+    def __init__(self, db_file: str = ".build_cache/history.db", sample_size: int = 30,
+                 trace_limit: int = 200):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_size = sample_size
+        self.trace_limit = trace_limit
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+
+    def record(self, result: Dict, job_id: Optional[str] = None):
+        """Store one service result as produced by the build pipeline"""
+        stages = result.get("stages") or {}
+        row = {
+            "job_id": job_id,
+            "service": result.get("service"),
+            "branch": result.get("branch"),
+            "commit_sha": result.get("commit"),
+            "status": result.get("status"),
+            "finished": time.time(),
+            "duration": result.get("duration"),
+            "backend": result.get("backend"),
+            "build_mode": result.get("build_mode"),
+            "peak_rss_mb": result.get("peak_rss_mb"),
+            "error": (result.get("error") or "")[:1000] or None,
+        }
+        for stage, column in STAGE_COLUMNS.items():
+            row[column] = stages.get(stage)
+        if not row["service"]:
+            return
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{c}" for c in row)
+        with self.lock, self.conn:
+            self.conn.execute(f"INSERT INTO builds ({columns}) VALUES ({placeholders})", row)
+
+    def durations(self, service: str, limit: Optional[int] = None) -> List[float]:
+        """Total durations of the most recent successful builds of a service"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT duration FROM builds WHERE service = ? AND status = 'success' "
+                "AND duration IS NOT NULL ORDER BY finished DESC LIMIT ?",
+                (service, limit or self.sample_size)
+            ).fetchall()
+        return [r["duration"] for r in rows]
+
+    def estimates(self, services: Iterable[str], q: float = 50) -> Dict[str, float]:
+        """Expected build duration per service; services without history are left out"""
+        estimates = {}
+        for service in services:
+            value = percentile(self.durations(service), q)
+            if value is not None:
+                estimates[service] = value
+        return estimates
+
+    def builds(self, service: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Most recent builds, optionally for one service"""
+        query = "SELECT * FROM builds"
+        params: tuple = ()
+        if service:
+            query += " WHERE service = ?"
+            params = (service,)
+        query += " ORDER BY finished DESC LIMIT ?"
+        with self.lock:
+            rows = self.conn.execute(query, params + (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def service_stats(self) -> List[Dict]:
+        """Per-service trends: counts, success rate, duration percentiles and peak memory"""
+        with self.lock:
+            services = [r["service"] for r in self.conn.execute(
+                "SELECT service, MAX(finished) AS last FROM builds GROUP BY service ORDER BY last DESC")]
+            counts = {r["service"]: dict(r) for r in self.conn.execute(
+                "SELECT service, COUNT(*) AS builds, "
+                "SUM(status = 'success') AS succeeded, SUM(status IN ('failed', 'error', 'timeout')) AS failed, "
+                "MAX(finished) AS last_build, AVG(peak_rss_mb) AS avg_peak_rss_mb, "
+                "MAX(peak_rss_mb) AS max_peak_rss_mb FROM builds GROUP BY service")}
+
+        stats = []
+        for service in services:
+            row = counts[service]
+            recent = self.durations(service)
+            attempted = row["succeeded"] + row["failed"]
+            stats.append({
+                "service": service,
+                "builds": row["builds"],
+                "success_rate": round(row["succeeded"] / attempted, 3) if attempted else None,
+                "p50_s": percentile(recent, 50),
+                "p90_s": percentile(recent, 90),
+                "last_build": row["last_build"],
+                "avg_peak_rss_mb": row["avg_peak_rss_mb"],
+                "max_peak_rss_mb": row["max_peak_rss_mb"],
+                # oldest first, for plotting
+                "recent_durations": list(reversed(recent)),
+            })
+        return stats
+
+    def save_trace(self, job_id: str, trace: Dict, services: int = 0):
+        """Store a batch's Chrome trace (compressed), keeping the newest trace_limit"""
+        data = zlib.compress(json.dumps(trace, separators=(',', ':')).encode('utf-8'))
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO traces (job_id, created, services, data) VALUES (?, ?, ?, ?)",
+                              (job_id, time.time(), services, data))
+            self.conn.execute("DELETE FROM traces WHERE job_id NOT IN "
+                              "(SELECT job_id FROM traces ORDER BY created DESC LIMIT ?)", (self.trace_limit,))
+
+    def save_report(self, job_id: str, report: Dict):
+        """Store the post-batch analysis of a job"""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO reports (job_id, created, data) VALUES (?, ?, ?)",
+                              (job_id, time.time(), json.dumps(report)))
+            self.conn.execute("DELETE FROM reports WHERE job_id NOT IN "
+                              "(SELECT job_id FROM reports ORDER BY created DESC LIMIT ?)", (self.trace_limit,))
+
+    def get_report(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM reports WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_trace(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM traces WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(zlib.decompress(row["data"])) if row else None
+
+    def traces(self, limit: int = 50) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT job_id, created, services, LENGTH(data) AS size_bytes "
+                                     "FROM traces ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
@@ -0,0 +1,250 @@
+"""
+Build job queue
+Every build request becomes a job with an ID; jobs run against one global
+concurrency budget instead of each request resizing the builder
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
+from typing import Callable, Dict, List, Optional
+
+# Job states that will not change any more
+FINAL_STATES = ("completed", "cancelled", "failed", "interrupted")
+
+
+@dataclass
+class BuildJob:
+    """One build request and its outcome"""
+    job_id: str
+    group_id: str
+    services: List[str]
+    force: bool = False
+    max_workers: Optional[int] = None
+    status: str = "queued"  # queued, running, completed, cancelled, failed, interrupted
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    results: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None
+    configs: List = field(default_factory=list, repr=False)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def summary(self) -> Dict:
+        success = sum(1 for r in self.results if r.get('status') == 'success')
+        skipped = sum(1 for r in self.results if r.get('status') == 'skipped')
+        return {
+            'job_id': self.job_id,
+            'group_id': self.group_id,
+            'status': self.status,
+            'services': self.services,
+            'force': self.force,
+            'max_workers': self.max_workers,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error,
+            'success': success,
+            'skipped': skipped,
+            'failed': len(self.results) - success - skipped,
+            'total': len(self.services)
+        }
+
+    def to_record(self) -> Dict:
+        record = dict(self.summary(), results=self.results)
+        if self.configs and all(is_dataclass(c) for c in self.configs):
+            # Kept until the job ends, so a queued job survives a restart
+            record['configs'] = [asdict(c) for c in self.configs]
+        return record
+
+
+class BuildQueue:
+    """
+    Persistent queue of build jobs
+
+    Up to max_running_jobs jobs run at once. They share the builder's stage
+    pools and admission controller, so their services interleave fairly
+    under a single concurrency budget and per-repo locks keep two jobs out
+    of the same working copy. Jobs are kept in a JSON history file: finished
+    ones keep their status and results across a restart, queued ones are
+    queued again (their configs are rebuilt as config_type) and ones that
+    were running are reported as interrupted.
+    """
+
+    def __init__(self, builder, max_running_jobs: int = 4,
+                 history_file: str = ".build_cache/jobs.json", history_limit: int = 200,
+                 config_type: Optional[type] = None):
+        self.builder = builder
+        self.max_running_jobs = max_running_jobs
+        self.history_file = Path(history_file)
+        self.history_limit = history_limit
+        self.config_type = config_type
+
+        self.jobs: "OrderedDict[str, BuildJob]" = OrderedDict()
+        self.pending: deque = deque()
+        self.running = set()
+        self.cond = threading.Condition()
+        # Submits and finishing jobs save from different threads through one temp file
+        self.save_lock = threading.Lock()
+        self.listeners: List[Callable[[BuildJob], None]] = []
+
+        self._load_history()
+        threading.Thread(target=self._dispatch_loop, name="build-queue", daemon=True).start()
+
+    def _load_history(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        for record in records:
+            job = BuildJob(
+                job_id=record['job_id'],
+                group_id=record.get('group_id', ''),
+                services=record.get('services', []),
+                force=record.get('force', False),
+                max_workers=record.get('max_workers'),
+                status=record.get('status', 'interrupted'),
+                created=record.get('created') or time.time(),
+                started=record.get('started'),
+                finished=record.get('finished'),
+                results=record.get('results', []),
+                error=record.get('error')
+            )
+            if job.status == "queued":
+                job.configs = self._load_configs(record.get('configs'))
+                if job.configs:
+                    self.pending.append(job)
+            # A running job's builds were cut off; it cannot resume
+            if job.status not in FINAL_STATES and not job.configs:
+                job.status = "interrupted"
+                job.error = "Server restarted before the job finished"
+            self.jobs[job.job_id] = job
+        if self.pending:
+            self.builder.log(f"📥 Re-queued {len(self.pending)} jobs from before the restart")
+
+    def _load_configs(self, records: Optional[List[Dict]]) -> List:
+        """Configs of a queued job from its history record; [] if they can't be rebuilt"""
+        if not records or self.config_type is None:
+            return []
+        known = {f.name for f in fields(self.config_type)}
+        try:
+            return [self.config_type(**{k: v for k, v in r.items() if k in known}) for r in records]
+        except TypeError:
+            return []
+
+    def _save_history(self):
+        with self.save_lock:
+            with self.cond:
+                records = [job.to_record() for job in self.jobs.values()]
+            self.history_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.history_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(records, f)
+            tmp_file.replace(self.history_file)
+
+    def add_listener(self, callback: Callable[[BuildJob], None]):
+        """Called with the job whenever a job reaches a final state"""
+        self.listeners.append(callback)
+
+    def submit(self, group_id: str, configs: List, force: bool = False,
+               max_workers: Optional[int] = None) -> BuildJob:
+        job = BuildJob(
+            job_id=uuid.uuid4().hex[:12],
+            group_id=group_id,
+            services=[c.service_name for c in configs],
+            force=force,
+            max_workers=max_workers,
+            configs=configs
+        )
+        with self.cond:
+            self.jobs[job.job_id] = job
+            self.pending.append(job)
+            self._trim()
+            self.cond.notify_all()
+        self._save_history()
+        self.builder.log(f"📥 Job {job.job_id} queued: {len(configs)} services "
+                         f"({len(self.pending)} queued, {len(self.running)} running)")
+        return job
+
+    def get(self, job_id: str) -> Optional[BuildJob]:
+        with self.cond:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        with self.cond:
+            return [job.summary() for job in reversed(self.jobs.values())]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job outright or ask a running one to stop"""
+        with self.cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINAL_STATES:
+                return False
+            job.cancel_event.set()
+            if job.status != "queued":
+                self.builder.log(f"🛑 Cancelling job {job_id}")
+                return True
+            self.pending.remove(job)
+            job.status = "cancelled"
+            job.finished = time.time()
+            job.results = [{"service": name, "status": "cancelled", "duration": 0,
+                            "error": "Cancelled before start"} for name in job.services]
+        self._finish(job)
+        return True
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINAL_STATES]
+        for job_id in finished[:max(0, len(self.jobs) - self.history_limit)]:
+            del self.jobs[job_id]
+
+    def _dispatch_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending or len(self.running) >= self.max_running_jobs:
+                    self.cond.wait()
+                job = self.pending.popleft()
+                job.status = "running"
+                job.started = time.time()
+                self.running.add(job.job_id)
+            # Recorded as running, so a restart reports it interrupted rather than queuing it again
+            self._save_history()
+            threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.job_id}", daemon=True).start()
+
+    def _run_job(self, job: BuildJob):
+        try:
+            job.results = self.builder.build_services(
+                job.configs,
+                force=job.force,
+                job_id=job.job_id,
+                cancel_event=job.cancel_event,
+                max_workers=job.max_workers
+            )
+            job.status = "cancelled" if job.cancel_event.is_set() else "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.builder.log(f"❌ Job {job.job_id} error: {e}")
+            import traceback
+            self.builder.log(traceback.format_exc())
+        finally:
+            job.finished = time.time()
+            with self.cond:
+                self.running.discard(job.job_id)
+                self.cond.notify_all()
+            self._finish(job)
+
+    def _finish(self, job: BuildJob):
+        job.configs = []
+        self._save_history()
+        for callback in self.listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                self.builder.log(f"⚠️ Error in job listener: {e}")
@@ -9,16 +9,34 @@ import subprocess
 import time
 import threading
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, asdict
 
 from .git_service import GitService
+from .git_engine import CancelToken, cancel_scope
 from .build_cache import BuildCache
+from .build_history import BuildHistory
+from .admission import AdmissionController, parse_heap_mb
+from .artifact_store import ArtifactStore, hash_file
+from .dependency_graph import DependencyGraph, collect_reactor
+from .pipeline import BuildPipeline
+from .scheduler import FAILED_STATUSES
 from ..utils.system_info import SystemInfo
 from .command_finder import CommandFinder
+from .process_runner import run_streaming, kill_process_tree
+from .resource_sampler import ProcessTreeSampler, ResourceSeries
+from . import tracing
+from .tracing import Tracer
+from .batch_analysis import analyze_batch, format_report
+from .incremental import IncrementalPlanner
+from .mirror_store import MirrorStore, branch_slug
+from .sparse import SparseCheckout, SparsePlan
+from .workspace_manager import WorkspaceManager
 
 
 @dataclass
@@ -32,42 +50,239 @@ class BuildConfig:
     maven_profiles: List[str]
     jvm_options: str
     maven_threads: int = 8
-    force_full_fetch: bool = False
+    force_full_fetch: bool = False  # whole branch history and tags; only when explicitly requested
+    fetch_depth: int = 1  # commits of history a sync downloads; 0 means the whole branch
+    incremental: bool = False
     # Aggressive optimization flags
     skip_tests: bool = True
     skip_javadoc: bool = True
     skip_source: bool = True
     offline_mode: bool = False
     aggressive_parallel: bool = True
+    maven_backend: str = "mvn"  # "mvn" or "mvnd"
+    # Opt-in modes; off, a build behaves as it always did
+    artifact_cache: bool = False  # restore outputs of an identical earlier build
+    fast_sync: bool = False  # one refspec fetch + forced checkout instead of fetch/reset/clean/pull
+    # Per-branch worktree from a bare mirror shared by every group; moves the working
+    # copy to <service>@<branch slug> and tracks its cache state per copy
+    worktrees: bool = False
+    # Opt-in for large monorepos: blob-less clone with only these modules (paths or
+    # artifactIds) and what they need checked out
+    sparse_modules: List[str] = field(default_factory=list)
+    preflight: bool = False  # skip before syncing when the remote head is already built
+
+
+# Order in which a service moves through the build pipeline
+PIPELINE_STAGES = ("sync", "check", "build", "record")
+
+
+@dataclass
+class BuildContext:
+    """State handed from one pipeline stage to the next for a single service"""
+    config: BuildConfig
+    force: bool
+    result: Dict
+    start_time: float
+    repo_dir: Optional[Path] = None
+    sparse: Optional[SparsePlan] = None
+    build_modules: List[str] = field(default_factory=list)
+    source_hash: Optional[str] = None
+    cache_key: Optional[str] = None
+    artifact_key: Optional[str] = None
+    # Final results of the services this one depends on, set before the build stage
+    upstream: Dict[str, Dict] = field(default_factory=dict)
+    build_time: float = 0.0
+    proc: Optional[subprocess.CompletedProcess] = None
+    resources: Optional[ResourceSeries] = None
+    tracer: Optional[Tracer] = field(default=None, repr=False)
+    stage_times: Dict[str, float] = field(default_factory=dict)
+    done: bool = False  # result is final, remaining stages are skipped
+    cancelled: bool = False
+    processes: List[subprocess.Popen] = field(default_factory=list)
+    git_cancel: CancelToken = field(default_factory=CancelToken, repr=False)
+
+    def attach(self, proc: subprocess.Popen):
+        """Track a running process so cancellation can kill it"""
+        self.processes.append(proc)
+        if self.cancelled:
+            kill_process_tree(proc.pid)
+
+    def cancel(self):
+        self.cancelled = True
+        self.git_cancel.cancel()
+        for proc in self.processes:
+            if proc.poll() is None:
+                kill_process_tree(proc.pid)
+
+
+class MavenExecutor:
+    """Plain mvn backend - every build starts a fresh JVM"""
+    name = "mvn"
+
+    def __init__(self, command: str):
+        self.command = command
+
+    def prepare(self, args: List[str], env: dict) -> Tuple[List[str], dict]:
+        """Turn Maven arguments and environment into the final command line"""
+        return [self.command] + args, env
+
+    @contextmanager
+    def lease(self):
+        yield
+
+
+class MvndExecutor(MavenExecutor):
+    """
+    Maven daemon backend - builds run inside a pool of long-lived JVMs
+
+    Every build is given the same daemon heap and JVM flags so mvnd treats
+    the daemons as interchangeable and reuses a warm one instead of forking
+    a new JVM. The pool size bounds how many daemons can exist at once.
+    A service whose -Xmx exceeds the daemon heap is built with plain mvn.
+    """
+    name = "mvnd"
+
+    def __init__(self, command: str, heap_mb: int, idle_timeout_minutes: int = 30, pool_size: int = 1):
+        super().__init__(command)
+        self.heap_mb = heap_mb
+        self.idle_timeout_minutes = idle_timeout_minutes
+        self.pool_size = max(1, pool_size)
+        self.busy = 0
+        self.cond = threading.Condition()
+
+    def resize(self, pool_size: int):
+        with self.cond:
+            self.pool_size = max(1, pool_size)
+            self.cond.notify_all()
+
+    @contextmanager
+    def lease(self):
+        with self.cond:
+            while self.busy >= self.pool_size:
+                self.cond.wait()
+            self.busy += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.busy -= 1
+                self.cond.notify()
+
+    def prepare(self, args: List[str], env: dict) -> Tuple[List[str], dict]:
+        # The daemon ignores MAVEN_OPTS: system properties move to the command
+        # line, JVM flags to mvnd.jvmArgs. A long-lived JVM benefits from full
+        # tiered compilation, so the C1-only flag is dropped.
+        props, jvm_args = [], []
+        for opt in env.get("MAVEN_OPTS", "").split():
+            if opt.startswith("-D"):
+                props.append(opt)
+            elif opt.startswith(("-Xmx", "-Xms")) or opt.startswith("-XX:TieredStopAtLevel"):
+                continue
+            elif opt.startswith("-XX:"):
+                jvm_args.append(opt)
+
+        env = dict(env)
+        env.pop("MAVEN_OPTS", None)
+        cmd = [self.command] + args + props + [
+            f"-Dmvnd.maxHeapSize={self.heap_mb}m",
+            f"-Dmvnd.minHeapSize={max(256, self.heap_mb // 4)}m",
+            f"-Dmvnd.idleTimeout={self.idle_timeout_minutes}m",
+            f"-Dmvnd.jvmArgs={' '.join(jvm_args)}",
+        ]
+        return cmd, env
+
+    def stop(self):
+        """Stop every daemon started by this mvnd installation"""
+        subprocess.run([self.command, "--stop"], capture_output=True, text=True, timeout=60, shell=False)
 
 
 class MicroserviceBuilder:
     def __init__(self, workspace_dir: str = "workspace"):
         self.workspace_dir = Path(workspace_dir)
         self.workspace_dir.mkdir(exist_ok=True)
+        # Absolute: Maven runs inside each repo, where a relative path would give every service its own
+        self.local_repo = (self.workspace_dir / ".m2" / "repository").resolve()
 
         self.sys_info = SystemInfo()
         self.max_workers = max(4, self.sys_info.cpu_logical_count)
         self.is_windows = sys.platform.startswith('win')
 
         self.build_cache = BuildCache()
+        self.admission = AdmissionController(
+            default_heap_mb=self.sys_info.recommended_jvm_memory * 1024,
+            profile_file=str(self.build_cache.cache_dir / "resource_profile.json")
+        )
+        self.history = BuildHistory(str(self.build_cache.cache_dir / "history.db"))
+        self.artifact_store = ArtifactStore(str(self.build_cache.cache_dir / "artifacts"))
+        self.toolchain_versions: Dict[str, str] = {}
         self.command_finder = CommandFinder()
         self.git_service = None
+        self.incremental = None
+        self.mirrors = None
+        self.sparse = None
 
         self.maven_cmd = None
+        self.mvnd_cmd = None
         self.git_cmd = None
+        self.mvnd: Optional[MvndExecutor] = None
+        self.mvnd_idle_timeout_minutes = 30
+        # Concurrent git network commands over all batches (see set_git_concurrency)
+        self.git_concurrency = 16
         self._find_commands()
 
+        self.output_tail_lines = 200
+
+        # Process-tree telemetry of the latest build per service
+        self.sample_interval = 1.0
+        self.telemetry: "OrderedDict[str, Dict]" = OrderedDict()
+        self.telemetry_limit = 500
+        self.telemetry_lock = threading.Lock()
+
+        # Pool sizes for the non-CPU pipeline stages; the build stage uses max_workers
+        self.stage_workers = {"sync": self.git_concurrency, "check": 2, "record": 1}
+        self.pipelines: Dict[str, BuildPipeline] = {}
+        self.tracers: Dict[str, Tracer] = {}
+        self.stage_pools: Dict[str, ThreadPoolExecutor] = {}
+        self.pools_lock = threading.Lock()
+
+        # One working copy can only be used by one build at a time
+        self.repo_locks: Dict[str, threading.Lock] = {}
+        self.repo_locks_guard = threading.Lock()
+
         self.log_callbacks = []
         self.log_lock = threading.Lock()
         self.build_start_time = None
 
+        # Working copies and mirrors each running batch needs, kept out of eviction
+        self.batch_dirs: Dict[str, List[Path]] = {}
+        self.workspace = WorkspaceManager(
+            self.workspace_dir,
+            str(self.build_cache.cache_dir / "workspace.journal"),
+            self.build_cache,
+            git_service=self.git_service,
+            mirrors=self.mirrors,
+            repo_lock=self._path_lock,
+            log=self.log
+        )
+        self.workspace.start(is_idle=lambda: not self.batch_dirs)
+
     def _find_commands(self):
         self.maven_cmd = self.command_finder.find_maven()
+        self.mvnd_cmd = self.command_finder.find_mvnd()
         self.git_cmd = self.command_finder.find_git()
+        if self.mvnd_cmd:
+            self.mvnd = MvndExecutor(
+                self.mvnd_cmd,
+                heap_mb=self.admission.default_heap_mb,
+                idle_timeout_minutes=self.mvnd_idle_timeout_minutes
+            )
         if self.git_cmd:
             self.git_service = GitService(self.git_cmd)
             self.git_service.set_log_callback(self.log)
+            self.git_service.engine.set_network_limit(self.git_concurrency)
+            self.incremental = IncrementalPlanner(self.git_service)
+            self.mirrors = MirrorStore(self.git_service, self.workspace_dir / ".mirrors")
+            self.sparse = SparseCheckout(self.git_service)
 
     def add_log_callback(self, callback):
         self.log_callbacks.append(callback)
@@ -97,20 +312,64 @@ class MicroserviceBuilder:
         else:
             results['maven'] = {'available': False}
 
+        if self.mvnd_cmd:
+            info = self.command_finder.verify_maven(self.mvnd_cmd)
+            results['mvnd'] = info
+            if info['available']:
+                self.log(f"mvnd: {info['version']}")
+        else:
+            results['mvnd'] = {'available': False}
+
         return results
 
+    def _fits_daemon(self, config: BuildConfig) -> bool:
+        """Whether the service's own -Xmx, if any, fits the heap every mvnd daemon runs with"""
+        heap_mb = parse_heap_mb(config.jvm_options)
+        return heap_mb is None or heap_mb <= self.mvnd.heap_mb
+
+    def select_executor(self, config: BuildConfig) -> MavenExecutor:
+        """Pick the Maven backend for a build, falling back to plain mvn"""
+        if config.maven_backend == "mvnd":
+            if not self.mvnd:
+                self.log(f"⚠️ mvnd not found → using mvn for {config.service_name}")
+            elif not self._fits_daemon(config):
+                self.log(f"⚠️ {config.service_name} needs -Xmx{parse_heap_mb(config.jvm_options)}m, more than the "
+                         f"{self.mvnd.heap_mb} MB mvnd daemon heap → using mvn")
+            else:
+                return self.mvnd
+        return MavenExecutor(self.maven_cmd)
+
+    def admission_jvm_options(self, config: BuildConfig) -> str:
+        """JVM options a build's memory is estimated from: on mvnd the daemon heap replaces -Xmx"""
+        if config.maven_backend == "mvnd" and self.mvnd and self._fits_daemon(config):
+            return f"-Xmx{self.mvnd.heap_mb}m"
+        return config.jvm_options
+
+    def _size_daemon_pool(self):
+        """One warm daemon per build the memory budget can hold at once"""
+        if not self.mvnd:
+            return
+        self.mvnd.idle_timeout_minutes = self.mvnd_idle_timeout_minutes
+        daemon_mb = self.admission.estimate("").rss_mb
+        size = max(1, min(self.max_workers, self.admission.capacity_mb // max(1, daemon_mb)))
+        self.mvnd.resize(size)
+        self.log(f"mvnd pool: {size} daemons x {self.mvnd.heap_mb} MB heap, "
+                 f"idle timeout {self.mvnd_idle_timeout_minutes} min")
+
     def get_ultra_optimized_maven_opts(self, config: BuildConfig) -> str:
         """ULTRA-AGGRESSIVE JVM settings for maximum build speed"""
         if config.jvm_options and config.jvm_options.strip():
             return config.jvm_options
 
-        available_gb = self.sys_info.available_memory_gb
-        heap_size = max(4, min(16, int(available_gb * 0.7)))
+        # Heap comes from the admission estimate so parallel builds never
+        # commit more than the budget they were admitted with
+        heap_mb = self.admission.estimate(config.service_name).heap_mb
+        initial_mb = max(256, heap_mb // 4)
         gc_threads = self.sys_info.cpu_logical_count
 
         opts = [
-            f'-Xmx{heap_size}G',
-            f'-Xms{heap_size}G',
+            f'-Xmx{heap_mb}m',
+            f'-Xms{initial_mb}m',
             '-XX:+UseParallelGC',
             f'-XX:ParallelGCThreads={gc_threads}',
             '-XX:+AggressiveOpts',
@@ -124,240 +383,725 @@ class MicroserviceBuilder:
             '-Djava.awt.headless=true',
             f'-Dmaven.artifact.threads={gc_threads}',
             '-Dmaven.compiler.fork=true',
-            f'-Dmaven.compiler.maxmem={heap_size}g',
+            f'-Dmaven.compiler.maxmem={heap_mb}m',
             '-Daether.connector.http.connectionMaxTtl=30',
             '-Daether.connector.requestTimeout=30000',
         ]
 
         return ' '.join(opts)
 
-    def _run_maven_command(self, cmd: List[str], cwd: str, env: dict, timeout: int = 1800) -> subprocess.CompletedProcess:
+    def _run_maven_command(self, cmd: List[str], cwd: str, env: dict, timeout: int = 1800,
+                           label: str = "", on_start=None,
+                           series: Optional[ResourceSeries] = None) -> subprocess.CompletedProcess:
         """
-        Run Maven command with proper Windows handling
+        Run Maven with proper Windows handling, streaming output as it arrives
         CRITICAL FIX: Use shell=False with list args (Method 3) - this works!
+        Only the last lines of each stream are kept for the build result;
+        with series given, the process tree is sampled into it while Maven runs
         """
         self.log(f"Executing Maven in: {cwd}")
+        self.log(f"Command ({'Windows' if self.is_windows else 'Unix'}): {' '.join(str(x) for x in cmd)[:200]}...")
 
-        if self.is_windows:
-            # WINDOWS: Use shell=False with list args (Method 3 - confirmed working!)
-            # Do NOT use cmd.exe /c or shell=True - these fail with mvn.cmd
-
-            self.log(f"Command (Windows): {' '.join(str(x) for x in cmd)[:150]}...")
-
-            result = subprocess.run(
-                cmd,  # Use list directly
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                env=env,
-                timeout=timeout,
-                shell=False,  # Critical: shell=False works for mvn.cmd!
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-        else:
-            # UNIX: Same method
-            self.log(f"Command (Unix): {' '.join(cmd)[:200]}...")
-
-            result = subprocess.run(
-                cmd,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                env=env,
-                timeout=timeout,
-                shell=False
-            )
+        prefix = f"[{label}] " if label else ""
 
-        return result
+        def forward(stream: str, line: str):
+            if line.strip():
+                self.log(f"   {prefix}{line}")
 
-    def build_service(self, config: BuildConfig, force: bool = False) -> Dict:
-        start_time = time.time()
-        result = {
-            "service": config.service_name,
-            "status": "pending",
-            "duration": 0,
-            "error": None,
-            "branch": config.branch
-        }
+        sampler = None
+
+        def started(proc: subprocess.Popen):
+            nonlocal sampler
+            if on_start:
+                on_start(proc)
+            if series is not None:
+                sampler = ProcessTreeSampler(proc.pid, self.sample_interval, series).start()
 
         try:
-            self.log(f"\n{'='*60}")
-            self.log(f"BUILDING: {config.service_name} → {config.branch}")
-            self.log(f"{'='*60}")
+            return run_streaming(cmd, cwd=cwd, env=env, timeout=timeout, on_line=forward,
+                                 tail_lines=self.output_tail_lines, on_start=started)
+        finally:
+            if sampler:
+                sampler.stop()
+
+    def _toolchain_version(self) -> str:
+        """`mvn --version` output (Maven, JDK, OS), queried once per command"""
+        if self.maven_cmd not in self.toolchain_versions:
+            try:
+                proc = subprocess.run([self.maven_cmd, "--version"], capture_output=True,
+                                      text=True, timeout=60, shell=False)
+                version = proc.stdout.strip()
+            except (OSError, subprocess.TimeoutExpired):
+                version = ""
+            self.toolchain_versions[self.maven_cmd] = version
+        return self.toolchain_versions[self.maven_cmd]
+
+    def _has_build_outputs(self, repo_dir: Path) -> bool:
+        return any((repo_dir / pom.path / "target").is_dir() for pom in collect_reactor(repo_dir))
+
+    def _settings_hash(self, config: BuildConfig) -> str:
+        if config.settings_file and Path(config.settings_file).exists():
+            return hash_file(Path(config.settings_file)).hexdigest()
+        return ""
+
+    @staticmethod
+    def _build_flags(config: BuildConfig) -> str:
+        flags = f"tests={config.skip_tests},javadoc={config.skip_javadoc},source={config.skip_source}"
+        if config.sparse_modules:
+            flags += f",sparse={','.join(sorted(config.sparse_modules))}"
+        return flags
+
+    def cache_key(self, ctx: BuildContext) -> str:
+        """Build cache key: branch, commit, profiles, skip flags and settings.xml"""
+        config = ctx.config
+        return self.build_cache.make_key(
+            config.branch,
+            ctx.result.get("commit") or self.git_service.get_commit_hash(ctx.repo_dir),
+            config.maven_profiles,
+            self._build_flags(config),
+            self._settings_hash(config)
+        )
+
+    def artifact_key(self, ctx: BuildContext) -> Optional[str]:
+        """
+        Hash of everything that determines what Maven produces for this build
 
-            repo_dir = self.workspace_dir / config.group_id / config.service_name
-            repo_dir.mkdir(parents=True, exist_ok=True)
+        Upstream services are resolved as SNAPSHOTs from the shared local
+        repository, so their artifact keys are inputs too (which makes the
+        key cover the whole upstream chain). None when an upstream's outputs
+        can't be identified; such a build is neither restored nor stored.
+        """
+        config = ctx.config
+        upstream = []
+        for name, result in sorted(ctx.upstream.items()):
+            if not result.get("artifact_key"):
+                return None
+            upstream.append(f"{name}={result['artifact_key']}")
+        # System properties passed through MAVEN_OPTS can change the build; heap sizes can't
+        properties = sorted(opt for opt in (config.jvm_options or "").split() if opt.startswith("-D"))
+        return ArtifactStore.input_key({
+            "sources": ctx.source_hash,
+            "profiles": ",".join(sorted(config.maven_profiles or [])),
+            "flags": self._build_flags(config),
+            "settings": self._settings_hash(config),
+            "toolchain": self._toolchain_version(),
+            "upstream": ",".join(upstream),
+            "properties": " ".join(properties),
+        })
+
+    def _cached_artifact_key(self, config: BuildConfig) -> Optional[str]:
+        """Artifact key of the build whose outputs the working copy holds"""
+        entry = self.build_cache.get_cache_info(config.service_name, self._working_copy(config)) or {}
+        return entry.get("artifact_key")
+
+    def _mark_built(self, ctx: BuildContext, new_outputs: bool = True):
+        """new_outputs: Maven ran or a restore replaced them, rather than the build being skipped"""
+        # Dependents fold this key into theirs
+        artifact_key = ctx.artifact_key if new_outputs else self._cached_artifact_key(ctx.config)
+        ctx.result["artifact_key"] = artifact_key
+        self.build_cache.mark_built(ctx.config.service_name, str(ctx.repo_dir), ctx.config.branch,
+                                    key=ctx.cache_key, artifact_key=artifact_key,
+                                    profiles=ctx.config.maven_profiles, commit=ctx.result.get("commit"),
+                                    copy=self._working_copy(ctx.config), source_hash=ctx.source_hash)
+
+    def _repo_dir(self, config: BuildConfig) -> Path:
+        if config.worktrees or config.sparse_modules:
+            return self.workspace_dir / config.group_id / f"{config.service_name}@{branch_slug(config.branch)}"
+        return self.workspace_dir / config.group_id / config.service_name
+
+    @staticmethod
+    def _working_copy(config: BuildConfig) -> Optional[str]:
+        """Which of the service's working copies the cache tracks: one per branch with worktrees"""
+        return branch_slug(config.branch) if config.worktrees or config.sparse_modules else None
+
+    def _mirror_dir(self, config: BuildConfig) -> Optional[Path]:
+        """The shared mirror the service's worktree is checked out from, if any"""
+        if config.worktrees and not config.sparse_modules and self.mirrors:
+            return self.mirrors.mirror_path(config.repo_url)
+        return None
+
+    def _path_lock(self, path: Path) -> threading.Lock:
+        key = str(Path(path).resolve())
+        with self.repo_locks_guard:
+            return self.repo_locks.setdefault(key, threading.Lock())
+
+    def _repo_lock(self, ctx: BuildContext) -> threading.Lock:
+        return self._path_lock(self._repo_dir(ctx.config))
+
+    def try_lock_repo(self, ctx: BuildContext) -> bool:
+        """Claim the working copy for this build without blocking"""
+        return self._repo_lock(ctx).acquire(blocking=False)
+
+    def unlock_repo(self, ctx: BuildContext):
+        lock = self._repo_lock(ctx)
+        if lock.locked():
+            lock.release()
+
+    def set_git_concurrency(self, limit: int):
+        """
+        Cap concurrent clones/fetches/ls-remotes, independently of build slots
 
-            if not self.git_service:
-                raise Exception("Git not available")
+        The sync pool follows the limit: its threads only wait on the git
+        engine, so more of them than network slots would just queue there.
+        """
+        self.git_concurrency = max(1, limit)
+        self.stage_workers["sync"] = self.git_concurrency
+        if self.git_service:
+            self.git_service.engine.set_network_limit(self.git_concurrency)
+        self.log(f"🌐 Git network concurrency: {self.git_concurrency}")
+
+    def shared_pools(self) -> Dict[str, ThreadPoolExecutor]:
+        """Stage pools shared by every batch so concurrent jobs can't oversubscribe the machine"""
+        sizes = dict(self.stage_workers, build=self.max_workers)
+        with self.pools_lock:
+            for stage, size in sizes.items():
+                pool = self.stage_pools.get(stage)
+                if pool is None or pool._max_workers < size:
+                    if pool is not None:
+                        pool.shutdown(wait=False)
+                    self.stage_pools[stage] = ThreadPoolExecutor(max_workers=size,
+                                                                 thread_name_prefix=f"{stage}-stage")
+            return dict(self.stage_pools)
+
+    def build_dependency_graph(self, configs: List[BuildConfig]) -> DependencyGraph:
+        """Build the cross-service graph from the poms already in the workspace"""
+        graph = DependencyGraph.from_repos({c.service_name: self._repo_dir(c) for c in configs})
+
+        levels = graph.levels()
+        edges = sum(len(graph.upstream[n]) for n in graph.nodes)
+        self.log(f"Dependency graph: {len(graph.nodes)} services, {edges} edges, {len(levels)} levels")
+        for idx, level in enumerate(levels):
+            if len(levels) > 1:
+                self.log(f"   Level {idx}: {', '.join(level)}")
+        for cycle in graph.cycles:
+            self.log(f"⚠️ Dependency cycle ignored: {' ↔ '.join(cycle)}")
+
+        return graph
+
+    def new_context(self, config: BuildConfig, force: bool = False,
+                    tracer: Optional[Tracer] = None) -> BuildContext:
+        return BuildContext(
+            config=config,
+            force=force,
+            result={
+                "service": config.service_name,
+                "status": "pending",
+                "duration": 0,
+                "error": None,
+                "branch": config.branch
+            },
+            start_time=time.time(),
+            tracer=tracer
+        )
+
+    def run_stage(self, stage: str, ctx: BuildContext) -> BuildContext:
+        """Run one pipeline stage, turning any failure into a final result"""
+        if ctx.done:
+            return ctx
+        stage_start = time.time()
+        try:
+            with tracing.activate(ctx.tracer, service=ctx.config.service_name), cancel_scope(ctx.git_cancel), \
+                    tracing.span(f"{stage}: {ctx.config.service_name}", cat="stage", stage=stage) as span_args:
+                getattr(self, f"_stage_{stage}")(ctx)
+                span_args["status"] = ctx.result["status"]
+        except subprocess.TimeoutExpired:
+            ctx.result["status"] = "timeout"
+            if stage == "build":
+                ctx.result["error"] = "Build timeout (30 minutes exceeded)"
+                self.log(f"⏱️ TIMEOUT after 30 minutes")
+            else:
+                ctx.result["error"] = f"Timeout during {stage} stage"
+                self.log(f"⏱️ TIMEOUT in {stage} stage: {ctx.config.service_name}")
+            ctx.done = True
+        except Exception as e:
+            ctx.result["status"] = "error"
+            ctx.result["error"] = str(e)
+            self.log(f"❌ ERROR: {e}")
+            import traceback
+            self.log(traceback.format_exc())
+            ctx.done = True
+
+        if ctx.cancelled and ctx.done and ctx.result["status"] in FAILED_STATUSES:
+            # The git or Maven process was killed by the cancel, it didn't fail on its own
+            ctx.result.update(status="cancelled", error="Cancelled")
+
+        ctx.stage_times[stage] = time.time() - stage_start
+        if ctx.done or stage == PIPELINE_STAGES[-1]:
+            ctx.done = True
+            if ctx.repo_dir is not None:
+                self.workspace.touch(ctx.repo_dir, self._mirror_dir(ctx.config))
+            ctx.result["duration"] = time.time() - ctx.start_time
+            ctx.result["stages"] = {k: round(v, 2) for k, v in ctx.stage_times.items()}
+        return ctx
+
+    def preflight(self, configs: List[BuildConfig], tracer: Optional[Tracer] = None) -> Dict[str, Dict]:
+        """
+        Results for the services that are already built at their remote head
+
+        One ls-remote per repository (all its branches at once) goes to the
+        git engine in a single fan-out, so a quiet batch costs a round trip
+        per repo instead of a sync and a check per service. A service is only dropped when its
+        working copy is at that head and the check stage would skip it too.
+        """
+        start = time.time()
+        branches: Dict[str, set] = {}
+        for config in configs:
+            branches.setdefault(config.repo_url, set()).add(config.branch)
+        pool = self.shared_pools()["sync"]
+
+        def check(config: BuildConfig, heads: Optional[Dict[str, str]]):
+            with tracing.activate(tracer, service=config.service_name), \
+                    tracing.span(f"preflight: {config.service_name}", cat="stage", stage="preflight") as span_args:
+                result = self._preflight_check(config, (heads or {}).get(config.branch))
+                span_args["status"] = result["status"] if result else "changed"
+                return result
+
+        with tracing.activate(tracer):
+            heads = self.git_service.remote_heads_many({url: sorted(b) for url, b in branches.items()})
+        unreachable = [url for url, found in heads.items() if found is None]
+        checks = [(c, pool.submit(check, c, heads[c.repo_url])) for c in configs]
+        skipped = {}
+        for config, future in checks:
+            result = future.result()
+            if result is not None:
+                skipped[config.service_name] = result
+
+        self.log(f"🛫 Preflight: {len(skipped)}/{len(configs)} services unchanged at their remote head, "
+                 f"{len(branches)} repos checked in {time.time() - start:.1f}s"
+                 + (f" ({len(unreachable)} unreachable)" if unreachable else ""))
+        return skipped
+
+    def _preflight_check(self, config: BuildConfig, remote_sha: Optional[str]) -> Optional[Dict]:
+        """The skipped result for config, or None if it has to go through the pipeline"""
+        repo_dir = self._repo_dir(config)
+        if not remote_sha or self.git_service.read_ref(repo_dir, "HEAD") != remote_sha:
+            return None
+        ctx = self.new_context(config)
+        ctx.repo_dir = repo_dir
+        ctx.result["commit"] = remote_sha
+        copy = self._working_copy(config)
+        # A build of this repo in another batch may be changing the working copy
+        if not self.try_lock_repo(ctx):
+            return None
+        try:
+            key = self.cache_key(ctx)
+            if not self.build_cache.is_current(config.service_name, key, copy):
+                return None
+            tree = self.build_cache.hasher.hash_tree(repo_dir)
+            if (self.build_cache.should_build(config.service_name, str(repo_dir), key, tree.root, copy=copy)
+                    or not self._has_build_outputs(repo_dir)):
+                return None
+        finally:
+            self.unlock_repo(ctx)
+
+        ctx.result.update(status="skipped", build_mode="preflight", artifact_key=self._cached_artifact_key(config),
+                          duration=time.time() - ctx.start_time, stages={})
+        self.log(f"⚡ SKIPPED (remote head {remote_sha[:8]} already built) - {config.service_name}")
+        self.workspace.touch(repo_dir, self._mirror_dir(config))
+        return ctx.result
 
-            # 1. Clone or update
+    def build_service(self, config: BuildConfig, force: bool = False) -> Dict:
+        """Run every pipeline stage for one service in the calling thread"""
+        ctx = self.new_context(config, force)
+        for stage in PIPELINE_STAGES:
+            self.run_stage(stage, ctx)
+        return ctx.result
+
+    def _stage_sync(self, ctx: BuildContext):
+        """Stage 1 (I/O): clone or update the repository and check out the branch"""
+        config = ctx.config
+
+        self.log(f"\n{'='*60}")
+        self.log(f"SYNCING: {config.service_name} → {config.branch}")
+        self.log(f"{'='*60}")
+
+        repo_dir = self._repo_dir(config)
+        repo_dir.mkdir(parents=True, exist_ok=True)
+        ctx.repo_dir = repo_dir
+
+        if not self.git_service:
+            raise Exception("Git not available")
+
+        depth = None if config.force_full_fetch or config.fetch_depth <= 0 else config.fetch_depth
+        if config.sparse_modules:
+            # Own blob-less clone per branch: a shared mirror would have to hold every blob
+            clone_start = time.time()
+            plan = self.sparse.sync(config.repo_url, repo_dir, config.branch, config.sparse_modules, depth=depth)
+            if plan is None:
+                raise Exception(f"Sparse sync failed: {config.branch}")
+            ctx.sparse = plan
+            ctx.result["commit"] = plan.commit
+            self.log(f"✓ Synced {config.branch} ({plan.commit[:8]}) sparse: {len(plan.modules)} modules "
+                     f"in {time.time() - clone_start:.1f}s")
+            return
+
+        if config.worktrees:
+            # One refspec fetch into the shared mirror, then a new worktree or one checkout
             clone_start = time.time()
-            success = self.git_service.clone_or_update_repo(
-                config.repo_url,
-                repo_dir,
-                config.branch
+            commit = self.mirrors.sync(config.repo_url, config.branch, repo_dir, depth=depth)
+            if commit is None:
+                raise Exception(f"Git sync failed: {config.branch}")
+            ctx.result["commit"] = commit
+            self.log(f"✓ Synced {config.branch} ({commit[:8]}) into worktree in {time.time() - clone_start:.1f}s")
+            return
+
+        if config.fast_sync:
+            # One clone, or one refspec fetch plus one checkout; the SHA comes back with it
+            clone_start = time.time()
+            commit = self.git_service.sync_repo(config.repo_url, repo_dir, config.branch, depth=depth)
+            if commit is None:
+                raise Exception(f"Git sync failed: {config.branch}")
+            ctx.result["commit"] = commit
+            self.log(f"✓ Synced {config.branch} ({commit[:8]}) in {time.time() - clone_start:.1f}s")
+            return
+
+        # 1. Clone or update
+        clone_start = time.time()
+        success = self.git_service.clone_or_update_repo(
+            config.repo_url,
+            repo_dir,
+            config.branch
+        )
+        clone_time = time.time() - clone_start
+        self.log(f"Git operations: {clone_time:.1f}s")
+
+        if not success:
+            raise Exception("Git clone/update failed")
+
+        # 2. Force full fetch if needed
+        if config.force_full_fetch:
+            self.log(f"Full history requested → unshallowing")
+            self.git_service._run_git_command(
+                [self.git_cmd, "fetch", "--unshallow", "--all", "--tags"]
+                if self.git_service.is_shallow(repo_dir) else [self.git_cmd, "fetch", "--all", "--tags"],
+                cwd=repo_dir,
+                timeout=180
             )
-            clone_time = time.time() - clone_start
-            self.log(f"Git operations: {clone_time:.1f}s")
-
-            if not success:
-                raise Exception("Git clone/update failed")
-
-            # 2. Force full fetch if needed
-            if config.force_full_fetch:
-                self.log(f"Non-default branch → unshallowing")
-                self.git_service._run_git_command(
-                    [self.git_cmd, "fetch", "--unshallow", "--all", "--tags"],
-                    cwd=repo_dir,
-                    timeout=180
-                )
-
-            # 3. Checkout
-            checkout = self.git_service._run_git_command(
-                [self.git_cmd, "checkout", config.branch],
+
+        # 3. Checkout
+        checkout = self.git_service._run_git_command(
+            [self.git_cmd, "checkout", config.branch],
+            cwd=repo_dir,
+            timeout=30
+        )
+        if checkout.returncode != 0:
+            self.log(f"Checkout failed → trying from origin")
+            create = self.git_service._run_git_command(
+                [self.git_cmd, "checkout", "-b", config.branch, f"origin/{config.branch}"],
                 cwd=repo_dir,
                 timeout=30
             )
-            if checkout.returncode != 0:
-                self.log(f"Checkout failed → trying from origin")
-                create = self.git_service._run_git_command(
-                    [self.git_cmd, "checkout", "-b", config.branch, f"origin/{config.branch}"],
-                    cwd=repo_dir,
-                    timeout=30
-                )
-                if create.returncode != 0:
-                    raise Exception(f"Cannot checkout branch: {config.branch}")
-
-            current = self.git_service.get_current_branch(repo_dir)
-            commit = self.git_service.get_commit_hash(repo_dir)[:8]
-            self.log(f"✓ Checked out: {current} ({commit})")
-
-            # 4. Skip if cached
-            if not force and not self.build_cache.should_build(config.service_name, str(repo_dir)):
+            if create.returncode != 0:
+                raise Exception(f"Cannot checkout branch: {config.branch}")
+
+        current = self.git_service.get_current_branch(repo_dir)
+        commit = self.git_service.get_commit_hash(repo_dir)
+        ctx.result["commit"] = commit
+        self.log(f"✓ Checked out: {current} ({commit[:8]})")
+
+    def _stage_check(self, ctx: BuildContext):
+        """Stage 2: decide whether and what to build"""
+        config, result, repo_dir = ctx.config, ctx.result, ctx.repo_dir
+
+        # 4. Skip if cached and the outputs of that build are still in the workspace
+        with tracing.span("source hash", cat="cache") as span_args:
+            tree = self.build_cache.hasher.hash_tree(repo_dir)
+            span_args.update(files=tree.files, hashed=tree.hashed)
+        ctx.source_hash = tree.root
+        self.log(f"🌳 Source tree: {tree.root[:12]} ({tree.files} files, {tree.hashed} re-hashed, {tree.seconds:.2f}s)")
+        ctx.cache_key = self.cache_key(ctx)
+        if (not ctx.force
+                and not self.build_cache.should_build(config.service_name, str(repo_dir), ctx.cache_key, tree.root,
+                                                  copy=self._working_copy(config))
+                and self._has_build_outputs(repo_dir)):
+            result["status"] = "skipped"
+            result["artifact_key"] = self._cached_artifact_key(config)
+            ctx.done = True
+            self.log(f"⚡ SKIPPED (cached) - {config.service_name} {time.time() - ctx.start_time:.1f}s")
+            return
+
+        # 5. Verify pom.xml
+        if not (repo_dir / "pom.xml").exists():
+            raise Exception("pom.xml not found")
+
+        # 6. Incremental: rebuild only modules changed since the cached commit
+        if config.incremental and not ctx.force:
+            cached = self.build_cache.get_cache_info(config.service_name, self._working_copy(config)) or {}
+            with tracing.span("incremental plan", cat="cache"):
+                plan = self.incremental.plan(repo_dir, cached.get("commit"), config.skip_tests,
+                                             repo_url=config.repo_url,
+                                             cone=ctx.sparse.cone if ctx.sparse else None)
+            result["build_mode"] = plan.mode
+            self.log(f"🔍 Incremental: {plan.mode} - {plan.reason} ({len(plan.changed_files)} files changed)")
+
+            if plan.mode == "skip":
+                self._mark_built(ctx, new_outputs=False)
                 result["status"] = "skipped"
-                result["duration"] = time.time() - start_time
-                self.log(f"⚡ SKIPPED (cached) - {result['duration']:.1f}s")
-                return result
-
-            # 5. Verify pom.xml
-            if not (repo_dir / "pom.xml").exists():
-                raise Exception("pom.xml not found")
-
-            # 6. BUILD COMMAND - ULTRA OPTIMIZED
-            self.log(f"🚀 Starting ULTRA-FAST Maven build...")
-
-            maven_threads = max(config.maven_threads, self.sys_info.cpu_logical_count)
-
-            cmd = [
-                self.maven_cmd,
-                "clean", "install",
-                f"-T",
-                f"{maven_threads}C",  # Separate argument for better parsing
-            ]
-
-            # AGGRESSIVE SKIP FLAGS
-            if config.skip_tests:
-                cmd.extend(["-DskipTests", "-Dmaven.test.skip=true"])
-
-            cmd.extend([
-                "-Drat.skip=true",
-                "-Denforcer.skip=true",
-                "-Dcheckstyle.skip=true",
-                "-Dpmd.skip=true",
-                "-Dcpd.skip=true",
-                "-Dspotbugs.skip=true",
-                "-Dfindbugs.skip=true",
-            ])
-
-            if config.skip_javadoc:
-                cmd.extend([
-                    "-Dmaven.javadoc.skip=true",
-                    "-Djavadoc.skip=true",
-                ])
-
-            if config.skip_source:
-                cmd.append("-Dmaven.source.skip=true")
-
-            # Custom local repository
-            cmd.append(f"-Dmaven.repo.local={self.workspace_dir}/.m2/repository")
-
-            # Offline mode
-            if config.offline_mode:
-                cmd.append("-o")
-                self.log("📴 OFFLINE MODE - Using local cache only")
-
-            # Settings file
-            if config.settings_file and Path(config.settings_file).exists():
-                cmd.extend(["-s", config.settings_file])
-
-            # Profiles
-            if config.maven_profiles:
-                cmd.append(f"-P{','.join(config.maven_profiles)}")
+                ctx.done = True
+                self.log(f"⚡ SKIPPED (no build-relevant changes) - {config.service_name}")
+                return
+
+            if plan.mode == "modules":
+                ctx.build_modules = plan.modules
+                result["modules"] = plan.modules
+                self.log(f"   Modules: {', '.join(plan.modules)} (+ dependents)")
+        else:
+            result["build_mode"] = "full"
+
+    def _stage_build(self, ctx: BuildContext):
+        """Stage 3 (CPU): restore an identical earlier build, or run Maven"""
+        config, result, repo_dir = ctx.config, ctx.result, ctx.repo_dir
+
+        # 7. Restore instead of running Maven; only here are the upstream builds final
+        if config.artifact_cache:
+            ctx.artifact_key = self.artifact_key(ctx)
+            if ctx.artifact_key is None:
+                self.log(f"📦 No artifact key for {config.service_name}: an upstream build has none")
+            elif not ctx.force:
+                with tracing.span("artifact restore", cat="cache") as span_args:
+                    restored = self.artifact_store.restore(ctx.artifact_key, repo_dir, self.local_repo)
+                    span_args["hit"] = restored
+                if restored:
+                    self._mark_built(ctx)
+                    result["status"] = "skipped"
+                    result["restored"] = True
+                    ctx.done = True
+                    self.log(f"♻️ RESTORED from artifact cache ({ctx.artifact_key[:12]}) - "
+                             f"{config.service_name} {time.time() - ctx.start_time:.1f}s")
+                    return
+
+        # 8. BUILD COMMAND - ULTRA OPTIMIZED
+        self.log(f"🚀 Starting ULTRA-FAST Maven build: {config.service_name}")
+
+        maven_threads = max(config.maven_threads, self.sys_info.cpu_logical_count)
+
+        cmd = [
+            "clean", "install",
+            f"-T",
+            f"{maven_threads}C",  # Separate argument for better parsing
+        ]
 
-            # PERFORMANCE FLAGS
+        if ctx.sparse and ctx.sparse.reactor_file:
+            # The root pom lists modules that aren't checked out
+            cmd.extend(["-f", ctx.sparse.reactor_file])
+        if ctx.build_modules:
+            cmd.extend(["-pl", ",".join(ctx.build_modules), "-amd"])
+
+        # AGGRESSIVE SKIP FLAGS
+        if config.skip_tests:
+            cmd.extend(["-DskipTests", "-Dmaven.test.skip=true"])
+
+        cmd.extend([
+            "-Drat.skip=true",
+            "-Denforcer.skip=true",
+            "-Dcheckstyle.skip=true",
+            "-Dpmd.skip=true",
+            "-Dcpd.skip=true",
+            "-Dspotbugs.skip=true",
+            "-Dfindbugs.skip=true",
+        ])
+
+        if config.skip_javadoc:
             cmd.extend([
-                "-B",  # Batch mode
-                "-q",  # Quiet mode
-                "-Dstyle.color=never",
-                "-Dmaven.artifact.threads=16",
-                "-Daether.connector.basic.threads=16",
+                "-Dmaven.javadoc.skip=true",
+                "-Djavadoc.skip=true",
             ])
 
-            # Environment with ULTRA-OPTIMIZED JVM options
-            env = os.environ.copy()
-            env["MAVEN_OPTS"] = self.get_ultra_optimized_maven_opts(config)
-            env["MAVEN_OPTS"] += " -Dmaven.wagon.http.pool=true"
-            env["MAVEN_OPTS"] += " -Dmaven.wagon.http.retryHandler.count=2"
-
-            self.log(f"JVM Heap: {env['MAVEN_OPTS'][:80]}...")
-            self.log(f"Using {maven_threads} CPU cores for parallel build")
-
-            # RUN MAVEN with proper Windows handling
+        if config.skip_source:
+            cmd.append("-Dmaven.source.skip=true")
+
+        # Custom local repository
+        cmd.append(f"-Dmaven.repo.local={self.local_repo}")
+
+        # Offline mode
+        if config.offline_mode:
+            cmd.append("-o")
+            self.log("📴 OFFLINE MODE - Using local cache only")
+
+        # Settings file
+        if config.settings_file and Path(config.settings_file).exists():
+            cmd.extend(["-s", config.settings_file])
+
+        # Profiles
+        if config.maven_profiles:
+            cmd.append(f"-P{','.join(config.maven_profiles)}")
+
+        # PERFORMANCE FLAGS
+        cmd.extend([
+            "-B",  # Batch mode
+            "-q",  # Quiet mode
+            "-Dstyle.color=never",
+            "-Dmaven.artifact.threads=16",
+            "-Daether.connector.basic.threads=16",
+        ])
+
+        # Environment with ULTRA-OPTIMIZED JVM options
+        env = os.environ.copy()
+        env["MAVEN_OPTS"] = self.get_ultra_optimized_maven_opts(config)
+        env["MAVEN_OPTS"] += " -Dmaven.wagon.http.pool=true"
+        env["MAVEN_OPTS"] += " -Dmaven.wagon.http.retryHandler.count=2"
+
+        self.log(f"JVM Heap: {env['MAVEN_OPTS'][:80]}...")
+        self.log(f"Using {maven_threads} CPU cores for parallel build")
+
+        executor = self.select_executor(config)
+        cmd, env = executor.prepare(cmd, env)
+        result["backend"] = executor.name
+
+        # RUN MAVEN with proper Windows handling
+        ctx.resources = ResourceSeries()
+        lease_start = time.time()
+        with executor.lease(), tracing.span("maven", cat="maven", backend=executor.name,
+                                            modules=len(ctx.build_modules)) as span_args:
             build_start = time.time()
-            proc = self._run_maven_command(cmd, str(repo_dir), env, timeout=1800)
-            build_time = time.time() - build_start
-
-            if proc.returncode == 0:
-                result["status"] = "success"
-                self.build_cache.mark_built(config.service_name, str(repo_dir), config.branch)
-                total_time = time.time() - start_time
-                self.log(f"✅ SUCCESS - Build: {build_time:.1f}s, Total: {total_time:.1f}s")
-                self.log(f"   Speed: {(build_time/60):.1f} minutes")
-            else:
-                result["status"] = "failed"
-                result["error"] = proc.stderr[-1000:] if proc.stderr else "Build failed"
-                self.log(f"❌ FAILED - {time.time()-start_time:.1f}s")
-
-                if proc.stderr:
-                    error_lines = proc.stderr.strip().split('\n')
-                    self.log("Last 15 error lines:")
-                    for line in error_lines[-15:]:
-                        self.log(f"   {line}")
-
-        except subprocess.TimeoutExpired:
-            result["status"] = "timeout"
-            result["error"] = "Build timeout (30 minutes exceeded)"
-            self.log(f"⏱️ TIMEOUT after 30 minutes")
-        except Exception as e:
-            result["status"] = "error"
-            result["error"] = str(e)
-            self.log(f"❌ ERROR: {e}")
-            import traceback
-            self.log(traceback.format_exc())
+            span_args["lease_wait_s"] = round(build_start - lease_start, 2)
+            proc = self._run_maven_command(cmd, str(repo_dir), env, timeout=1800,
+                                           label=config.service_name, on_start=ctx.attach,
+                                           series=ctx.resources)
+            ctx.build_time = time.time() - build_start
+            span_args["returncode"] = proc.returncode
+        ctx.proc = proc
+
+    def _stage_record(self, ctx: BuildContext):
+        """Stage 4: record the outcome in the cache and the result"""
+        config, result, repo_dir, proc = ctx.config, ctx.result, ctx.repo_dir, ctx.proc
+        build_time = ctx.build_time
+
+        usage = self._record_telemetry(ctx)
+
+        if proc.returncode == 0:
+            result["status"] = "success"
+            self._mark_built(ctx)
+            total_time = time.time() - ctx.start_time
+            self.log(f"✅ SUCCESS {config.service_name} - Build: {build_time:.1f}s, Total: {total_time:.1f}s")
+            self.log(f"   Speed: {(build_time/60):.1f} minutes")
+            if usage.get("samples") and result.get("backend") == "mvn":
+                # Only a plain mvn tree contains the build itself; mvnd builds run in the daemon
+                self.admission.record_usage(config.service_name, usage["peak_rss_mb"],
+                                            usage["avg_cpu_percent"] / 100.0)
+            if ctx.artifact_key:
+                try:
+                    with tracing.span("artifact save", cat="cache"):
+                        saved = self.artifact_store.save(ctx.artifact_key, repo_dir, self.local_repo,
+                                                         config.service_name)
+                    if saved:
+                        self.log(f"📦 Stored artifacts of {config.service_name} ({ctx.artifact_key[:12]})")
+                except OSError as e:
+                    self.log(f"⚠️ Could not store artifacts of {config.service_name}: {e}")
+        else:
+            result["status"] = "failed"
+            # Maven reports [ERROR] lines on stdout, so fall back to its tail
+            tail = proc.stderr.strip() or proc.stdout.strip()
+            result["error"] = tail[-1000:] if tail else "Build failed"
+            self.log(f"❌ FAILED {config.service_name} - {time.time()-ctx.start_time:.1f}s")
+
+            if tail:
+                error_lines = tail.split('\n')
+                self.log("Last 15 error lines:")
+                for line in error_lines[-15:]:
+                    self.log(f"   {line}")
+
+    def _record_telemetry(self, ctx: BuildContext) -> Dict:
+        """Put peak/average usage in the result and keep the series for the API"""
+        if ctx.resources is None:
+            return {}
+        usage = ctx.resources.summary()
+        ctx.result["resources"] = usage
+        if usage.get("samples"):
+            ctx.result["peak_rss_mb"] = usage["peak_rss_mb"]
+            self.log(f"📈 {ctx.config.service_name}: peak {usage['peak_rss_mb']:.0f} MB RSS, "
+                     f"avg {usage['avg_cpu_percent']:.0f}% CPU, {usage['peak_processes']} processes")
+        with self.telemetry_lock:
+            self.telemetry.pop(ctx.config.service_name, None)
+            self.telemetry[ctx.config.service_name] = {
+                "service": ctx.config.service_name,
+                "branch": ctx.config.branch,
+                "backend": ctx.result.get("backend"),
+                "finished": time.time(),
+                "summary": usage,
+                "series": ctx.resources
+            }
+            while len(self.telemetry) > self.telemetry_limit:
+                self.telemetry.popitem(last=False)
+        return usage
+
+    def telemetry_summary(self) -> List[Dict]:
+        """Latest usage per service, biggest memory consumers first"""
+        with self.telemetry_lock:
+            rows = [{k: v for k, v in entry.items() if k != "series"} for entry in self.telemetry.values()]
+        return sorted(rows, key=lambda r: r["summary"].get("peak_rss_mb", 0), reverse=True)
+
+    def telemetry_series(self, service_name: str, max_points: int = 600) -> Optional[Dict]:
+        with self.telemetry_lock:
+            entry = self.telemetry.get(service_name)
+        if entry is None:
+            return None
+        return dict({k: v for k, v in entry.items() if k != "series"},
+                    series=entry["series"].to_dict(max_points))
+
+    def get_trace(self, job_id: str) -> Optional[Dict]:
+        """Chrome trace of a running batch, or of a finished one from history"""
+        tracer = self.tracers.get(job_id)
+        if tracer is not None:
+            return tracer.to_chrome()
+        return self.history.get_trace(job_id)
+
+    @staticmethod
+    def estimate_eta(graph: DependencyGraph, remaining: set, expected: Dict[str, float],
+                     slots: int, fallback: float) -> Tuple[float, float]:
+        """
+        Seconds until the batch finishes, and the remaining critical path
 
-        result["duration"] = time.time() - start_time
-        return result
+        Services without history are assumed to take the median of those
+        with history (or fallback, the batch's running average). The batch
+        can finish no sooner than its longest remaining dependency chain,
+        nor sooner than the remaining work spread over every build slot.
+        """
+        if not remaining:
+            return 0.0, 0.0
+        known = sorted(expected.values())
+        default = known[len(known) // 2] if known else fallback
+        weights = {n: expected.get(n, default) for n in remaining}
+        critical = max(graph.critical_path_lengths(weights, only=remaining).values(), default=0.0)
+        spread = sum(weights.values()) / max(1, slots)
+        return max(critical, spread), critical
+
+    def pipeline_status(self) -> Dict:
+        """Per-stage queue depths, summed over running batches and per job"""
+        jobs = {job_id: p.status() for job_id, p in list(self.pipelines.items())}
+        stages: Dict[str, Dict] = {}
+        waiting: Dict[str, int] = {}
+        for status in jobs.values():
+            for stage, values in status["stages"].items():
+                total = stages.setdefault(stage, {"workers": values["workers"], "queued": 0, "active": 0, "done": 0})
+                for key in ("queued", "active", "done"):
+                    total[key] += values[key]
+            for key, count in status["waiting"].items():
+                waiting[key] = waiting.get(key, 0) + count
+        for stage, size in dict(self.stage_workers, build=self.max_workers).items():
+            stages.setdefault(stage, {"workers": size, "queued": 0, "active": 0, "done": 0})["workers"] = size
+        git = self.git_service.engine.stats() if self.git_service else None
+        return {"stages": stages, "waiting": waiting, "jobs": jobs, "git": git}
+
+    def build_services(self, configs: List[BuildConfig], force: bool = False,
+                       job_id: Optional[str] = None, cancel_event: Optional[threading.Event] = None,
+                       max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Build multiple services in parallel with MAXIMUM resource utilization
 
-    def build_services(self, configs: List[BuildConfig], force: bool = False) -> List[Dict]:
-        """Build multiple services in parallel with MAXIMUM resource utilization"""
-        self.build_start_time = time.time()
+        Concurrent calls share the stage pools and the admission budget;
+        max_workers caps this batch's build slots below the global limit.
+        """
+        batch_start = time.time()
+        self.build_start_time = batch_start
+        job_id = job_id or f"batch-{int(batch_start * 1000)}"
+        job_workers = min(max_workers or self.max_workers, self.max_workers)
 
         self.log(f"\n{'='*70}")
-        self.log(f"🚀 ULTRA-FAST PARALLEL BUILD")
+        self.log(f"🚀 ULTRA-FAST PARALLEL BUILD [{job_id}]")
         self.log(f"{'='*70}")
         self.log(f"Services: {len(configs)}")
-        self.log(f"Parallel Workers: {self.max_workers}")
+        self.log(f"Parallel Workers: up to {job_workers} of {self.max_workers} (memory/CPU admission)")
         self.log(f"CPU Cores: {self.sys_info.cpu_logical_count} (using ALL)")
         self.log(f"Available RAM: {self.sys_info.available_memory_gb:.1f} GB")
         self.log(f"Platform: {'Windows' if self.is_windows else 'Unix'}")
@@ -368,32 +1112,101 @@ class MicroserviceBuilder:
         if not prereqs['git']['available'] or not prereqs['maven']['available']:
             return [{"status": "error", "error": "Git/Maven missing"} for _ in configs]
 
-        results = []
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
-            futures = {pool.submit(self.build_service, c, force): c for c in configs}
-
-            completed = 0
-            total = len(configs)
+        # Room for the batch before it starts, rather than a full disk halfway through
+        self.workspace.pause()
+        repo_dirs = [self._repo_dir(c) for c in configs]
+        self.batch_dirs[job_id] = repo_dirs + [m for m in map(self._mirror_dir, configs) if m]
+        problem = self.workspace.ensure_space([p for dirs in list(self.batch_dirs.values()) for p in dirs],
+                                              self.workspace.expected_growth(repo_dirs))
+        if problem:
+            self.batch_dirs.pop(job_id, None)
+            self.log(f"💾 {problem}")
+            return [{"service": c.service_name, "status": "error", "error": problem} for c in configs]
+
+        graph = self.build_dependency_graph(configs)
+        self.admission.max_slots = self.max_workers
+        self.admission.reset()
+        self.log(f"Memory budget: {self.admission.capacity_mb} MB usable")
+        if any(c.maven_backend == "mvnd" for c in configs):
+            self._size_daemon_pool()
+        stage_workers = dict(self.stage_workers, build=job_workers)
+        self.log(f"Stage pools: sync {stage_workers['sync']}, check {stage_workers['check']}, "
+                 f"build {stage_workers['build']}, record {stage_workers['record']}")
+
+        # Typical durations from history weight the critical path and the ETA
+        names = [c.service_name for c in configs]
+        expected = self.history.estimates(names)
+        self.log(f"Build history: duration estimates for {len(expected)}/{len(names)} services")
+        weights = None
+        if expected:
+            known = sorted(expected.values())
+            weights = {n: expected.get(n, known[len(known) // 2]) for n in names}
+        tracer = Tracer(f"build {job_id}", metadata={"job_id": job_id, "services": names})
+        self.tracers[job_id] = tracer
+        pipeline = BuildPipeline(self, graph, stage_workers, log=self.log, weights=weights,
+                                 admission=self.admission, pools=self.shared_pools(), tracer=tracer)
+        self.pipelines[job_id] = pipeline
+
+        total = len(configs)
+        completed = 0
+        remaining = set(names)
+
+        def on_complete(result: Dict):
+            nonlocal completed
+            completed += 1
+            remaining.discard(result.get("service"))
+            try:
+                self.history.record(result, job_id)
+            except Exception as e:
+                self.log(f"⚠️ Could not record build history: {e}")
+
+            elapsed = time.time() - batch_start
+            eta, critical = self.estimate_eta(graph, remaining, expected, job_workers, elapsed / completed)
+            pipeline.progress = {"completed": completed, "total": total,
+                                 "elapsed_s": round(elapsed, 1), "eta_s": round(eta, 1)}
+
+            self.log(f"\n{'='*70}")
+            self.log(f"Progress: {completed}/{total} ({(completed/total*100):.1f}%)")
+            self.log(f"Elapsed: {elapsed/60:.1f} min | ETA: {eta/60:.1f} min "
+                     f"(critical path {critical/60:.1f} min)")
+            self.log(f"{'='*70}\n")
 
-            for f in as_completed(futures):
-                result = f.result()
-                results.append(result)
-                completed += 1
-
-                elapsed = time.time() - self.build_start_time
-                avg_time = elapsed / completed
-                eta = avg_time * (total - completed)
-
-                self.log(f"\n{'='*70}")
-                self.log(f"Progress: {completed}/{total} ({(completed/total*100):.1f}%)")
-                self.log(f"Elapsed: {elapsed/60:.1f} min | ETA: {eta/60:.1f} min")
-                self.log(f"{'='*70}\n")
+        try:
+            results, queued = [], configs
+            if not force and any(c.preflight for c in configs):
+                unchanged = self.preflight([c for c in configs if c.preflight], tracer)
+                for result in unchanged.values():
+                    results.append(result)
+                    on_complete(result)
+                queued = [c for c in configs if c.service_name not in unchanged]
+            results += pipeline.run(queued, force=force, on_complete=on_complete,
+                                    owner=job_id, cancel_event=cancel_event,
+                                    settled={r["service"]: r for r in results})
+        finally:
+            self.pipelines.pop(job_id, None)
+            self.batch_dirs.pop(job_id, None)
+            self.admission.forget_owner(job_id)
+            # Edges as finally resolved, so the batch can be replayed offline
+            tracer.metadata["edges"] = pipeline.graph.to_dict()["edges"]
+            trace = tracer.to_chrome()
+            try:
+                self.history.save_trace(job_id, trace, services=len(configs))
+            except Exception as e:
+                self.log(f"⚠️ Could not save trace: {e}")
+            self.tracers.pop(job_id, None)
+
+        report = analyze_batch(trace, pipeline.graph, job_workers)
+        try:
+            self.history.save_report(job_id, report)
+        except Exception as e:
+            self.log(f"⚠️ Could not save batch analysis: {e}")
 
-        total_time = time.time() - self.build_start_time
+        total_time = time.time() - batch_start
         success = sum(1 for r in results if r['status'] == 'success')
         failed = sum(1 for r in results if r['status'] == 'failed')
         skipped = sum(1 for r in results if r['status'] == 'skipped')
+        blocked = sum(1 for r in results if r['status'] == 'blocked')
+        cancelled = sum(1 for r in results if r['status'] == 'cancelled')
 
         self.log(f"\n{'='*70}")
         self.log(f"BUILD COMPLETE - {total_time/60:.1f} minutes")
@@ -401,8 +1214,14 @@ class MicroserviceBuilder:
         self.log(f"✅ Success: {success}")
         self.log(f"❌ Failed: {failed}")
         self.log(f"⚡ Skipped: {skipped}")
+        if blocked:
+            self.log(f"⛔ Blocked: {blocked}")
+        if cancelled:
+            self.log(f"🛑 Cancelled: {cancelled}")
         self.log(f"⏱️  Total Time: {total_time/60:.1f} minutes")
         self.log(f"⚡ Average per service: {total_time/len(configs):.1f} seconds")
+        for line in format_report(report):
+            self.log(f"🔬 {line}")
         self.log(f"{'='*70}\n")
 
         return results
\ No newline at end of file
@@ -2,7 +2,9 @@
 Find and verify system commands (Git, Maven)
 """
 
+import shutil
 import subprocess
+import sys
 from pathlib import Path
 from typing import Optional, Dict
 
@@ -10,6 +12,11 @@ from typing import Optional, Dict
 class CommandFinder:
     """Find and verify system commands"""
 
+    def __init__(self):
+        # .cmd launchers need the shell on Windows; elsewhere a list with shell=True
+        # would run the bare command without --version
+        self.is_windows = sys.platform.startswith('win')
+
     def find_git(self) -> Optional[str]:
         """Find Git command"""
         git_locations = ["git", "git.exe"]
@@ -53,6 +60,16 @@ class CommandFinder:
 
         return None
 
+    def find_mvnd(self) -> Optional[str]:
+        """Find the Maven daemon client (mvnd)"""
+        mvnd_locations = ["mvnd", "mvnd.cmd"]
+
+        for mvnd_cmd in mvnd_locations:
+            if shutil.which(mvnd_cmd) and self._verify_command(mvnd_cmd):
+                return mvnd_cmd
+
+        return None
+
     def _verify_command(self, cmd: str) -> bool:
         """Verify if command works"""
         try:
@@ -61,7 +78,7 @@ class CommandFinder:
                 capture_output=True,
                 text=True,
                 timeout=5,
-                shell=True
+                shell=self.is_windows
             )
             return result.returncode == 0
         except:
@@ -75,7 +92,7 @@ class CommandFinder:
                 capture_output=True,
                 text=True,
                 timeout=5,
-                shell=True
+                shell=self.is_windows
             )
 
             if result.returncode == 0:
@@ -105,7 +122,7 @@ class CommandFinder:
                 capture_output=True,
                 text=True,
                 timeout=5,
-                shell=True
+                shell=self.is_windows
             )
 
             if result.returncode == 0:
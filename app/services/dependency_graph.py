@@ -0,0 +1,331 @@
+"""
+Cross-service dependency graph built from Maven pom.xml files
+Orders services so a SNAPSHOT is installed before anything that consumes it
+"""
+
+import os
+import posixpath
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def _strip_ns(tag: str) -> str:
+    """Drop the {namespace} prefix ElementTree puts on every tag"""
+    return tag.split('}', 1)[1] if '}' in tag else tag
+
+
+def _child(elem: ET.Element, name: str) -> Optional[ET.Element]:
+    for child in elem:
+        if _strip_ns(child.tag) == name:
+            return child
+    return None
+
+
+def _text(elem: Optional[ET.Element], name: str) -> Optional[str]:
+    if elem is None:
+        return None
+    child = _child(elem, name)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip() or None
+
+
+@dataclass
+class PomInfo:
+    """Coordinates and references parsed from a single pom.xml"""
+    group_id: Optional[str]
+    artifact_id: Optional[str]
+    version: Optional[str] = None
+    parent: Optional[Tuple[str, str]] = None
+    dependencies: List[Tuple[str, str]] = field(default_factory=list)
+    modules: List[str] = field(default_factory=list)
+    path: str = ""  # module directory relative to the reactor root, "" for the root
+    # What the module can't be built without: direct dependencies and BOM imports,
+    # but not the versions it merely manages
+    requires: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def coordinate(self) -> Optional[Tuple[str, str]]:
+        if self.group_id and self.artifact_id:
+            return (self.group_id, self.artifact_id)
+        return None
+
+
+def parse_pom(pom_file: Path) -> Optional[PomInfo]:
+    """Parse groupId/artifactId, parent, dependencies and modules from a pom"""
+    try:
+        root = ET.parse(str(pom_file)).getroot()
+    except (ET.ParseError, OSError):
+        return None
+    return _pom_info(root)
+
+
+def parse_pom_text(text: str) -> Optional[PomInfo]:
+    """parse_pom for a pom that isn't on disk, e.g. read from a git object"""
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return None
+    return _pom_info(root)
+
+
+def _pom_info(root: ET.Element) -> PomInfo:
+    parent_elem = _child(root, "parent")
+    parent = None
+    if parent_elem is not None:
+        p_group = _text(parent_elem, "groupId")
+        p_artifact = _text(parent_elem, "artifactId")
+        if p_group and p_artifact:
+            parent = (p_group, p_artifact)
+
+    info = PomInfo(
+        group_id=_text(root, "groupId") or (parent[0] if parent else None),
+        artifact_id=_text(root, "artifactId"),
+        version=_text(root, "version") or _text(parent_elem, "version"),
+        parent=parent,
+    )
+
+    # Regular dependencies plus BOM imports from dependencyManagement
+    containers = [(_child(root, "dependencies"), False)]
+    dep_mgmt = _child(root, "dependencyManagement")
+    if dep_mgmt is not None:
+        containers.append((_child(dep_mgmt, "dependencies"), True))
+
+    for container, managed in containers:
+        if container is None:
+            continue
+        for dep in container:
+            if _strip_ns(dep.tag) != "dependency":
+                continue
+            d_group = _text(dep, "groupId")
+            d_artifact = _text(dep, "artifactId")
+            if d_group and d_artifact and "${" not in d_group:
+                info.dependencies.append((d_group, d_artifact))
+                if not managed or _text(dep, "scope") == "import":
+                    info.requires.append((d_group, d_artifact))
+
+    modules_elem = _child(root, "modules")
+    if modules_elem is not None:
+        for module in modules_elem:
+            if _strip_ns(module.tag) == "module" and module.text:
+                info.modules.append(module.text.strip())
+
+    return info
+
+
+def collect_reactor(repo_dir: Path) -> List[PomInfo]:
+    """Parse the root pom and every module pom reachable through <modules>"""
+    root = Path(repo_dir)
+    poms = []
+    seen = set()
+    stack = [root]
+
+    while stack:
+        module_dir = stack.pop()
+        key = str(module_dir.resolve())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        info = parse_pom(module_dir / "pom.xml")
+        if info is None:
+            continue
+        rel = Path(os.path.relpath(module_dir.resolve(), root.resolve())).as_posix()
+        info.path = "" if rel == "." else rel
+        poms.append(info)
+        for module in info.modules:
+            stack.append(module_dir / module)
+
+    return poms
+
+
+def module_dirs(info: PomInfo) -> List[str]:
+    """Directories of a pom's <modules>, relative to the reactor root like info.path"""
+    dirs = []
+    for module in info.modules:
+        child = posixpath.normpath(posixpath.join(info.path, module.replace("\\", "/")))
+        dirs.append("" if child == "." else child)
+    return dirs
+
+
+def reactor_from_files(pom_texts: Dict[str, str]) -> List[PomInfo]:
+    """
+    collect_reactor over poms keyed by their directory ("" for the root,
+    "a/b" for a/b/pom.xml) instead of a working tree
+    """
+    poms = []
+    seen = set()
+    stack = [""]
+
+    while stack:
+        path = stack.pop()
+        if path in seen or path not in pom_texts:
+            continue
+        seen.add(path)
+
+        info = parse_pom_text(pom_texts[path])
+        if info is None:
+            continue
+        info.path = path
+        poms.append(info)
+        stack.extend(module_dirs(info))
+
+    return poms
+
+
+class DependencyGraph:
+    """Directed graph of services: an edge A → B means B consumes an artifact A installs"""
+
+    def __init__(self):
+        self.nodes: List[str] = []
+        self.produces: Dict[str, Set[Tuple[str, str]]] = {}
+        self.consumes: Dict[str, Set[Tuple[str, str]]] = {}
+        self.upstream: Dict[str, Set[str]] = {}
+        self.downstream: Dict[str, Set[str]] = {}
+        self.cycles: List[List[str]] = []
+
+    def add_service(self, name: str, poms: List[PomInfo]):
+        """Register a service with the artifacts it produces and consumes"""
+        if name not in self.upstream:
+            self.nodes.append(name)
+        produced = {p.coordinate for p in poms if p.coordinate}
+        consumed = set()
+        for pom in poms:
+            consumed.update(pom.dependencies)
+            if pom.parent:
+                consumed.add(pom.parent)
+
+        self.produces[name] = produced
+        self.consumes[name] = consumed - produced
+        self.upstream[name] = set()
+        self.downstream[name] = set()
+
+    def link(self):
+        """Resolve consumed coordinates into service-to-service edges"""
+        owner = {}
+        for name, coords in self.produces.items():
+            for coord in coords:
+                owner.setdefault(coord, name)
+
+        self.cycles = []
+        for name in self.nodes:
+            self.upstream[name] = set()
+            self.downstream[name] = set()
+
+        for name in self.nodes:
+            for coord in self.consumes[name]:
+                producer = owner.get(coord)
+                if producer and producer != name:
+                    self.upstream[name].add(producer)
+                    self.downstream[producer].add(name)
+
+        self._break_cycles()
+
+    def _break_cycles(self):
+        """Drop edges inside dependency cycles so the graph stays schedulable"""
+        for component in self._strongly_connected():
+            if len(component) < 2:
+                continue
+            self.cycles.append(sorted(component))
+            for name in component:
+                self.upstream[name] -= component
+                self.downstream[name] -= component
+
+    def _strongly_connected(self) -> List[Set[str]]:
+        """Kosaraju's algorithm, iterative so deep graphs don't hit the recursion limit"""
+        finished = []
+        seen = set()
+        for start in self.nodes:
+            if start in seen:
+                continue
+            seen.add(start)
+            stack = [(start, iter(sorted(self.downstream[start])))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    finished.append(node)
+                elif child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(sorted(self.downstream[child]))))
+
+        components = []
+        assigned = set()
+        for start in reversed(finished):
+            if start in assigned:
+                continue
+            component = {start}
+            assigned.add(start)
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                for parent in self.upstream[node]:
+                    if parent not in assigned:
+                        assigned.add(parent)
+                        component.add(parent)
+                        stack.append(parent)
+            components.append(component)
+        return components
+
+    def levels(self) -> List[List[str]]:
+        """Group services into topological levels; each level only depends on earlier ones"""
+        level_of = {}
+        for name in self.topological_order():
+            parents = self.upstream[name]
+            level_of[name] = 1 + max((level_of[p] for p in parents), default=-1)
+
+        levels: List[List[str]] = []
+        for name in self.nodes:
+            level = level_of[name]
+            while len(levels) <= level:
+                levels.append([])
+            levels[level].append(name)
+        return levels
+
+    def topological_order(self) -> List[str]:
+        indegree = {n: len(self.upstream[n]) for n in self.nodes}
+        queue = [n for n in self.nodes if indegree[n] == 0]
+        order = []
+        while queue:
+            node = queue.pop(0)
+            order.append(node)
+            for child in sorted(self.downstream[node]):
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        return order
+
+    def critical_path_lengths(self, weights: Optional[Dict[str, float]] = None,
+                              only: Optional[Set[str]] = None) -> Dict[str, float]:
+        """Longest weighted path from each service to the end of the graph (inclusive)
+
+        With only given, paths are restricted to that subset (e.g. unfinished services).
+        """
+        weights = weights or {}
+        lengths: Dict[str, float] = {}
+        for name in reversed(self.topological_order()):
+            if only is not None and name not in only:
+                continue
+            tail = max((lengths[c] for c in self.downstream[name] if c in lengths), default=0.0)
+            lengths[name] = weights.get(name, 1.0) + tail
+        return lengths
+
+    def to_dict(self) -> Dict:
+        return {
+            'nodes': list(self.nodes),
+            'edges': [[p, n] for n in self.nodes for p in sorted(self.upstream[n])],
+            'levels': self.levels(),
+            'cycles': self.cycles,
+        }
+
+    @classmethod
+    def from_repos(cls, repos: Dict[str, Path]) -> "DependencyGraph":
+        """Build the graph from {service_name: repo_dir}; repos without a pom get no edges"""
+        graph = cls()
+        for name, repo_dir in repos.items():
+            graph.add_service(name, collect_reactor(repo_dir))
+        graph.link()
+        return graph
@@ -0,0 +1,355 @@
+"""
+Asynchronous git engine
+Runs every git process from one event loop in a background thread: pipes are
+drained by the loop instead of reader threads, and clones/fetches are bounded
+by a network limit of their own rather than by how many pool threads wait on git
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import psutil
+
+from .process_runner import LineCallback
+
+# Subcommands that talk to a remote and count against the network limit
+NETWORK_COMMANDS = {"clone", "fetch", "ls-remote", "pull", "push"}
+
+# Return code of a command that was cancelled (killed, or never started)
+CANCELLED = -9
+
+_local = threading.local()
+
+
+def subcommand(args: List[str]) -> str:
+    """The git subcommand of an argument list (git -c k=v -C dir fetch ... → fetch)"""
+    idx = 1
+    while idx < len(args):
+        arg = str(args[idx])
+        if arg in ("-c", "-C"):
+            idx += 2
+            continue
+        if not arg.startswith("-"):
+            return arg
+        idx += 1
+    return ""
+
+
+def _kill_tree(pid: int):
+    """Kill a process and its children without waiting, so the event loop never blocks"""
+    try:
+        parent = psutil.Process(pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+
+class CancelToken:
+    """Cancels every engine command started under it, including ones still queued"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.tasks: Dict[asyncio.Task, asyncio.AbstractEventLoop] = {}
+        self.lock = threading.Lock()
+
+    def _attach(self, task: asyncio.Task) -> bool:
+        with self.lock:
+            if self.cancelled:
+                return False
+            self.tasks[task] = task.get_loop()
+            return True
+
+    def _detach(self, task: asyncio.Task):
+        with self.lock:
+            self.tasks.pop(task, None)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            tasks = list(self.tasks.items())
+        for task, loop in tasks:
+            loop.call_soon_threadsafe(task.cancel)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    """Commands run by this thread inside the block are cancelled by token"""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+class _Limiter:
+    """Counting semaphore whose limit can change while commands wait on it"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiters = deque()
+
+    async def acquire(self):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancel landed
+                self.release()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def set_limit(self, limit: int):
+        self.limit = max(1, limit)
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.active < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+
+class _Output:
+    """Collects one pipe: lines forwarded to on_line in text mode, raw bytes otherwise"""
+
+    def __init__(self, name: str, on_line: Optional[LineCallback], tail_lines: int,
+                 keep_all: bool, text: bool):
+        self.name = name
+        self.on_line = on_line
+        self.text = text
+        self.tail = deque(maxlen=tail_lines)
+        self.lines: Optional[List[str]] = [] if keep_all else None
+        self.data = b""
+
+    async def drain(self, stream: asyncio.StreamReader):
+        if not self.text:
+            self.data = await stream.read()
+            return
+        pending = b""
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            *complete, pending = (pending + chunk).split(b"\n")
+            for raw in complete:
+                self._line(raw)
+        if pending:
+            self._line(pending)
+
+    def _line(self, raw: bytes):
+        line = raw.decode('utf-8', errors='replace').rstrip('\r')
+        self.tail.append(line)
+        if self.lines is not None:
+            self.lines.append(line)
+        if self.on_line:
+            try:
+                self.on_line(self.name, line)
+            except Exception:
+                pass
+
+    def value(self):
+        if not self.text:
+            return self.data
+        lines = self.lines if self.lines is not None else self.tail
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+
+class GitEngine:
+    """
+    Runs git commands concurrently on one event loop
+
+    run() blocks the calling thread until the command ends, submit() returns
+    a Future so one thread can keep hundreds of commands in flight. Network
+    commands wait for one of network_limit slots; local ones start at once.
+    Timeouts kill the process tree and raise subprocess.TimeoutExpired like
+    subprocess.run; cancelled commands return code CANCELLED.
+    """
+
+    def __init__(self, network_limit: int = 16):
+        self.network = _Limiter(network_limit)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.start_lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.is_windows = sys.platform.startswith('win')
+
+    @property
+    def network_limit(self) -> int:
+        return self.network.limit
+
+    def set_network_limit(self, limit: int):
+        if self.loop is None:
+            self.network.set_limit(limit)
+        else:
+            self.loop.call_soon_threadsafe(self.network.set_limit, limit)
+
+    def stats(self) -> Dict:
+        return {
+            "network_limit": self.network.limit,
+            "network_active": self.network.active,
+            "network_queued": len(self.network.waiters),
+            "running": self.running,
+            "completed": self.completed
+        }
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self.start_lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self.thread = threading.Thread(target=self._serve, args=(loop, ready),
+                                               name="git-engine", daemon=True)
+                self.thread.start()
+                ready.wait()
+                self.loop = loop
+            return self.loop
+
+    def _serve(self, loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        if sys.version_info < (3, 12) and hasattr(os, "pidfd_open"):
+            # The default watcher before 3.12 parks a thread in waitpid() per child
+            try:
+                os.close(os.pidfd_open(os.getpid()))
+                watcher = asyncio.PidfdChildWatcher()
+                watcher.attach_loop(loop)
+                asyncio.set_child_watcher(watcher)
+            except OSError:
+                pass
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+               input: Optional[bytes] = None, on_line: Optional[LineCallback] = None,
+               text: bool = True, keep_stdout: bool = True, tail_lines: int = 200,
+               env: Optional[Dict] = None, cancel: Optional[CancelToken] = None) -> Future:
+        """
+        Start a command and return a Future of its CompletedProcess
+
+        stdout/stderr are str in text mode (lines also go to on_line; stderr
+        is a tail_lines tail) and bytes otherwise. cancel defaults to the
+        token of the enclosing cancel_scope.
+        """
+        token = cancel if cancel is not None else getattr(_local, "token", None)
+        job = self._job(list(args), cwd, timeout, input, on_line, text, keep_stdout, tail_lines, env, token)
+        return asyncio.run_coroutine_threadsafe(job, self._start())
+
+    def run(self, args: List[str], **kwargs) -> subprocess.CompletedProcess:
+        """Run a command and wait for it; same arguments as submit()"""
+        future = self.submit(args, **kwargs)
+        try:
+            return future.result()
+        except CancelledError:
+            return subprocess.CompletedProcess(args, CANCELLED, "", "Cancelled\n")
+        except BaseException:
+            # The caller is going away (KeyboardInterrupt, say): take the process with it
+            future.cancel()
+            raise
+
+    async def _job(self, args, cwd, timeout, input, on_line, text, keep_stdout, tail_lines, env,
+                   token: Optional[CancelToken]) -> subprocess.CompletedProcess:
+        task = asyncio.current_task()
+        cancelled = subprocess.CompletedProcess(args, CANCELLED, "" if text else b"",
+                                                "Cancelled\n" if text else b"Cancelled\n")
+        if token is not None and not token._attach(task):
+            return cancelled
+        network = subcommand(args) in NETWORK_COMMANDS
+        try:
+            if network:
+                await self.network.acquire()
+            try:
+                return await self._spawn(args, cwd, timeout, input, on_line, text, keep_stdout, tail_lines, env)
+            finally:
+                if network:
+                    self.network.release()
+        except asyncio.CancelledError:
+            return cancelled
+        finally:
+            if token is not None:
+                token._detach(task)
+
+    async def _spawn(self, args, cwd, timeout, input, on_line, text, keep_stdout, tail_lines,
+                     env) -> subprocess.CompletedProcess:
+        proc = await asyncio.create_subprocess_exec(
+            *[str(a) for a in args],
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if self.is_windows else 0
+        )
+        started = time.perf_counter()
+        self.running += 1
+        out = _Output("stdout", on_line, tail_lines, keep_stdout, text)
+        err = _Output("stderr", on_line, tail_lines, False, text)
+
+        async def feed():
+            if input is None:
+                return
+            try:
+                proc.stdin.write(input)
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            proc.stdin.close()
+
+        gathered = asyncio.gather(out.drain(proc.stdout), err.drain(proc.stderr), feed(), proc.wait())
+        # A timeout or cancel ends the gather with CancelledError; retrieve it so it isn't logged
+        gathered.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            await asyncio.wait_for(gathered, timeout)
+        except asyncio.TimeoutError:
+            _kill_tree(proc.pid)
+            await proc.wait()
+            raise subprocess.TimeoutExpired(args, timeout, output=out.value(), stderr=err.value())
+        except BaseException:
+            _kill_tree(proc.pid)
+            await proc.wait()
+            raise
+        finally:
+            self.running -= 1
+            self.completed += 1
+        result = subprocess.CompletedProcess(args, proc.returncode, out.value(), err.value())
+        # When the process really ran, queueing for a network slot excluded (perf_counter seconds)
+        result.started, result.ended = started, time.perf_counter()
+        return result
+
+
+_shared: Optional[GitEngine] = None
+_shared_lock = threading.Lock()
+
+
+def shared_engine() -> GitEngine:
+    """The process-wide engine, so every GitService shares one network limit"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = GitEngine()
+        return _shared
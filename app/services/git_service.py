@@ -9,15 +9,20 @@ import shutil
 import sys
 import traceback
 from pathlib import Path
-from typing import Optional, List, Callable
+from typing import Optional, List, Callable, Dict
+
+from . import tracing
+from .git_engine import GitEngine, shared_engine
 
 
 class GitService:
     """Robust Git service with Windows long path support"""
 
-    def __init__(self, git_cmd: str = "git", timeout: int = 600):
+    def __init__(self, git_cmd: str = "git", timeout: int = 600, engine: Optional[GitEngine] = None):
         self.git_cmd = git_cmd
         self.timeout = timeout
+        # Every command runs on the engine's event loop, under its network limit
+        self.engine = engine or shared_engine()
         self.log_callback: Optional[Callable[[str], None]] = None
         self.is_windows = sys.platform.startswith('win')
 
@@ -70,24 +75,25 @@ class GitService:
         if cwd:
             self.log(f"   CWD: {cwd}")
 
+        def forward(stream: str, line: str):
+            if line.strip():
+                self.log(f"   {stream.upper()}: {line}")
+
         try:
             # Use shell=False with list args on ALL platforms
             # This is Method 3 from the test - it works!
-            result = subprocess.run(
-                args,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                shell=False,  # Works for both Git and Maven!
-                creationflags=subprocess.CREATE_NO_WINDOW if self.is_windows else 0
-            )
-
-            if result.stdout.strip():
-                self.log(f"   STDOUT: {result.stdout.strip()}")
-            if result.stderr.strip():
-                self.log(f"   STDERR: {result.stderr.strip()}")
-
+            # Output is streamed line by line; stdout is kept whole because
+            # callers parse it, stderr only as a bounded tail
+            with tracing.span(f"git {args[1] if len(args) > 1 else ''}".strip(), cat="git",
+                              cmd=' '.join(str(x) for x in args[1:])[:200]) as span_args:
+                result = self.engine.run(
+                    args,
+                    cwd=cwd,
+                    timeout=timeout,
+                    on_line=forward,
+                    keep_stdout=True
+                )
+                span_args["returncode"] = result.returncode
             return result
 
         except FileNotFoundError:
@@ -101,6 +107,25 @@ class GitService:
             self.log(f"Unexpected error: {e}")
             raise
 
+    def _capture_git(self, args: List[str], cwd: Path, input_bytes: bytes = None,
+                     timeout: int = None) -> subprocess.CompletedProcess:
+        """Run a plumbing command whose output is parsed rather than logged; stdout stays bytes"""
+        self.log(f"Running: {' '.join(str(x) for x in args)}")
+        with tracing.span(f"git {args[1] if len(args) > 1 else ''}".strip(), cat="git",
+                          cmd=' '.join(str(x) for x in args[1:])[:200]) as span_args:
+            result = self.engine.run(
+                args,
+                cwd=str(Path(cwd).resolve()),
+                input=input_bytes,
+                timeout=timeout or self.timeout,
+                text=False
+            )
+            span_args["returncode"] = result.returncode
+        if result.returncode != 0:
+            for line in result.stderr.decode('utf-8', errors='replace').splitlines()[-5:]:
+                self.log(f"   STDERR: {line}")
+        return result
+
     def get_current_branch(self, repo_path: Path) -> Optional[str]:
         try:
             result = self._run_git_command(
@@ -185,7 +210,203 @@ class GitService:
             self.log(traceback.format_exc())
             return []
 
+    @staticmethod
+    def git_dir(repo_path: Path) -> Path:
+        """.git of a working copy, the worktree's own git dir, or the repo itself when it is bare"""
+        dot_git = Path(repo_path) / ".git"
+        if dot_git.is_file():
+            try:
+                line = dot_git.read_text(encoding='utf-8').split("\n", 1)[0].strip()
+            except OSError:
+                return dot_git
+            if line.startswith("gitdir:"):
+                return (Path(repo_path) / line[7:].strip()).resolve()
+        return dot_git if dot_git.is_dir() or not (Path(repo_path) / "HEAD").is_file() else Path(repo_path)
+
+    @staticmethod
+    def read_ref(repo_path: Path, ref: str) -> Optional[str]:
+        """Resolve HEAD, FETCH_HEAD or refs/... by reading the git dir directly, without a git process"""
+        git_dir = GitService.git_dir(repo_path)
+        try:
+            for _ in range(5):  # follow symbolic refs (HEAD → refs/heads/...)
+                ref_file = git_dir / ref
+                if not ref_file.is_file():
+                    break
+                value = ref_file.read_text(encoding='utf-8').split("\n", 1)[0].strip()
+                if not value.startswith("ref: "):
+                    sha = value.split()[0] if value else ""
+                    return sha if len(sha) == 40 else None
+                ref = value[5:]
+
+            packed = git_dir / "packed-refs"
+            if packed.is_file():
+                for line in packed.read_text(encoding='utf-8').splitlines():
+                    parts = line.split(" ", 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        except OSError:
+            pass
+        return None
+
+    def remote_heads(self, repo_url: str, branches: List[str]) -> Optional[Dict[str, str]]:
+        """Branch → tip SHA on the remote, for all branches in one ls-remote; None if unreachable"""
+        return self.remote_heads_many({repo_url: branches})[repo_url]
+
+    def remote_heads_many(self, requests: Dict[str, List[str]]) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        remote_heads for many repositories at once
+
+        Every ls-remote is submitted to the engine up front, so the calling
+        thread keeps up to the network limit of them in flight.
+        """
+        with tracing.span("git remote heads", cat="git", repos=len(requests),
+                          branches=sum(len(b) for b in requests.values())) as span_args:
+            futures = {}
+            for repo_url, branches in requests.items():
+                args = [self.git_cmd, "ls-remote", "--heads", repo_url] + [f"refs/heads/{b}" for b in branches]
+                self.log(f"Running: {' '.join(args)}")
+                futures[repo_url] = self.engine.submit(args, timeout=60)
+
+            heads: Dict[str, Optional[Dict[str, str]]] = {}
+            tracer = tracing.current()
+            lanes: List[float] = []  # end of the last span on each fan-out lane
+            for repo_url, future in futures.items():
+                try:
+                    result = future.result()
+                except (subprocess.TimeoutExpired, OSError) as e:
+                    self.log(f"ls-remote {repo_url} failed: {e}")
+                    result = None
+                if tracer and result is not None and hasattr(result, "started"):
+                    # The commands overlap, so each goes on the first lane that is free by then
+                    lane = next((i for i, end in enumerate(lanes) if end <= result.started), len(lanes))
+                    lanes[lane:lane + 1] = [result.ended]
+                    tracer.complete("git ls-remote", "git", result.started, result.ended,
+                                    lane=f"git fan-out {lane + 1}", returncode=result.returncode,
+                                    cmd=' '.join(str(x) for x in result.args[1:])[:200])
+                if result is None or result.returncode != 0:
+                    if result is not None:
+                        for line in result.stderr.splitlines()[-5:]:
+                            self.log(f"   STDERR: {line}")
+                    heads[repo_url] = None
+                    continue
+                wanted = {f"refs/heads/{b}": b for b in requests[repo_url]}
+                found = {}
+                for line in result.stdout.splitlines():
+                    sha, _, ref = line.strip().partition("\t")
+                    if ref in wanted:
+                        found[wanted[ref]] = sha
+                heads[repo_url] = found
+            span_args["unreachable"] = sum(1 for found in heads.values() if found is None)
+            return heads
+
+    @staticmethod
+    def is_shallow(repo_path: Path) -> bool:
+        """True if the repo was cloned or fetched with a depth limit"""
+        return (GitService.git_dir(repo_path) / "shallow").is_file()
+
+    @staticmethod
+    def history_args(repo_path: Path, depth: Optional[int], new: bool) -> List[str]:
+        """
+        clone/fetch options for a history depth; None means the branch's whole history
+
+        An existing repo with full history stays complete (only new commits are
+        downloaded); tags only come along when the whole history was asked for.
+        """
+        if not depth:
+            return ["--unshallow"] if not new and GitService.is_shallow(repo_path) else []
+        if not new and not GitService.is_shallow(repo_path):
+            return ["--no-tags"]
+        return ["--depth", str(depth), "--no-tags"]
+
+    def sync_repo(self, repo_url: str, repo_path: Path, branch: str,
+                  depth: Optional[int] = 1) -> Optional[str]:
+        """
+        Fast sync: bring repo_path to the tip of origin/<branch> and return its SHA
+
+        A new repo is one single-branch clone. An existing one is one fetch of
+        just that branch's refspec plus one forced checkout that moves the
+        branch, index and working tree to the fetched commit (local changes
+        are discarded). The SHA is read from FETCH_HEAD / the clone's refs,
+        so no further git processes are needed. Returns None on failure.
+
+        depth limits how much of the branch's history is downloaded, see
+        history_args.
+        """
+        repo_path = repo_path.resolve()
+        mode = "update" if (repo_path / ".git").exists() else "clone"
+        with tracing.span(f"git sync (fast {mode})", cat="git", repo=repo_url, branch=branch,
+                          depth=depth or "full") as span_args:
+            sha = self._sync_repo(repo_url, repo_path, branch, mode, depth)
+            span_args["ok"] = sha is not None
+            return sha
+
+    def _sync_repo(self, repo_url: str, repo_path: Path, branch: str, mode: str,
+                   depth: Optional[int]) -> Optional[str]:
+        self.log(f"\nTarget: {repo_url} ({branch}) → {repo_path} [fast {mode}, depth {depth or 'full'}]")
+        try:
+            if mode == "clone":
+                if repo_path.exists():
+                    shutil.rmtree(repo_path, ignore_errors=True)
+                repo_path.parent.mkdir(parents=True, exist_ok=True)
+                result = self._run_git_command(
+                    [self.git_cmd, "clone", "-c", "core.longpaths=true"] +
+                    self.history_args(repo_path, depth, new=True) +
+                    ["--single-branch", "--branch", branch, repo_url, str(repo_path)],
+                    timeout=300
+                )
+                if result.returncode != 0:
+                    self.log(f"Clone of '{branch}' failed")
+                    return None
+                return self.read_ref(repo_path, "HEAD")
+
+            # One refspec, straight from the configured URL, into the remote-tracking ref
+            result = self._run_git_command(
+                [self.git_cmd, "fetch"] + self.history_args(repo_path, depth, new=False) + [repo_url,
+                 f"+refs/heads/{branch}:refs/remotes/origin/{branch}"],
+                cwd=repo_path
+            )
+            if result.returncode != 0:
+                self.log(f"Fetch of '{branch}' failed")
+                return None
+            sha = self.read_ref(repo_path, "FETCH_HEAD")
+            if sha is None:
+                return None
+
+            result = self._run_git_command(
+                [self.git_cmd, "checkout", "-f", "-B", branch, sha],
+                cwd=repo_path,
+                timeout=60
+            )
+            if result.returncode != 0:
+                self.log(f"Checkout of {sha[:8]} failed")
+                return None
+            return sha
+
+        except Exception as e:
+            self.log(f"FAILED: {e}")
+            self.log(traceback.format_exc())
+            return None
+
+    def fetch_commit(self, repo_url: str, repo_path: Path, sha: str) -> bool:
+        """Download one commit by SHA (depth 1), e.g. the base an incremental diff needs"""
+        with tracing.span("git fetch commit", cat="git", repo=repo_url, sha=sha[:8]) as span_args:
+            result = self._run_git_command(
+                [self.git_cmd, "fetch", "--no-tags", "--depth", "1", repo_url, sha],
+                cwd=repo_path,
+                timeout=120
+            )
+            span_args["ok"] = result.returncode == 0
+            return result.returncode == 0
+
     def clone_or_update_repo(self, repo_url: str, repo_path: Path, branch: str = "master") -> bool:
+        """Clone or update repo, traced as one span around the git commands it runs"""
+        mode = "update" if (repo_path / ".git").exists() else "clone"
+        with tracing.span(f"git sync ({mode})", cat="git", repo=repo_url, branch=branch) as span_args:
+            ok = self._clone_or_update_repo(repo_url, repo_path, branch)
+            span_args["ok"] = ok
+            return ok
+
+    def _clone_or_update_repo(self, repo_url: str, repo_path: Path, branch: str = "master") -> bool:
         """
         Clone or update repo – FIXED FOR LONG PATHS ON WINDOWS
 
@@ -268,9 +489,7 @@ class GitService:
                 timeout=10
             )
 
-            # === FIX SHALLOW CLONE ===
-            self.log("Fixing shallow clone → fetching ALL branches")
-            self._run_git_command([self.git_cmd, "fetch", "--unshallow", "--all"], cwd=repo_path, timeout=180)
+            # Track every branch so later updates can switch to them; history stays shallow
             self._run_git_command([self.git_cmd, "remote", "set-branches", "origin", "*"], cwd=repo_path)
 
             # Final checkout
@@ -0,0 +1,105 @@
+"""
+Incremental module-level builds
+Maps files changed since the last cached commit onto reactor modules so only
+those modules and their dependents are rebuilt (-pl ... -amd)
+"""
+
+import fnmatch
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .dependency_graph import collect_reactor
+from .sparse import in_checkout
+
+# Files that never influence what Maven produces
+NON_BUILD_PATTERNS = [
+    "*.md", "*.adoc", "*.rst", "*.txt",
+    "LICENSE*", "NOTICE*", "CHANGELOG*", "README*",
+    ".gitignore", ".gitattributes", ".editorconfig",
+    ".gitlab-ci.yml", "Jenkinsfile", "Dockerfile", ".dockerignore",
+    ".github/*", ".idea/*", ".vscode/*", "docs/*", "doc/*",
+]
+
+# Test sources don't matter when the build runs with -Dmaven.test.skip=true
+TEST_PATTERNS = ["src/test/*"]
+
+
+@dataclass
+class IncrementalPlan:
+    """What to build for a service after diffing against the last built commit"""
+    mode: str  # "full", "modules" or "skip"
+    reason: str
+    modules: List[str] = field(default_factory=list)
+    changed_files: List[str] = field(default_factory=list)
+
+
+class IncrementalPlanner:
+    """Decides between a full reactor build, a partial build and no build at all"""
+
+    def __init__(self, git_service):
+        self.git_service = git_service
+
+    def changed_files(self, repo_dir: Path, base_commit: str, repo_url: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Files changed between base_commit and HEAD, or None if the diff is impossible
+
+        The diff only compares two trees, so a shallow repo just needs the base
+        commit itself; when it is missing it is fetched by SHA from repo_url.
+        """
+        args = [self.git_service.git_cmd, "diff", "--name-only", "--no-renames", f"{base_commit}..HEAD"]
+        result = self.git_service._run_git_command(args, cwd=repo_dir, timeout=60)
+        if result.returncode != 0 and repo_url and self.git_service.fetch_commit(repo_url, repo_dir, base_commit):
+            result = self.git_service._run_git_command(args, cwd=repo_dir, timeout=60)
+        if result.returncode != 0:
+            return None
+        return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+    def plan(self, repo_dir: Path, base_commit: Optional[str], skip_tests: bool = True,
+             repo_url: Optional[str] = None, cone: Optional[List[str]] = None) -> IncrementalPlan:
+        """cone: directories of a sparse checkout; changes outside it can't affect the build"""
+        if not base_commit:
+            return IncrementalPlan("full", "no previous build recorded")
+
+        changed = self.changed_files(repo_dir, base_commit, repo_url)
+        if changed is None:
+            return IncrementalPlan("full", f"cannot diff against {base_commit[:8]} (history missing)")
+        if cone:
+            changed = [path for path in changed if in_checkout(path, cone)]
+
+        modules = sorted((p.path for p in collect_reactor(repo_dir)), key=len, reverse=True)
+        if not modules:
+            return IncrementalPlan("full", "no reactor modules found", changed_files=changed)
+
+        affected = set()
+        for path in changed:
+            module = next((m for m in modules if m and (path + "/").startswith(m + "/")), "")
+            local = path[len(module) + 1:] if module else path
+            if not self._is_build_relevant(local, skip_tests):
+                continue
+            if module == "":
+                # Root pom, .mvn/ or sources of a single-module project
+                return IncrementalPlan("full", f"root-level change: {path}", changed_files=changed)
+            affected.add(module)
+
+        if not affected:
+            return IncrementalPlan("skip", "only non-build files changed", changed_files=changed)
+
+        return IncrementalPlan(
+            "modules",
+            f"{len(affected)} of {len(modules)} modules changed",
+            modules=sorted(affected),
+            changed_files=changed
+        )
+
+    def _is_build_relevant(self, local_path: str, skip_tests: bool) -> bool:
+        """local_path is relative to the module that owns the file"""
+        name = local_path.rsplit("/", 1)[-1]
+        patterns = NON_BUILD_PATTERNS + (TEST_PATTERNS if skip_tests else [])
+        for pattern in patterns:
+            if "/" in pattern:
+                if fnmatch.fnmatch(local_path, pattern):
+                    return False
+            elif fnmatch.fnmatch(name, pattern) and not local_path.startswith("src/main/"):
+                return False
+        return True
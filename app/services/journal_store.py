@@ -0,0 +1,211 @@
+"""
+Append-only journal store
+A small key/value engine for the build cache: every write appends one
+checksummed line, readers use an in-memory index behind sharded locks, and a
+background thread compacts the journal once it is mostly dead records
+"""
+
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _encode(op: str, key: str, value: Any = None) -> bytes:
+    payload = json.dumps([op, key, value], separators=(',', ':'))
+    return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n".encode('utf-8')
+
+
+def _decode(line: bytes) -> Optional[Tuple[str, str, Any]]:
+    """Parse one journal line, None if it is torn or corrupt"""
+    if not line.endswith(b"\n"):
+        return None
+    try:
+        text = line.decode('utf-8').rstrip("\n")
+        crc, payload = text.split(" ", 1)
+        if int(crc, 16) != zlib.crc32(payload.encode('utf-8')):
+            return None
+        op, key, value = json.loads(payload)
+        return op, key, value
+    except ValueError:
+        return None
+
+
+class JournalStore:
+    """
+    Crash-safe, thread-safe key/value store on an append-only journal
+
+    Values must be JSON-serializable and are treated as immutable: update
+    them through put() or update(), never in place. A crash mid-append only
+    loses the record being written; compaction writes a fresh journal next
+    to the old one and swaps it in atomically.
+    """
+
+    def __init__(self, path: str, shards: int = 16, compact_min_records: int = 1000,
+                 compact_ratio: float = 2.0, fsync: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_path = self.path.with_suffix(self.path.suffix + ".compact")
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+
+        self.shards: List[Dict[str, Any]] = [{} for _ in range(shards)]
+        self.shard_locks = [threading.Lock() for _ in range(shards)]
+        self.append_lock = threading.Lock()
+        self.records = 0  # lines in the journal, live or dead
+        self.compactions = 0
+        self.compact_buffer: Optional[List[bytes]] = None
+
+        self._replay()
+        self.file = open(self.path, 'ab')
+
+        self.compact_event = threading.Event()
+        threading.Thread(target=self._compact_loop, name="journal-compact", daemon=True).start()
+
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode('utf-8')) % len(self.shards)
+
+    def _replay(self):
+        """Rebuild the index from the journal, cutting off a torn tail"""
+        if self.compact_path.exists():
+            self.compact_path.unlink()  # interrupted compaction, the old journal is intact
+        if not self.path.exists():
+            return
+
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                record = _decode(line)
+                if record is None:
+                    break
+                op, key, value = record
+                shard = self.shards[self._shard(key)]
+                if op == "put":
+                    shard[key] = value
+                else:
+                    shard.pop(key, None)
+                good_bytes += len(line)
+                self.records += 1
+
+        if good_bytes < self.path.stat().st_size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_bytes)
+
+    def _append(self, line: bytes):
+        with self.append_lock:
+            self.file.write(line)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.records += 1
+            if self.compact_buffer is not None:
+                self.compact_buffer.append(line)
+        if self.records > max(self.compact_min_records, len(self) * self.compact_ratio):
+            self.compact_event.set()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        idx = self._shard(key)
+        with self.shard_locks[idx]:
+            return self.shards[idx].get(key, default)
+
+    def put(self, key: str, value: Any):
+        idx = self._shard(key)
+        with self.shard_locks[idx]:
+            self.shards[idx][key] = value
+            self._append(_encode("put", key, value))
+
+    def delete(self, key: str):
+        idx = self._shard(key)
+        with self.shard_locks[idx]:
+            if self.shards[idx].pop(key, None) is not None:
+                self._append(_encode("del", key))
+
+    def update(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        """Atomically replace key with fn(current value); fn returning None deletes it"""
+        idx = self._shard(key)
+        with self.shard_locks[idx]:
+            old = self.shards[idx].get(key)
+            new = fn(old)
+            if new is None:
+                if old is not None:
+                    del self.shards[idx][key]
+                    self._append(_encode("del", key))
+            else:
+                self.shards[idx][key] = new
+                self._append(_encode("put", key, new))
+            return new
+
+    def items(self, prefix: str = "") -> List[Tuple[str, Any]]:
+        result = []
+        for idx, shard in enumerate(self.shards):
+            with self.shard_locks[idx]:
+                result.extend((k, v) for k, v in shard.items() if k.startswith(prefix))
+        return result
+
+    def clear(self):
+        for key, _ in self.items():
+            self.delete(key)
+        self.compact()
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def compact(self):
+        """Rewrite the journal with one record per live key"""
+        # Taking every shard lock (in order) waits out writes in flight, so the
+        # snapshot matches the journal; later writes are buffered for the swap
+        for lock in self.shard_locks:
+            lock.acquire()
+        try:
+            with self.append_lock:
+                if self.compact_buffer is not None:
+                    return
+                self.compact_buffer = []
+            snapshot = [(k, v) for shard in self.shards for k, v in shard.items()]
+        finally:
+            for lock in reversed(self.shard_locks):
+                lock.release()
+
+        try:
+            with open(self.compact_path, 'wb') as out:
+                for key, value in snapshot:
+                    out.write(_encode("put", key, value))
+                with self.append_lock:
+                    for line in self.compact_buffer:
+                        out.write(line)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    self.file.close()
+                    try:
+                        os.replace(self.compact_path, self.path)
+                    finally:
+                        self.file = open(self.path, 'ab')
+                    self.records = len(snapshot) + len(self.compact_buffer)
+                    self.compactions += 1
+        finally:
+            with self.append_lock:
+                self.compact_buffer = None
+
+    def _compact_loop(self):
+        while True:
+            self.compact_event.wait()
+            self.compact_event.clear()
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"Journal compaction failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'keys': len(self),
+            'records': self.records,
+            'compactions': self.compactions,
+            'size_bytes': self.path.stat().st_size if self.path.exists() else 0
+        }
+
+    def close(self):
+        with self.append_lock:
+            self.file.close()
@@ -0,0 +1,135 @@
+"""
+Shared bare mirrors with per-branch worktrees
+Keeps one bare repository per remote URL and checks every branch out into its
+own git worktree, so repos cloned into several groups share their objects and
+two branches of a service can build side by side
+"""
+
+import hashlib
+import re
+import shutil
+import threading
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import tracing
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-") or "HEAD"
+
+
+def branch_slug(branch: str) -> str:
+    """
+    Directory-safe, collision-free form of a branch name (feature/x → feature-x-<hash>)
+
+    The readable part alone is not unique (feature/x, feature-x and
+    feature_x/ can all map to it), so a short hash of the raw name keeps
+    two branches from sharing a worktree or a cache marker.
+    """
+    digest = hashlib.sha1(branch.encode('utf-8')).hexdigest()[:8]
+    return f"{_safe_name(branch)}-{digest}"
+
+
+class MirrorStore:
+    """One bare mirror per remote URL, materialized into detached worktrees"""
+
+    def __init__(self, git_service, root: Path):
+        self.git_service = git_service
+        self.root = Path(root)
+        # Fetches and worktree bookkeeping write into the mirror; checkouts only read it
+        self.locks: Dict[str, threading.Lock] = {}
+        self.locks_guard = threading.Lock()
+
+    def mirror_path(self, repo_url: str) -> Path:
+        name = re.sub(r"\.git$", "", repo_url.rstrip("/").replace("\\", "/").rsplit("/", 1)[-1])
+        digest = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:10]
+        return (self.root / f"{_safe_name(name)}-{digest}.git").resolve()
+
+    def mirror_lock(self, mirror: Path) -> threading.Lock:
+        """Lock held while anything writes to the mirror (fetch, worktree add/remove, prune, gc)"""
+        with self.locks_guard:
+            return self.locks.setdefault(str(mirror), threading.Lock())
+
+    def sync(self, repo_url: str, branch: str, worktree: Path, depth: Optional[int] = 1) -> Optional[str]:
+        """
+        Bring worktree to the tip of <branch> at repo_url and return its SHA
+
+        The branch is fetched into the shared mirror (refs/heads/<branch>, at
+        depth as in GitService.history_args), then the worktree is created
+        from the mirror or force-checked-out to the fetched commit. Worktrees
+        stay detached so the mirror's branch refs can always be updated.
+        Returns None on failure.
+        """
+        mirror = self.mirror_path(repo_url)
+        worktree = Path(worktree).resolve()
+        if not (mirror / "HEAD").is_file():
+            mode = "clone"
+        elif not (worktree / ".git").is_file():
+            mode = "worktree"
+        else:
+            mode = "update"
+        with tracing.span(f"git sync (mirror {mode})", cat="git", repo=repo_url, branch=branch,
+                          depth=depth or "full") as span_args:
+            sha = self._sync(repo_url, branch, mirror, worktree, depth)
+            span_args["ok"] = sha is not None
+            return sha
+
+    def _sync(self, repo_url: str, branch: str, mirror: Path, worktree: Path,
+              depth: Optional[int]) -> Optional[str]:
+        git = self.git_service
+        git.log(f"\nTarget: {repo_url} ({branch}) → {worktree} [mirror {mirror.name}, depth {depth or 'full'}]")
+        try:
+            with self.mirror_lock(mirror):
+                new = not (mirror / "HEAD").is_file()
+                if new:
+                    mirror.mkdir(parents=True, exist_ok=True)
+                    if git._run_git_command([git.git_cmd, "init", "--bare", "-q", str(mirror)],
+                                            timeout=30).returncode != 0:
+                        git.log(f"Cannot create mirror {mirror}")
+                        return None
+                    git._run_git_command([git.git_cmd, "config", "core.longpaths", "true"], cwd=mirror, timeout=10)
+
+                result = git._run_git_command(
+                    [git.git_cmd, "fetch"] + git.history_args(mirror, depth, new) +
+                    [repo_url, f"+refs/heads/{branch}:refs/heads/{branch}"],
+                    cwd=mirror
+                )
+                if result.returncode != 0:
+                    git.log(f"Fetch of '{branch}' into mirror failed")
+                    return None
+                sha = git.read_ref(mirror, "FETCH_HEAD")
+                if sha is None:
+                    return None
+
+                if not (worktree / ".git").is_file():
+                    # A plain clone or leftovers from an earlier layout can't become a worktree
+                    if worktree.exists() and any(worktree.iterdir()):
+                        shutil.rmtree(worktree, ignore_errors=True)
+                    worktree.parent.mkdir(parents=True, exist_ok=True)
+                    # --force reclaims a path whose earlier worktree was deleted without git
+                    result = git._run_git_command(
+                        [git.git_cmd, "worktree", "add", "--force", "--detach", str(worktree), sha],
+                        cwd=mirror,
+                        timeout=300
+                    )
+                    if result.returncode != 0:
+                        git.log(f"Worktree for '{branch}' failed")
+                        return None
+                    return sha
+
+            result = git._run_git_command(
+                [git.git_cmd, "checkout", "-f", "--detach", sha],
+                cwd=worktree,
+                timeout=60
+            )
+            if result.returncode != 0:
+                git.log(f"Checkout of {sha[:8]} failed")
+                return None
+            return sha
+
+        except Exception as e:
+            git.log(f"FAILED: {e}")
+            git.log(traceback.format_exc())
+            return None
@@ -0,0 +1,319 @@
+"""
+Pipelined build execution
+Each service moves through sync → check → build → record, and every stage has
+its own bounded pool: network-bound git syncs run ahead while the CPU slots
+stay busy with Maven
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .admission import AdmissionController
+from .dependency_graph import DependencyGraph, collect_reactor
+from .scheduler import DagScheduler, FAILED_STATUSES
+from .tracing import Tracer
+
+STAGES = ("sync", "check", "build", "record")
+
+
+class BuildPipeline(DagScheduler):
+    """
+    Staged variant of the DAG scheduler
+
+    The build stage is gated by the dependency graph and the admission
+    controller; sync and check run as soon as a pool slot is free. Poms of
+    freshly synced repos are folded into the graph, and no build that might
+    consume them starts while a service whose artifacts are still unknown
+    is being synced.
+    """
+
+    def __init__(self, builder, graph: DependencyGraph, stage_workers: Dict[str, int],
+                 log: Callable[[str], None] = print,
+                 weights: Optional[Dict[str, float]] = None,
+                 admission: Optional[AdmissionController] = None,
+                 pools: Optional[Dict[str, ThreadPoolExecutor]] = None,
+                 tracer: Optional[Tracer] = None):
+        super().__init__(graph, stage_workers["build"], log=log, weights=weights, admission=admission)
+        self.builder = builder
+        self.weights = weights
+        self.pools = pools
+        self.tracer = tracer
+        self.stage_workers = {stage: max(1, stage_workers.get(stage, 1)) for stage in STAGES}
+        self.stats = {stage: {"workers": self.stage_workers[stage], "queued": 0, "active": 0, "done": 0}
+                      for stage in STAGES}
+        self.waiting = {"repo_lock": 0, "dependencies": 0, "admission": 0}
+        self.stats_lock = threading.Lock()
+        self.status_interval = 30.0
+        # Cancel events and repo locks freed by other jobs don't wake the loop
+        self.poll_interval = 0.5
+        self.held_back = None
+        self.progress: Dict = {}
+
+    def status(self) -> Dict:
+        """Queue depth and activity per stage"""
+        with self.stats_lock:
+            stages = {stage: dict(values) for stage, values in self.stats.items()}
+        return {"stages": stages, "waiting": dict(self.waiting), "progress": dict(self.progress)}
+
+    def _occupied(self, stage: str) -> int:
+        """Jobs queued or running in a stage; the stage jobs update the counts from pool threads"""
+        with self.stats_lock:
+            return self.stats[stage]["queued"] + self.stats[stage]["active"]
+
+    def log_status(self):
+        parts = [f"{stage} {v['active']}/{v['workers']} active, {v['queued']} queued"
+                 for stage, v in self.status()["stages"].items()]
+        self.log(f"📊 Pipeline: {' | '.join(parts)} | waiting on repo lock {self.waiting['repo_lock']}, "
+                 f"deps {self.waiting['dependencies']}, admission {self.waiting['admission']}")
+
+    def run(self, configs: List, force: bool = False,
+            on_complete: Optional[Callable[[Dict], None]] = None,
+            owner: Optional[str] = None,
+            cancel_event: Optional[threading.Event] = None,
+            settled: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """
+        Run every service through the pipeline and return the results
+
+        owner identifies the job for fair admission when several batches
+        share the same pools; setting cancel_event stops new work, kills
+        running Maven processes and reports the rest as "cancelled".
+        settled holds results of graph services finished before the run
+        (preflight skips); like finished upstreams they are handed to the
+        build stage of their dependents as ctx.upstream.
+        """
+        by_name = {c.service_name: c for c in configs}
+        settled = settled or {}
+        order = {name: idx for idx, name in enumerate(by_name)}
+        contexts = {name: self.builder.new_context(c, force, tracer=self.tracer) for name, c in by_name.items()}
+
+        events = queue.Queue()
+        own_pools = self.pools is None
+        pools = self.pools or {stage: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"{stage}-stage")
+                               for stage, n in self.stage_workers.items()}
+
+        unknown = {n for n in by_name if not self.graph.produces.get(n)}
+        unsynced = set(by_name)
+        pending_sync = sorted(by_name, key=lambda n: (-self.priority.get(n, 1.0), order[n]))
+        prepared = set()
+        dispatched = set()
+        in_flight = set()
+        locked = set()
+        finished = {}
+        results = []
+        cancelled = False
+
+        def trace_activity():
+            if self.tracer:
+                with self.stats_lock:
+                    active = {s: v["active"] for s, v in self.stats.items()}
+                self.tracer.counter("active", active)
+
+        def submit(stage: str, name: str, token=None):
+            with self.stats_lock:
+                self.stats[stage]["queued"] += 1
+            in_flight.add(name)
+
+            def job():
+                with self.stats_lock:
+                    self.stats[stage]["queued"] -= 1
+                    self.stats[stage]["active"] += 1
+                trace_activity()
+                try:
+                    self.builder.run_stage(stage, contexts[name])
+                finally:
+                    if token is not None:
+                        self.admission.release(token)
+                    with self.stats_lock:
+                        self.stats[stage]["active"] -= 1
+                        self.stats[stage]["done"] += 1
+                    trace_activity()
+                    events.put((stage, name))
+
+            pools[stage].submit(job)
+
+        def unlock(name: str):
+            if name in locked and name not in in_flight:
+                locked.discard(name)
+                self.builder.unlock_repo(contexts[name])
+
+        def finish(name: str, result: Dict):
+            finished[name] = result
+            results.append(result)
+            unlock(name)
+            if on_complete:
+                on_complete(result)
+            if result.get("status") not in FAILED_STATUSES:
+                return
+            for child in sorted(self.graph.downstream.get(name, ())):
+                if child in by_name and child not in finished and child not in dispatched:
+                    block(child, name)
+
+        def close(name: str, status: str, error: str):
+            result = contexts[name].result
+            result.update({"status": status, "error": error})
+            result["duration"] = time.time() - contexts[name].start_time
+            finish(name, result)
+
+        def block(name: str, upstream: str):
+            self.log(f"⛔ {name} blocked: upstream {upstream} did not build")
+            close(name, "blocked", f"Upstream build failed: {upstream}")
+
+        def refresh_graph(name: str):
+            repo_dir = contexts[name].repo_dir
+            if repo_dir is None:
+                return
+            self.graph.add_service(name, collect_reactor(repo_dir))
+            self.graph.link()
+            self.priority = self.graph.critical_path_lengths(self.weights)
+
+        def start_syncs() -> set:
+            """Start syncs up to the window; returns the services whose repo another job holds"""
+            # Bounded window per batch so concurrent jobs interleave on the shared sync pool
+            lock_blocked = set()
+            for name in list(pending_sync):
+                if name in finished:
+                    pending_sync.remove(name)
+                    continue
+                if self._occupied("sync") >= self.stage_workers["sync"]:
+                    break
+                if not self.builder.try_lock_repo(contexts[name]):
+                    lock_blocked.add(name)
+                    continue
+                locked.add(name)
+                pending_sync.remove(name)
+                submit("sync", name)
+            self.waiting["repo_lock"] = len(lock_blocked)
+            return lock_blocked
+
+        def dispatch():
+            lock_blocked = start_syncs()
+            # A service whose artifacts are unknown may turn out to be anyone's upstream, so
+            # builds that consume artifacts no known service produces wait for its sync. One
+            # stuck behind another job's repo lock can take a whole build to get there: don't
+            # stall the batch for it.
+            syncing_unknown = (unknown & unsynced) - lock_blocked
+            produced = set().union(*self.graph.produces.values()) if syncing_unknown else set()
+            candidates = sorted((n for n in prepared if n not in dispatched and n not in finished),
+                                key=lambda n: (-self.priority.get(n, 1.0), order[n]))
+            deps_waiting = 0
+            admission_waiting = 0
+            held = False
+            for name in candidates:
+                upstream = self.graph.upstream.get(name, set()) & set(by_name)
+                failed = [u for u in upstream if u in finished and finished[u].get("status") in FAILED_STATUSES]
+                if failed:
+                    block(name, failed[0])
+                    continue
+                if any(u not in finished for u in upstream) or \
+                        (syncing_unknown and self.graph.consumes.get(name, set()) - produced):
+                    deps_waiting += 1
+                    continue
+                if held:
+                    admission_waiting += 1
+                    continue
+
+                if self._occupied("build") >= self.max_workers:
+                    held = True
+                    admission_waiting += 1
+                    continue
+                token = None
+                if self.admission:
+                    config = by_name[name]
+                    estimate = self.admission.estimate(name, self.builder.admission_jvm_options(config))
+                    token = self.admission.try_acquire(name, estimate, owner=owner)
+                    if token is None:
+                        # Don't let smaller builds starve the highest-priority one
+                        held = True
+                        admission_waiting += 1
+                        if self.held_back != name:
+                            self.held_back = name
+                            snap = self.admission.snapshot()
+                            self.log(f"⏸️ Holding {name} (needs {estimate.rss_mb} MB): "
+                                     f"{len(snap['running'])} building, {snap['committed_mb']} MB committed, "
+                                     f"{snap['available_mb']} MB available")
+                        continue
+                self.held_back = None
+                dispatched.add(name)
+                contexts[name].upstream = {u: finished.get(u) or settled[u]
+                                           for u in self.graph.upstream.get(name, ())
+                                           if u in finished or u in settled}
+                submit("build", name, token)
+            self.waiting.update(dependencies=deps_waiting, admission=admission_waiting)
+
+        def cancel():
+            self.log(f"🛑 Cancelling {len(by_name) - len(finished)} remaining services")
+            for name in by_name:
+                if name in finished:
+                    continue
+                if name in in_flight:
+                    contexts[name].cancel()
+                else:
+                    close(name, "cancelled", "Cancelled")
+
+        try:
+            last_status = time.time()
+            while len(finished) < len(by_name):
+                if cancel_event is not None and cancel_event.is_set() and not cancelled:
+                    cancelled = True
+                    cancel()
+                    continue
+                if not cancelled:
+                    dispatch()
+
+                timeout = self.admission.poll_interval if self.admission else self.status_interval
+                if (cancel_event is not None and not cancelled) or self.waiting["repo_lock"]:
+                    timeout = min(timeout, self.poll_interval)
+                try:
+                    stage, name = events.get(timeout=timeout)
+                except queue.Empty:
+                    if time.time() - last_status >= self.status_interval:
+                        self.log_status()
+                        last_status = time.time()
+                    continue
+
+                in_flight.discard(name)
+                if name in finished:
+                    unlock(name)
+                    continue
+                ctx = contexts[name]
+
+                if cancelled:
+                    if ctx.done:
+                        finish(name, ctx.result)
+                    else:
+                        close(name, "cancelled", "Cancelled")
+                    continue
+
+                if stage == "sync":
+                    unsynced.discard(name)
+                    unknown.discard(name)
+                    if not ctx.done:
+                        refresh_graph(name)
+                        submit("check", name)
+                elif stage == "check":
+                    if not ctx.done:
+                        prepared.add(name)
+                elif stage == "build":
+                    if not ctx.done:
+                        submit("record", name)
+                        self.log_status()
+                        last_status = time.time()
+
+                if ctx.done:
+                    finish(name, ctx.result)
+
+            # A service closed while one of its stages was running (blocked during its
+            # check, say) keeps its repo lock until that stage ends
+            while in_flight:
+                _, name = events.get()
+                in_flight.discard(name)
+                unlock(name)
+        finally:
+            if own_pools:
+                for pool in pools.values():
+                    pool.shutdown(wait=True)
+
+        return results
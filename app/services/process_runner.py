@@ -0,0 +1,117 @@
+"""
+Streaming subprocess execution
+Forwards stdout/stderr line by line while the process runs and keeps only a
+bounded tail in memory, so long builds give live feedback with flat memory use
+"""
+
+import subprocess
+import sys
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+# Signature of a line consumer: (stream_name, line) where stream_name is "stdout" or "stderr"
+LineCallback = Callable[[str, str], None]
+
+
+def kill_process_tree(pid: int):
+    """Kill a process and every child it spawned (mvn → java, git → remote helpers)"""
+    try:
+        parent = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return
+    procs = parent.children(recursive=True) + [parent]
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(procs, timeout=5)
+
+
+class _PipeReader(threading.Thread):
+    """Drains one pipe in the background so neither stream can block the other"""
+
+    def __init__(self, pipe, name: str, on_line: Optional[LineCallback],
+                 tail_lines: int, keep_all: bool):
+        super().__init__(daemon=True)
+        self.pipe = pipe
+        self.name = name
+        self.on_line = on_line
+        self.tail = deque(maxlen=tail_lines)
+        self.lines: Optional[List[str]] = [] if keep_all else None
+        self.line_count = 0
+
+    def run(self):
+        try:
+            for raw in iter(self.pipe.readline, ''):
+                line = raw.rstrip('\r\n')
+                self.line_count += 1
+                self.tail.append(line)
+                if self.lines is not None:
+                    self.lines.append(line)
+                if self.on_line:
+                    try:
+                        self.on_line(self.name, line)
+                    except Exception:
+                        pass
+        finally:
+            self.pipe.close()
+
+    def text(self) -> str:
+        lines = self.lines if self.lines is not None else self.tail
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def run_streaming(args: List[str], cwd: Optional[str] = None, env: Optional[Dict] = None,
+                  timeout: Optional[float] = None, on_line: Optional[LineCallback] = None,
+                  tail_lines: int = 200, keep_stdout: bool = False,
+                  on_start: Optional[Callable[[subprocess.Popen], None]] = None) -> subprocess.CompletedProcess:
+    """
+    Run a command, streaming its output to on_line as it arrives
+
+    Returns a CompletedProcess whose stdout/stderr hold only the last
+    tail_lines lines of each stream (full stdout when keep_stdout is set,
+    for short commands whose output is parsed). Raises TimeoutExpired after
+    killing the whole process tree if the timeout is hit.
+    """
+    is_windows = sys.platform.startswith('win')
+    proc = subprocess.Popen(
+        args,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1,
+        shell=False,
+        creationflags=subprocess.CREATE_NO_WINDOW if is_windows else 0
+    )
+    if on_start:
+        on_start(proc)
+
+    out_reader = _PipeReader(proc.stdout, "stdout", on_line, tail_lines, keep_stdout)
+    err_reader = _PipeReader(proc.stderr, "stderr", on_line, tail_lines, False)
+    out_reader.start()
+    err_reader.start()
+
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(proc.pid)
+        proc.wait()
+        out_reader.join(5)
+        err_reader.join(5)
+        raise subprocess.TimeoutExpired(args, timeout, output=out_reader.text(), stderr=err_reader.text())
+    except BaseException:
+        kill_process_tree(proc.pid)
+        raise
+
+    out_reader.join()
+    err_reader.join()
+    return subprocess.CompletedProcess(args, returncode, out_reader.text(), err_reader.text())
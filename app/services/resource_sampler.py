@@ -0,0 +1,152 @@
+"""
+Resource telemetry for running builds
+Samples the whole process tree under a Maven process (forked compilers,
+surefire JVMs) at a fixed interval into compact array-backed series
+"""
+
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+import psutil
+
+METRICS = ("cpu_percent", "rss_mb", "threads", "read_mb", "write_mb")
+
+
+class ResourceSeries:
+    """Time series of one build: one float array per metric, aligned on t"""
+
+    def __init__(self):
+        self.t = array('d')  # seconds since sampling started
+        self.values: Dict[str, array] = {name: array('d') for name in METRICS}
+        self.processes_peak = 0
+
+    def append(self, t: float, **sample: float):
+        self.t.append(t)
+        for name in METRICS:
+            self.values[name].append(sample.get(name, 0.0))
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def summary(self) -> Dict:
+        """Peak and average per metric; io counters are cumulative so only the last value counts"""
+        if not self.t:
+            return {"samples": 0}
+        cpu = self.values["cpu_percent"]
+        rss = self.values["rss_mb"]
+        threads = self.values["threads"]
+        return {
+            "samples": len(self.t),
+            "duration_s": round(self.t[-1], 1),
+            "peak_cpu_percent": round(max(cpu), 1),
+            "avg_cpu_percent": round(sum(cpu) / len(cpu), 1),
+            "peak_rss_mb": round(max(rss), 1),
+            "avg_rss_mb": round(sum(rss) / len(rss), 1),
+            "peak_threads": int(max(threads)),
+            "peak_processes": self.processes_peak,
+            "read_mb": round(self.values["read_mb"][-1], 1),
+            "write_mb": round(self.values["write_mb"][-1], 1),
+        }
+
+    def to_dict(self, max_points: Optional[int] = None) -> Dict:
+        """Series as plain lists, thinned to at most max_points samples"""
+        step = 1
+        if max_points and len(self.t) > max_points:
+            step = -(-len(self.t) // max_points)
+        data = {"t": [round(v, 2) for v in self.t[::step]]}
+        for name in METRICS:
+            data[name] = [round(v, 1) for v in self.values[name][::step]]
+        return data
+
+
+class ProcessTreeSampler:
+    """
+    Background thread that walks a process and all its descendants with psutil
+
+    CPU% is summed over the tree, so 400 means four busy cores. With the mvnd
+    backend the build runs inside the daemon, which is not a child of the
+    client process, so only the client is measured.
+    """
+
+    def __init__(self, pid: int, interval: float = 1.0, series: Optional[ResourceSeries] = None):
+        self.pid = pid
+        self.interval = interval
+        self.series = series if series is not None else ResourceSeries()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"sampler-{pid}", daemon=True)
+        self.procs: Dict[int, psutil.Process] = {}
+        # io counters of children that already exited, so totals never go backwards
+        self.finished_io = [0.0, 0.0]
+        self.last_io: Dict[int, List[float]] = {}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self) -> ResourceSeries:
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=self.interval * 2 + 1)
+        return self.series
+
+    def _tree(self, root: psutil.Process) -> List[psutil.Process]:
+        """Current tree, reusing Process objects so cpu_percent measures since the last tick"""
+        current = [root] + root.children(recursive=True)
+        tree = []
+        for proc in current:
+            known = self.procs.get(proc.pid)
+            if known is None:
+                proc.cpu_percent(None)  # first call only primes the counter
+                self.procs[proc.pid] = proc
+                known = proc
+            tree.append(known)
+        alive = {p.pid for p in current}
+        for pid in [pid for pid in self.procs if pid not in alive]:
+            del self.procs[pid]
+            io = self.last_io.pop(pid, None)
+            if io:
+                self.finished_io[0] += io[0]
+                self.finished_io[1] += io[1]
+        return tree
+
+    def _run(self):
+        try:
+            root = psutil.Process(self.pid)
+        except psutil.Error:
+            return
+        start = time.time()
+        while not self.stop_event.is_set():
+            try:
+                tree = self._tree(root)
+            except psutil.Error:
+                break  # root exited
+
+            cpu = rss = threads = 0.0
+            for proc in tree:
+                try:
+                    with proc.oneshot():
+                        cpu += proc.cpu_percent(None)
+                        rss += proc.memory_info().rss
+                        threads += proc.num_threads()
+                        try:
+                            io = proc.io_counters()
+                            self.last_io[proc.pid] = [io.read_bytes, io.write_bytes]
+                        except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                            pass
+                except psutil.Error:
+                    continue
+
+            read = self.finished_io[0] + sum(v[0] for v in self.last_io.values())
+            write = self.finished_io[1] + sum(v[1] for v in self.last_io.values())
+            self.series.processes_peak = max(self.series.processes_peak, len(tree))
+            self.series.append(
+                time.time() - start,
+                cpu_percent=cpu,
+                rss_mb=rss / (1024 ** 2),
+                threads=threads,
+                read_mb=read / (1024 ** 2),
+                write_mb=write / (1024 ** 2)
+            )
+            self.stop_event.wait(self.interval)
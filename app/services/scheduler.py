@@ -0,0 +1,32 @@
+"""
+DAG build scheduling
+Shared base of the build pipeline: the dependency graph, the build slot
+limit and the longest-remaining-path priority every dispatch decision uses
+"""
+
+from typing import Callable, Dict, Optional
+
+from .admission import AdmissionController
+from .dependency_graph import DependencyGraph
+
+# Results that must not be consumed by downstream services
+FAILED_STATUSES = ("failed", "error", "timeout", "blocked")
+
+
+class DagScheduler:
+    """
+    Dependency-ordered dispatch state shared by the pipeline
+
+    priority maps each service to the length of its longest remaining
+    dependency chain, so the service that gates the most work starts first.
+    """
+
+    def __init__(self, graph: DependencyGraph, max_workers: int,
+                 log: Callable[[str], None] = print,
+                 weights: Optional[Dict[str, float]] = None,
+                 admission: Optional[AdmissionController] = None):
+        self.graph = graph
+        self.max_workers = max(1, max_workers)
+        self.log = log
+        self.admission = admission
+        self.priority = graph.critical_path_lengths(weights)
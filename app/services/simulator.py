@@ -0,0 +1,299 @@
+"""
+Offline scheduler simulator
+Replays recorded stage durations and memory peaks through the build pipeline
+model under different scheduling policies, so worker counts and ordering can
+be compared without git, Maven or a build box
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .build_history import BuildHistory, STAGE_COLUMNS, percentile
+from .dependency_graph import DependencyGraph
+
+STAGES = ("sync", "check", "build", "record")
+
+# Same projection the admission controller uses when a service has no profile yet
+DEFAULT_RSS_MB = int(2048 * 1.5) + 512
+
+
+@dataclass
+class ServiceProfile:
+    """Recorded footprint of one service: seconds per stage and peak RSS of the build"""
+    name: str
+    sync: float = 0.0
+    check: float = 0.0
+    build: float = 0.0
+    record: float = 0.0
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def total(self) -> float:
+        return self.sync + self.check + self.build + self.record
+
+    @property
+    def rss_mb(self) -> float:
+        return self.peak_rss_mb or DEFAULT_RSS_MB
+
+
+class Policy:
+    """Orders services that are ready to build; admit() can hold one back"""
+
+    name = "fifo"
+
+    def prepare(self, profiles: Dict[str, ServiceProfile], graph: DependencyGraph):
+        pass
+
+    def key(self, name: str, ready_seq: int) -> Tuple:
+        return (ready_seq,)
+
+    def admit(self, profile: ServiceProfile, running: List[ServiceProfile]) -> bool:
+        return True
+
+
+class FifoPolicy(Policy):
+    """First ready, first built"""
+
+    name = "fifo"
+
+
+class LongestFirstPolicy(Policy):
+    """Longest own build first, ignoring what depends on it"""
+
+    name = "longest-first"
+
+    def prepare(self, profiles: Dict[str, ServiceProfile], graph: DependencyGraph):
+        self.build = {name: p.build for name, p in profiles.items()}
+
+    def key(self, name: str, ready_seq: int) -> Tuple:
+        return (-self.build[name], ready_seq)
+
+
+class CriticalPathPolicy(Policy):
+    """Longest remaining dependency chain first, as the pipeline does today"""
+
+    name = "critical-path"
+
+    def prepare(self, profiles: Dict[str, ServiceProfile], graph: DependencyGraph):
+        weights = {name: p.total for name, p in profiles.items()}
+        self.priority = graph.critical_path_lengths(weights, only=set(profiles))
+
+    def key(self, name: str, ready_seq: int) -> Tuple:
+        return (-self.priority.get(name, 0.0), ready_seq)
+
+
+class MemoryAwarePolicy(CriticalPathPolicy):
+    """Critical-path order, but a build only starts when its projected RSS fits the budget"""
+
+    name = "memory-aware"
+
+    def __init__(self, memory_mb: float, headroom: float = 1.1):
+        self.memory_mb = memory_mb
+        self.headroom = headroom
+
+    def admit(self, profile: ServiceProfile, running: List[ServiceProfile]) -> bool:
+        if not running:
+            return True  # one build always runs, as with the admission controller
+        committed = sum(p.rss_mb * self.headroom for p in running)
+        return committed + profile.rss_mb * self.headroom <= self.memory_mb
+
+
+POLICIES = ("fifo", "longest-first", "critical-path", "memory-aware")
+
+
+def make_policy(name: str, memory_mb: float) -> Policy:
+    if name == "fifo":
+        return FifoPolicy()
+    if name == "longest-first":
+        return LongestFirstPolicy()
+    if name == "critical-path":
+        return CriticalPathPolicy()
+    if name == "memory-aware":
+        return MemoryAwarePolicy(memory_mb)
+    raise ValueError(f"Unknown policy: {name} (choose from {', '.join(POLICIES)})")
+
+
+def simulate(profiles: Dict[str, ServiceProfile], graph: DependencyGraph, policy: Policy,
+             build_workers: int, stage_workers: Optional[Dict[str, int]] = None,
+             memory_mb: Optional[float] = None) -> Dict:
+    """
+    Discrete-event run of one batch through sync → check → build → record
+
+    Like BuildPipeline, sync/check/record are FIFO pools, a service builds
+    once everything upstream has been recorded, and the head of the ready
+    queue is never overtaken while the policy holds it back.
+    """
+    workers = dict({"sync": 8, "check": 2, "record": 1}, **(stage_workers or {}))
+    workers["build"] = max(1, build_workers)
+    names = list(profiles)
+    order = {name: idx for idx, name in enumerate(names)}
+    upstream = {name: set(graph.upstream.get(name, ())) & set(names) for name in names}
+    policy.prepare(profiles, graph)
+
+    free = dict(workers)
+    queues: Dict[str, List[str]] = {"sync": sorted(names, key=lambda n: policy.key(n, order[n])),
+                                    "check": [], "record": []}
+    ready: List[Tuple] = []
+    events: List[Tuple[float, int, str, str]] = []
+    running: Dict[str, ServiceProfile] = {}
+    waiting = set()
+    finished = set()
+    seq = 0
+    now = 0.0
+
+    busy = 0.0
+    peak_builds = 0
+    peak_memory = 0.0
+    build_wait = 0.0
+    prepared_at: Dict[str, float] = {}
+
+    def start(stage: str, name: str):
+        nonlocal seq
+        free[stage] -= 1
+        seq += 1
+        heapq.heappush(events, (now + getattr(profiles[name], stage), seq, stage, name))
+
+    while len(finished) < len(names):
+        for stage in ("sync", "check", "record"):
+            while queues[stage] and free[stage]:
+                start(stage, queues[stage].pop(0))
+        while ready and free["build"]:
+            name = ready[0][-1]
+            if not policy.admit(profiles[name], list(running.values())):
+                break
+            heapq.heappop(ready)
+            running[name] = profiles[name]
+            build_wait += now - prepared_at[name]
+            peak_builds = max(peak_builds, len(running))
+            peak_memory = max(peak_memory, sum(p.rss_mb for p in running.values()))
+            start("build", name)
+
+        if not events:
+            raise RuntimeError(f"Simulation stalled with {len(names) - len(finished)} services left")
+        now, _, stage, name = heapq.heappop(events)
+        free[stage] += 1
+        if stage == "sync":
+            queues["check"].append(name)
+        elif stage == "check":
+            prepared_at[name] = now
+            waiting.add(name)
+        elif stage == "build":
+            busy += profiles[name].build
+            del running[name]
+            queues["record"].append(name)
+        else:
+            finished.add(name)
+
+        # Checked services whose upstream is all recorded join the ready queue
+        for candidate in sorted((n for n in waiting if upstream[n] <= finished), key=order.get):
+            waiting.discard(candidate)
+            seq += 1
+            heapq.heappush(ready, policy.key(candidate, seq) + (candidate,))
+
+    makespan = max(now, 1e-6)
+    return {
+        "policy": policy.name,
+        "workers": workers["build"],
+        "makespan_s": round(makespan, 1),
+        "peak_memory_mb": round(peak_memory),
+        "over_budget": bool(memory_mb and peak_memory > memory_mb),
+        "build_utilization": round(busy / (workers["build"] * makespan), 3),
+        "peak_concurrent_builds": peak_builds,
+        "avg_build_wait_s": round(build_wait / max(1, len(names)), 1),
+    }
+
+
+def lower_bound(profiles: Dict[str, ServiceProfile], graph: DependencyGraph, build_workers: int) -> float:
+    """
+    No schedule beats the first sync/check followed by either the heaviest
+    build chain or the total build work spread over every slot
+    """
+    lengths = graph.critical_path_lengths({n: p.build + p.record for n, p in profiles.items()},
+                                          only=set(profiles))
+    lead = min((p.sync + p.check for p in profiles.values()), default=0.0)
+    work = sum(p.build for p in profiles.values()) / max(1, build_workers)
+    return lead + max(max(lengths.values(), default=0.0), work)
+
+
+def compare(profiles: Dict[str, ServiceProfile], graph: DependencyGraph,
+            policies: Iterable[str], worker_counts: Iterable[int], memory_mb: float,
+            stage_workers: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """Simulate every policy at every worker count"""
+    rows = []
+    for workers in worker_counts:
+        bound = lower_bound(profiles, graph, workers)
+        for name in policies:
+            row = simulate(profiles, graph, make_policy(name, memory_mb), workers,
+                           stage_workers=stage_workers, memory_mb=memory_mb)
+            row["lower_bound_s"] = round(bound, 1)
+            rows.append(row)
+    return rows
+
+
+def profiles_from_history(history: BuildHistory, services: Optional[Iterable[str]] = None,
+                          q: float = 50) -> Dict[str, ServiceProfile]:
+    """Percentile stage durations and peak RSS of each service's recent successful builds"""
+    names = list(services) if services is not None else \
+        [s["service"] for s in history.service_stats()]
+    profiles = {}
+    for name in names:
+        builds = [b for b in history.builds(name, limit=history.sample_size) if b["status"] == "success"]
+        if not builds:
+            continue
+        profile = ServiceProfile(name)
+        for stage, column in STAGE_COLUMNS.items():
+            setattr(profile, stage, percentile([b[column] for b in builds if b[column] is not None], q) or 0.0)
+        peaks = [b["peak_rss_mb"] for b in builds if b["peak_rss_mb"]]
+        profile.peak_rss_mb = max(peaks) if peaks else None
+        profiles[name] = profile
+    return profiles
+
+
+def profiles_from_trace(trace: Dict) -> Dict[str, ServiceProfile]:
+    """Stage durations of one recorded batch"""
+    profiles: Dict[str, ServiceProfile] = {}
+    for event in trace.get("traceEvents", []):
+        if event.get("ph") != "X" or event.get("cat") != "stage":
+            continue
+        args = event.get("args", {})
+        name, stage = args.get("service"), args.get("stage")
+        if name and stage in STAGES:
+            profile = profiles.setdefault(name, ServiceProfile(name))
+            setattr(profile, stage, getattr(profile, stage) + event["dur"] / 1e6)
+    return profiles
+
+
+def graph_from_edges(names: Iterable[str], edges: Iterable[List[str]]) -> DependencyGraph:
+    """Dependency graph from [upstream, downstream] pairs, e.g. a trace's recorded edges"""
+    graph = DependencyGraph()
+    for name in names:
+        graph.add_service(name, [])
+    for parent, child in edges:
+        if parent in graph.upstream and child in graph.upstream:
+            graph.upstream[child].add(parent)
+            graph.downstream[parent].add(child)
+    graph._break_cycles()
+    return graph
+
+
+def format_table(rows: List[Dict], memory_mb: float) -> List[str]:
+    """Plain-text comparison, fastest policy per worker count marked"""
+    lines = [f"{'workers':>7}  {'policy':<14} {'makespan':>9} {'bound':>8} {'util':>5} "
+             f"{'peak':>4} {'peak MB':>8}  note",
+             "-" * 72]
+    best = {}
+    for row in rows:
+        current = best.get(row["workers"])
+        if not row["over_budget"] and (current is None or row["makespan_s"] < current["makespan_s"]):
+            best[row["workers"]] = row
+    for row in rows:
+        notes = []
+        if best.get(row["workers"]) is row:
+            notes.append("fastest")
+        if row["over_budget"]:
+            notes.append(f"exceeds {memory_mb:.0f} MB")
+        lines.append(f"{row['workers']:>7}  {row['policy']:<14} {row['makespan_s']:>8.0f}s "
+                     f"{row['lower_bound_s']:>7.0f}s {row['build_utilization'] * 100:>4.0f}% "
+                     f"{row['peak_concurrent_builds']:>4} {row['peak_memory_mb']:>8}  {', '.join(notes)}")
+    return lines
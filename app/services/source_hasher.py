@@ -0,0 +1,176 @@
+"""
+Merkle hashing of source trees
+Every file digest is cached against its (size, mtime, inode) so an unchanged
+tree of tens of thousands of files is re-hashed from stat calls alone
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Directories that hold build output or tool state rather than sources
+IGNORED_DIRS = {".git", "target", ".idea", ".vscode", "node_modules", ".mvn-cache"}
+
+# A file modified this recently may change again within the same mtime tick,
+# so its digest is not trusted on the next run
+RACY_SECONDS = 2.0
+
+
+@dataclass
+class SourceDigest:
+    """Merkle root of a source tree plus the digest of every directory in it"""
+    root: str
+    dirs: Dict[str, str] = field(default_factory=dict)  # "" for the root, "module/sub" below it
+    files: int = 0
+    hashed: int = 0  # files actually read; the rest came from the stat cache
+    seconds: float = 0.0
+
+
+class SourceHasher:
+    """Merkle tree hasher with a persistent stat cache and a pool of hashing threads"""
+
+    def __init__(self, cache_dir: str = ".build_cache/stat_cache", workers: int = 8):
+        # One file per tree root, so hashing one repo never rewrites the others' entries
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pool: Optional[ThreadPoolExecutor] = None
+        # tree root -> {relative path: [size, mtime_ns, inode, digest]}, loaded on first use
+        self.stat_cache: Dict[str, Dict[str, List]] = {}
+        self.dirty: Set[str] = set()
+
+    def _cache_file(self, root: str) -> Path:
+        digest = hashlib.sha1(root.encode('utf-8')).hexdigest()[:12]
+        return self.cache_dir / f"{Path(root).name}-{digest}.json"
+
+    def _known(self, root: str) -> Dict[str, List]:
+        with self.lock:
+            if root in self.stat_cache:
+                return self.stat_cache[root]
+        known = {}
+        cache_file = self._cache_file(root)
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'r') as f:
+                    known = json.load(f)
+            except (OSError, ValueError):
+                known = {}
+        with self.lock:
+            return self.stat_cache.setdefault(root, known)
+
+    def save(self, root: Optional[str] = None):
+        """Write the stat cache of root, or of every tree hashed since the last save"""
+        with self.lock:
+            roots = [r for r in self.dirty if root is None or r == root]
+            pending = [(r, json.dumps(self.stat_cache[r])) for r in roots]
+            self.dirty.difference_update(roots)
+        for r, data in pending:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_file(r)
+            tmp_file = cache_file.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp_file, 'w') as f:
+                f.write(data)
+            tmp_file.replace(cache_file)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="source-hash")
+            return self.pool
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _scan(self, root: Path) -> Tuple[Dict[str, List[Tuple[str, str, str]]], List[Tuple[str, os.stat_result]]]:
+        """Walk the tree: entries per directory and the regular files to digest"""
+        entries: Dict[str, List[Tuple[str, str, str]]] = {}
+        files = []
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            children = entries.setdefault(rel_dir, [])
+            try:
+                it = os.scandir(root / rel_dir if rel_dir else root)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_symlink():
+                        # Hash where the link points, never follow it
+                        target = os.readlink(entry.path)
+                        children.append(("l", entry.name, hashlib.sha256(target.encode('utf-8')).hexdigest()))
+                    elif entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS:
+                            children.append(("d", entry.name, rel))
+                            stack.append(rel)
+                    elif entry.is_file(follow_symlinks=False):
+                        children.append(("f", entry.name, rel))
+                        files.append((rel, entry.stat(follow_symlinks=False)))
+        return entries, files
+
+    def hash_tree(self, repo_dir: Path) -> SourceDigest:
+        """Merkle digest of repo_dir, reading only files whose stat changed"""
+        start = time.time()
+        root = Path(repo_dir).resolve()
+        entries, files = self._scan(root)
+
+        file_digests: Dict[str, str] = {}
+        misses = []
+        known = self._known(str(root))
+        current = {}
+        for rel, st in files:
+            cached = known.get(rel)
+            if cached and cached[:3] == [st.st_size, st.st_mtime_ns, st.st_ino]:
+                file_digests[rel] = cached[3]
+                current[rel] = cached
+            else:
+                misses.append((rel, st))
+
+        if misses:
+            now_ns = time.time_ns()
+            digests = self._get_pool().map(lambda item: self._hash_file(str(root / item[0])), misses)
+            for (rel, st), digest in zip(misses, digests):
+                file_digests[rel] = digest
+                if now_ns - st.st_mtime_ns > RACY_SECONDS * 1e9:
+                    current[rel] = [st.st_size, st.st_mtime_ns, st.st_ino, digest]
+
+        # Replacing the whole entry also forgets files that no longer exist
+        if current != known:
+            with self.lock:
+                self.stat_cache[str(root)] = current
+                self.dirty.add(str(root))
+
+        # Directory digests bottom-up: deepest paths first
+        dir_digests: Dict[str, str] = {}
+        for rel_dir in sorted(entries, key=lambda d: d.count("/") + (1 if d else 0), reverse=True):
+            digest = hashlib.sha256()
+            for kind, name, ref in sorted(entries[rel_dir], key=lambda e: e[1]):
+                if kind == "f":
+                    child = file_digests[ref]
+                elif kind == "d":
+                    child = dir_digests[ref]
+                else:
+                    child = ref
+                digest.update(f"{kind} {name} {child}\n".encode('utf-8'))
+            dir_digests[rel_dir] = digest.hexdigest()
+
+        self.save(str(root))
+        return SourceDigest(
+            root=dir_digests.get("", hashlib.sha256().hexdigest()),
+            dirs=dir_digests,
+            files=len(files),
+            hashed=len(misses),
+            seconds=time.time() - start
+        )
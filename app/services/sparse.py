@@ -0,0 +1,319 @@
+"""
+Sparse source mode for large multi-module repositories
+Blob-less partial clone plus a cone-mode sparse checkout of only the modules a
+build needs, derived from the pom structure, and a generated reactor pom so
+Maven builds exactly what is checked out
+"""
+
+import hashlib
+import json
+import posixpath
+import re
+import shutil
+import traceback
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import tracing
+from .dependency_graph import PomInfo, module_dirs, reactor_from_files
+
+# Written into the working tree next to the root pom, never committed
+REACTOR_FILE = ".sparse-reactor.xml"
+PARENTS_DIR = ".sparse-parents"
+# Kept in .git so an unchanged pom structure skips planning on the next sync
+STATE_FILE = "sparse-plan.json"
+
+_MODULES = re.compile(r"<modules\s*/>|<modules>.*?</modules>", re.DOTALL)
+
+
+@dataclass
+class SparsePlan:
+    """Which part of a repository a sparse build checks out and hands to Maven"""
+    targets: List[str]
+    modules: List[str] = field(default_factory=list)  # reactor members, targets included
+    parents: List[str] = field(default_factory=list)  # aggregators needed only as <parent>
+    cone: List[str] = field(default_factory=list)  # directories for sparse-checkout; empty = everything
+    commit: Optional[str] = None
+    reactor_file: Optional[str] = None
+
+
+def in_checkout(path: str, cone: List[str]) -> bool:
+    """Whether a repo file is present in a cone-mode checkout of these directories"""
+    if not cone:
+        return True
+    directory = posixpath.dirname(path)
+    # Cone mode keeps everything below a cone directory and the files directly in its ancestors
+    return directory == "" or any(path.startswith(c + "/") or c.startswith(directory + "/") for c in cone)
+
+
+def plan_sparse(poms: List[PomInfo], targets: List[str]) -> SparsePlan:
+    """
+    Modules the targets need: their submodules, in-reactor dependencies and
+    parents, transitively. Aggregator parents are not built as reactor
+    members (that would pull in all their modules); the reactor gets copies
+    of them without <modules> instead. Raises ValueError for unknown targets.
+    """
+    by_path = {p.path: p for p in poms}
+    by_coord = {p.coordinate: p for p in poms if p.coordinate}
+    by_artifact = {p.artifact_id: p for p in poms if p.artifact_id}
+
+    roots = []
+    for target in targets:
+        key = target.replace("\\", "/").strip("/")
+        pom = by_path.get(key) or by_artifact.get(key)
+        if pom is None:
+            raise ValueError(f"unknown module '{target}'")
+        roots.append(pom)
+
+    modules, parents = set(), set()
+    stack = list(roots)
+    while stack:
+        pom = stack.pop()
+        if pom.path in modules:
+            continue
+        modules.add(pom.path)
+        stack.extend(by_path[d] for d in module_dirs(pom) if d in by_path)
+        stack.extend(by_coord[c] for c in pom.requires if c in by_coord)
+
+        parent = by_coord.get(pom.parent)
+        while parent is not None and parent.path not in parents and parent.path not in modules:
+            if not parent.modules:
+                stack.append(parent)  # a plain parent pom is built like any other module
+                break
+            parents.add(parent.path)
+            # Children inherit the parent's dependencies
+            stack.extend(by_coord[c] for c in parent.requires if c in by_coord)
+            parent = by_coord.get(parent.parent)
+
+    if "" in modules:
+        # The root reactor itself is needed: nothing to leave out
+        return SparsePlan(list(targets), modules=[""])
+
+    parents -= modules
+    # Ancestor directories are in the cone anyway; an aggregator elsewhere needs its own
+    dirs = set(modules) | {p for p in parents if p and not any(m.startswith(p + "/") for m in modules)}
+    cone = sorted(d for d in dirs if not any(d.startswith(other + "/") for other in dirs))
+    return SparsePlan(list(targets), modules=sorted(modules), parents=sorted(parents), cone=cone)
+
+
+def write_reactor(repo_path: Path, plan: SparsePlan, pom_texts: Dict[str, str], name: str) -> str:
+    """
+    Write the reduced reactor for plan into repo_path and return its file name
+
+    Members whose aggregator is itself a member come in through it; parent
+    aggregators are copied under PARENTS_DIR, keeping their relative layout,
+    with their <modules> removed so they build and install on their own.
+    """
+    repo_path = Path(repo_path)
+    parents_root = repo_path / PARENTS_DIR
+    if parents_root.exists():
+        shutil.rmtree(parents_root, ignore_errors=True)
+    for path in plan.parents:
+        copy = parents_root / path / "pom.xml"
+        copy.parent.mkdir(parents=True, exist_ok=True)
+        copy.write_text(_MODULES.sub("", pom_texts[path]), encoding='utf-8')
+
+    members = set(plan.modules)
+    reactor = {p.path: p for p in reactor_from_files(pom_texts) if p.path in members}
+    pulled_in = {d for pom in reactor.values() for d in module_dirs(pom)}
+    entries = [m for m in plan.modules if m not in pulled_in]
+    entries += [posixpath.join(PARENTS_DIR, p) if p else PARENTS_DIR for p in plan.parents]
+
+    modules_xml = "".join(f"\n    <module>{m}</module>" for m in entries)
+    (repo_path / REACTOR_FILE).write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<project xmlns="http://maven.apache.org/POM/4.0.0">\n'
+        '  <modelVersion>4.0.0</modelVersion>\n'
+        '  <groupId>sparse.reactor</groupId>\n'
+        f'  <artifactId>{re.sub(r"[^A-Za-z0-9._-]", "-", name)}-sparse-reactor</artifactId>\n'
+        '  <version>0</version>\n'
+        '  <packaging>pom</packaging>\n'
+        '  <properties>\n'
+        '    <maven.install.skip>true</maven.install.skip>\n'
+        '    <maven.deploy.skip>true</maven.deploy.skip>\n'
+        '  </properties>\n'
+        f'  <modules>{modules_xml}\n  </modules>\n'
+        '</project>\n',
+        encoding='utf-8'
+    )
+    return REACTOR_FILE
+
+
+class SparseCheckout:
+    """Blob-less partial clones, checked out in cone mode according to a SparsePlan"""
+
+    def __init__(self, git_service):
+        self.git_service = git_service
+
+    def sync(self, repo_url: str, repo_path: Path, branch: str, targets: List[str],
+             depth: Optional[int] = 1) -> Optional[SparsePlan]:
+        """
+        Bring repo_path to the tip of <branch> with only what targets need checked out
+
+        The pom structure is read from git objects (trees are local in a
+        blob-less clone; the pom blobs are fetched in one request), so the
+        sparse set is known before any source file is downloaded. Returns
+        the plan with its commit, or None on failure.
+        """
+        repo_path = Path(repo_path).resolve()
+        # Only a repo this class set up is a blob-less clone with a plan to compare against
+        mode = "update" if (repo_path / ".git" / STATE_FILE).is_file() else "clone"
+        with tracing.span(f"git sync (sparse {mode})", cat="git", repo=repo_url, branch=branch,
+                          targets=len(targets)) as span_args:
+            plan = self._sync(repo_url, repo_path, branch, targets, depth, mode)
+            span_args["ok"] = plan is not None
+            if plan is not None:
+                span_args["cone"] = len(plan.cone)
+            return plan
+
+    def _sync(self, repo_url: str, repo_path: Path, branch: str, targets: List[str],
+              depth: Optional[int], mode: str) -> Optional[SparsePlan]:
+        git = self.git_service
+        git.log(f"\nTarget: {repo_url} ({branch}) → {repo_path} [sparse {mode}, {len(targets)} target modules]")
+        try:
+            if mode == "clone":
+                if repo_path.exists():
+                    shutil.rmtree(repo_path, ignore_errors=True)
+                repo_path.parent.mkdir(parents=True, exist_ok=True)
+                result = git._run_git_command(
+                    [git.git_cmd, "clone", "-c", "core.longpaths=true", "--filter=blob:none", "--no-checkout"] +
+                    git.history_args(repo_path, depth, new=True) +
+                    ["--single-branch", "--branch", branch, repo_url, str(repo_path)],
+                    timeout=300
+                )
+                sha = git.read_ref(repo_path, "HEAD") if result.returncode == 0 else None
+            else:
+                # "origin" rather than the URL: only the promisor remote fetches without blobs
+                result = git._run_git_command(
+                    [git.git_cmd, "fetch"] + git.history_args(repo_path, depth, new=False) +
+                    ["origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}"],
+                    cwd=repo_path
+                )
+                sha = git.read_ref(repo_path, "FETCH_HEAD") if result.returncode == 0 else None
+            if sha is None:
+                git.log(f"Sparse {mode} of '{branch}' failed")
+                return None
+
+            pom_blobs = self._pom_blobs(repo_path, sha)
+            if pom_blobs is None:
+                return None
+            state_file = repo_path / ".git" / STATE_FILE
+            try:
+                state = json.loads(state_file.read_text(encoding='utf-8')) if mode == "update" else {}
+            except (OSError, ValueError):
+                state = {}
+            fingerprint = hashlib.sha256(json.dumps([sorted(pom_blobs.items()), sorted(targets)])
+                                         .encode('utf-8')).hexdigest()
+
+            pom_texts = None
+            if state.get("fingerprint") == fingerprint and (
+                    not state["plan"]["cone"] or (repo_path / REACTOR_FILE).is_file()):
+                plan = SparsePlan(**state["plan"])
+            else:
+                pom_texts = self._read_blobs(repo_path, pom_blobs)
+                if pom_texts is None:
+                    return None
+                try:
+                    plan = plan_sparse(reactor_from_files(pom_texts), targets)
+                except ValueError as e:
+                    git.log(f"Sparse checkout impossible: {e}")
+                    return None
+            plan.commit = sha
+            git.log(f"Sparse set: {len(plan.modules)} modules, {len(plan.parents)} parent poms, "
+                    f"cone {', '.join(plan.cone) or '(everything)'}")
+
+            cone_changed = mode == "clone" or state.get("plan", {}).get("cone") != plan.cone
+            # A fresh clone has no files yet: narrow first so checkout downloads only the cone
+            if cone_changed and mode == "clone" and not self._set_cone(repo_path, plan.cone):
+                return None
+            result = git._run_git_command(
+                [git.git_cmd, "checkout", "-f", "-B", branch, sha],
+                cwd=repo_path,
+                timeout=300
+            )
+            if result.returncode != 0:
+                git.log(f"Checkout of {sha[:8]} failed")
+                return None
+            if cone_changed and mode == "update" and not self._set_cone(repo_path, plan.cone):
+                return None
+
+            if pom_texts is not None:
+                if plan.cone:
+                    plan.reactor_file = write_reactor(repo_path, plan, pom_texts, repo_path.name)
+                else:
+                    plan.reactor_file = None
+                    (repo_path / REACTOR_FILE).unlink(missing_ok=True)
+                    shutil.rmtree(repo_path / PARENTS_DIR, ignore_errors=True)
+            state_file.write_text(json.dumps({"fingerprint": fingerprint, "plan": asdict(plan)}), encoding='utf-8')
+            return plan
+
+        except Exception as e:
+            git.log(f"FAILED: {e}")
+            git.log(traceback.format_exc())
+            return None
+
+    def _set_cone(self, repo_path: Path, cone: List[str]) -> bool:
+        git = self.git_service
+        if cone:
+            args = [git.git_cmd, "sparse-checkout", "set", "--cone"] + cone
+        else:
+            args = [git.git_cmd, "sparse-checkout", "disable"]
+        result = git._run_git_command(args, cwd=repo_path, timeout=300)
+        if result.returncode != 0:
+            git.log("sparse-checkout failed")
+            return False
+        return True
+
+    def _pom_blobs(self, repo_path: Path, sha: str) -> Optional[Dict[str, str]]:
+        """Module directory → blob id of every pom.xml in the commit, from local tree objects"""
+        git = self.git_service
+        result = git._capture_git([git.git_cmd, "ls-tree", "-r", "-z", sha], repo_path, timeout=120)
+        if result.returncode != 0:
+            return None
+        blobs = {}
+        for entry in result.stdout.split(b"\0"):
+            meta, _, path = entry.partition(b"\t")
+            parts = meta.split()
+            if len(parts) == 3 and parts[1] == b"blob" and (path == b"pom.xml" or path.endswith(b"/pom.xml")):
+                blobs[posixpath.dirname(path.decode('utf-8', errors='replace'))] = parts[2].decode('ascii')
+        return blobs
+
+    def _read_blobs(self, repo_path: Path, blobs: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Contents of the pom blobs; missing ones are fetched in batches rather than one by one"""
+        git = self.git_service
+        oids = sorted(set(blobs.values()))
+        try:
+            # git ignores --filter for plain-path URLs; such a clone already has every blob
+            partial = "partialclone" in (repo_path / ".git" / "config").read_text(encoding='utf-8')
+        except OSError:
+            partial = True
+        for start in range(0, len(oids) if partial else 0, 500):  # keeps the command line short enough for Windows
+            # The same request git makes for missing objects itself; without noop
+            # negotiation a shallow clone asks the server to walk history it lacks
+            result = git._run_git_command(
+                [git.git_cmd, "-c", "fetch.negotiationAlgorithm=noop", "fetch", "--no-tags",
+                 "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "origin"] +
+                oids[start:start + 500],
+                cwd=repo_path,
+                timeout=300
+            )
+            if result.returncode != 0:
+                git.log("Fetching pom.xml blobs failed")
+                return None
+
+        result = git._capture_git([git.git_cmd, "cat-file", "--batch"], repo_path,
+                                  input_bytes="\n".join(oids).encode('ascii') + b"\n", timeout=300)
+        if result.returncode != 0:
+            return None
+        contents, data, pos = {}, result.stdout, 0
+        while pos < len(data):
+            end = data.index(b"\n", pos)
+            header = data[pos:end].split()
+            pos = end + 1
+            if len(header) != 3:
+                continue  # "<oid> missing"
+            size = int(header[2])
+            contents[header[0].decode('ascii')] = data[pos:pos + size].decode('utf-8', errors='replace')
+            pos += size + 1
+        return {path: contents[oid] for path, oid in blobs.items() if oid in contents}
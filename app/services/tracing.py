@@ -0,0 +1,115 @@
+"""
+Build tracing in Chrome trace-event format
+Every pipeline stage, git command and Maven run becomes a span on the lane of
+the pool thread that ran it; the export opens in chrome://tracing or Perfetto
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+_local = threading.local()
+
+# Lane order in the viewer: pool threads grouped by pipeline stage
+LANE_ORDER = ("sync", "check", "build", "record")
+
+
+class Tracer:
+    """Collects the spans of one build batch"""
+
+    def __init__(self, name: str, metadata: Optional[Dict] = None):
+        self.name = name
+        self.metadata = dict(metadata or {})
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.events: List[Dict] = []
+        self.lanes: Dict = {}
+        self.lock = threading.Lock()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _lane(self, name: Optional[str] = None) -> int:
+        """Trace tid of the calling thread (or of a named lane); named the first time it is seen"""
+        key = name or threading.get_ident()
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = len(self.lanes) + 1
+            self.lanes[key] = lane
+            thread_name = name or threading.current_thread().name
+            stage = next((i for i, s in enumerate(LANE_ORDER) if thread_name.startswith(s)), len(LANE_ORDER))
+            self.events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": lane,
+                                "args": {"name": thread_name}})
+            self.events.append({"ph": "M", "name": "thread_sort_index", "pid": 1, "tid": lane,
+                                "args": {"sort_index": stage * 1000 + lane}})
+        return lane
+
+    @contextmanager
+    def span(self, name: str, cat: str = "build", **args):
+        """Record a complete event around the block; the yielded dict can take extra args"""
+        args = dict(getattr(_local, "context", {}), **args)
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            end = self._now_us()
+            with self.lock:
+                self.events.append({"ph": "X", "name": name, "cat": cat, "pid": 1, "tid": self._lane(),
+                                    "ts": round(start, 1), "dur": round(end - start, 1), "args": args})
+
+    def complete(self, name: str, cat: str, start: float, end: float, lane: str, **args):
+        """Span timed elsewhere (perf_counter seconds), e.g. a command run off this thread"""
+        args = dict(getattr(_local, "context", {}), **args)
+        with self.lock:
+            self.events.append({"ph": "X", "name": name, "cat": cat, "pid": 1, "tid": self._lane(lane),
+                                "ts": round((start - self.origin) * 1e6, 1),
+                                "dur": round((end - start) * 1e6, 1), "args": args})
+
+    def instant(self, name: str, cat: str = "build", **args):
+        with self.lock:
+            self.events.append({"ph": "i", "s": "t", "name": name, "cat": cat, "pid": 1,
+                                "tid": self._lane(), "ts": round(self._now_us(), 1), "args": args})
+
+    def counter(self, name: str, values: Dict[str, float]):
+        """Counter track, e.g. busy slots per stage over time"""
+        with self.lock:
+            self.events.append({"ph": "C", "name": name, "pid": 1, "ts": round(self._now_us(), 1),
+                                "args": dict(values)})
+
+    def to_chrome(self) -> Dict:
+        with self.lock:
+            events = list(self.events)
+        process = {"ph": "M", "name": "process_name", "pid": 1, "args": {"name": self.name}}
+        return {
+            "traceEvents": [process] + events,
+            "displayTimeUnit": "ms",
+            "otherData": dict(self.metadata, started=self.started)
+        }
+
+
+@contextmanager
+def activate(tracer: Optional[Tracer], **context):
+    """Make tracer the target of span() in this thread; context is added to every span"""
+    previous = (getattr(_local, "tracer", None), getattr(_local, "context", {}))
+    _local.tracer = tracer
+    _local.context = dict(previous[1], **context)
+    try:
+        yield tracer
+    finally:
+        _local.tracer, _local.context = previous
+
+
+def current() -> Optional[Tracer]:
+    return getattr(_local, "tracer", None)
+
+
+@contextmanager
+def span(name: str, cat: str = "build", **args):
+    """Span on the active tracer of this thread, or nothing when tracing is off"""
+    tracer = current()
+    if tracer is None:
+        yield dict(args)
+        return
+    with tracer.span(name, cat, **args) as span_args:
+        yield span_args
@@ -0,0 +1,395 @@
+"""
+Workspace disk management
+Tracks the size and last build of every working copy under workspace/, evicts
+the least recently built ones when the workspace outgrows its quota or the disk
+runs low, and keeps active repositories packed with git maintenance while the
+builder is idle
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .git_engine import CancelToken, cancel_scope
+from .journal_store import JournalStore
+
+GB = 1024 ** 3
+
+
+def dir_size(path: Path) -> Tuple[int, int]:
+    """Bytes under path, and how many of them are Maven target/ directories"""
+    total = target = 0
+    stack = [(Path(path), False)]
+    while stack:
+        current, in_target = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        has_pom = any(e.name == "pom.xml" for e in entries)
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), in_target or (has_pom and entry.name == "target")))
+                elif entry.is_file(follow_symlinks=False):
+                    size = entry.stat(follow_symlinks=False).st_size
+                    total += size
+                    if in_target:
+                        target += size
+            except OSError:
+                continue
+    return total, target
+
+
+class WorkspaceManager:
+    """
+    Size, last use and upkeep of the working copies in the workspace
+
+    Working copies live at <group>/<service>[@<branch>]; bare mirrors under
+    .mirrors and the shared Maven repository under .m2 count towards the
+    quota but only working copies and mirrors without worktrees are evicted.
+    Sizes are measured lazily (while idle, or before a batch) for copies
+    used since their last measurement, so the build stages only record a
+    timestamp.
+    """
+
+    def __init__(self, workspace_dir: Path, store_path: str, build_cache, git_service=None,
+                 mirrors=None, repo_lock: Optional[Callable[[Path], threading.Lock]] = None,
+                 log: Callable[[str], None] = print, quota_gb: float = 0, min_free_gb: float = 2):
+        self.workspace_dir = Path(workspace_dir).resolve()
+        # Keys: "copy/<group>/<name>", "mirror/<name>", "shared/<name>" -> usage record
+        self.store = JournalStore(store_path)
+        self.build_cache = build_cache
+        self.git_service = git_service
+        self.mirrors = mirrors
+        self.repo_lock = repo_lock or (lambda path: threading.Lock())
+        self.log = log
+        self.quota_bytes = int(quota_gb * GB)  # 0: no quota, only the free-space floor
+        self.min_free_bytes = int(min_free_gb * GB)
+        self.evict_lock = threading.Lock()
+        self.evictions = 0
+
+        # Idle maintenance
+        self.idle_after = 300.0  # seconds without a batch before maintenance starts
+        self.maintenance_interval = 24 * 3600.0  # at most once a day per repository
+        self.shared_remeasure = 3600.0
+        self.poll_interval = 30.0
+        self.is_idle: Callable[[], bool] = lambda: True
+        self.last_busy = time.time()
+        self.maintenance_token: Optional[CancelToken] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def configure(self, quota_gb: Optional[float] = None, min_free_gb: Optional[float] = None):
+        if quota_gb is not None:
+            self.quota_bytes = int(max(0.0, quota_gb) * GB)
+        if min_free_gb is not None:
+            self.min_free_bytes = int(max(0.0, min_free_gb) * GB)
+        self.log(f"💾 Workspace quota: {self._gb(self.quota_bytes) if self.quota_bytes else 'none'}, "
+                 f"keep {self._gb(self.min_free_bytes)} free")
+
+    @staticmethod
+    def _gb(size: int) -> str:
+        return f"{size / GB:.1f} GB"
+
+    def _key(self, path: Path) -> Optional[str]:
+        """Store key of a working copy or mirror path, None if it is not one"""
+        try:
+            rel = Path(path).resolve().relative_to(self.workspace_dir)
+        except ValueError:
+            return None
+        parts = rel.parts
+        if len(parts) == 2 and parts[0] == ".mirrors":
+            return f"mirror/{parts[1]}"
+        if len(parts) == 2 and not parts[0].startswith("."):
+            return f"copy/{parts[0]}/{parts[1]}"
+        return None
+
+    def _path(self, key: str) -> Path:
+        kind, rest = key.split("/", 1)
+        return self.workspace_dir / ".mirrors" / rest if kind == "mirror" else self.workspace_dir / rest
+
+    def touch(self, repo_dir: Path, mirror: Optional[Path] = None):
+        """A build just used repo_dir (and the mirror it is a worktree of)"""
+        now = time.time()
+        for path in (repo_dir, mirror):
+            key = self._key(path) if path is not None else None
+            if key:
+                self.store.update(key, lambda entry: dict(entry or {}, last_used=now, present=True))
+
+    def refresh(self):
+        """Pick up copies created outside touch() and measure the ones used since their last measurement"""
+        found = set()
+        if self.workspace_dir.is_dir():
+            for group in self.workspace_dir.iterdir():
+                if not group.is_dir():
+                    continue
+                if group.name == ".mirrors":
+                    found.update(f"mirror/{m.name}" for m in group.iterdir() if m.is_dir())
+                elif not group.name.startswith("."):
+                    found.update(f"copy/{group.name}/{c.name}" for c in group.iterdir() if c.is_dir())
+
+        now = time.time()
+        for key in found:
+            entry = self.store.get(key) or {}
+            if entry.get("present") and entry.get("measured", 0) >= entry.get("last_used", 0):
+                continue
+            path = self._path(key)
+            size, target = dir_size(path)
+            last_used = entry.get("last_used") or path.stat().st_mtime
+            self.store.put(key, dict(entry, present=True, last_used=last_used, bytes=size,
+                                     target_bytes=target, measured=now))
+        for key, entry in self.store.items("copy/") + self.store.items("mirror/"):
+            if entry.get("present") and key not in found:
+                self.store.put(key, dict(entry, present=False))
+
+        m2 = self.workspace_dir / ".m2"
+        entry = self.store.get("shared/.m2") or {}
+        if m2.is_dir() and now - entry.get("measured", 0) >= self.shared_remeasure:
+            self.store.put("shared/.m2", {"bytes": dir_size(m2)[0], "measured": now, "present": True})
+
+    def total_bytes(self) -> int:
+        return sum(e.get("bytes", 0) for _, e in self.store.items() if e.get("present"))
+
+    def free_bytes(self) -> int:
+        return shutil.disk_usage(self.workspace_dir).free
+
+    def usage(self) -> Dict:
+        """Totals and every tracked copy, least recently used first"""
+        rows = []
+        for key, entry in self.store.items():
+            if not entry.get("present"):
+                continue
+            kind, name = key.split("/", 1)
+            rows.append({"kind": kind, "path": name, "bytes": entry.get("bytes", 0),
+                         "target_bytes": entry.get("target_bytes", 0),
+                         "last_used": entry.get("last_used"), "maintained": entry.get("maintained")})
+        rows.sort(key=lambda r: r["last_used"] or 0)
+        return {
+            "total_bytes": sum(r["bytes"] for r in rows),
+            "target_bytes": sum(r["target_bytes"] for r in rows),
+            "quota_bytes": self.quota_bytes,
+            "free_bytes": self.free_bytes(),
+            "min_free_bytes": self.min_free_bytes,
+            "evictions": self.evictions,
+            "entries": rows
+        }
+
+    def ensure_space(self, keep: Iterable[Path], expected_bytes: int = 0) -> Optional[str]:
+        """
+        Make room for a batch before it starts; returns why it can't run, or None
+
+        Least recently used copies outside keep are evicted while the
+        workspace is over its quota or the disk has less than min_free plus
+        expected_bytes free. Copies in use by another batch are skipped.
+        """
+        keep_keys = {self._key(p) for p in keep}
+        with self.evict_lock:
+            self.refresh()
+            total = self.total_bytes()
+            free = self.free_bytes()
+
+            def short() -> bool:
+                return (self.quota_bytes and total > self.quota_bytes) or \
+                    free < self.min_free_bytes + expected_bytes
+
+            if short():
+                self.log(f"💾 Workspace {self._gb(total)}"
+                         + (f" of {self._gb(self.quota_bytes)} quota" if self.quota_bytes else "")
+                         + f", {self._gb(free)} free: evicting least recently built copies")
+                tracked = self.store.items("copy/") + self.store.items("mirror/")
+                candidates = sorted(
+                    ((e.get("last_used", 0), k) for k, e in tracked if e.get("present") and k not in keep_keys),
+                    key=lambda c: (c[0], c[1].startswith("mirror/"))
+                )
+                reclaimable = sum((self.store.get(k) or {}).get("bytes", 0) for _, k in candidates)
+                if free + reclaimable < self.min_free_bytes + expected_bytes and \
+                        not (self.quota_bytes and total > self.quota_bytes):
+                    # Evicting everything still wouldn't make room: keep the copies
+                    candidates = []
+                for _, key in candidates:
+                    if not short():
+                        break
+                    freed = self._evict(key)
+                    if freed is not None:
+                        total -= freed
+                        free = self.free_bytes()
+
+            if free < self.min_free_bytes + expected_bytes:
+                return (f"Not enough disk space: {self._gb(free)} free in {self.workspace_dir}, "
+                        f"{self._gb(self.min_free_bytes + expected_bytes)} needed")
+            if self.quota_bytes and total > self.quota_bytes:
+                self.log(f"⚠️ Workspace still over quota ({self._gb(total)}): "
+                         f"everything left is in use or part of this batch")
+        return None
+
+    def expected_growth(self, repo_dirs: Iterable[Path]) -> int:
+        """Bytes the batch will add: the last known size of each copy that isn't on disk"""
+        growth = 0
+        for path in repo_dirs:
+            key = self._key(path)
+            if key and not Path(path).is_dir():
+                growth += (self.store.get(key) or {}).get("bytes", 0)
+        return growth
+
+    def _evict(self, key: str) -> Optional[int]:
+        """Remove one copy or mirror; bytes freed, or None if it is in use"""
+        path = self._path(key)
+        entry = self.store.get(key) or {}
+        if key.startswith("mirror/"):
+            removed = self._evict_mirror(path)
+        else:
+            removed = self._evict_copy(key, path)
+        if not removed:
+            return None
+        self.store.put(key, dict(entry, present=False, evicted=time.time()))
+        self.evictions += 1
+        size = entry.get("bytes", 0)
+        self.log(f"🧹 Evicted {key.split('/', 1)[1]} ({self._gb(size)}, last built "
+                 f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.get('last_used', 0)))})")
+        return size
+
+    def _evict_copy(self, key: str, path: Path) -> bool:
+        lock = self.repo_lock(path)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            git_file = path / ".git"
+            mirror = self._worktree_mirror(git_file)
+            if mirror is not None and self.git_service and self.mirrors:
+                mirror_lock = self.mirrors.mirror_lock(mirror)
+                if mirror_lock.acquire(blocking=False):
+                    try:
+                        git = self.git_service
+                        git._run_git_command([git.git_cmd, "worktree", "remove", "--force", str(path)],
+                                             cwd=mirror, timeout=300)
+                    finally:
+                        mirror_lock.release()
+            # A worktree whose mirror is busy is unregistered by the next prune
+            shutil.rmtree(path, ignore_errors=True)
+            if path.exists():
+                return False
+            service, _, copy = path.name.partition("@")
+            self.build_cache.forget_copy(service, copy or None)
+            return True
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _worktree_mirror(git_file: Path) -> Optional[Path]:
+        """The repository a worktree's .git file points into (…/<mirror>/worktrees/<id>)"""
+        try:
+            if not git_file.is_file():
+                return None
+            gitdir = Path(git_file.read_text().split(":", 1)[1].strip())
+        except (OSError, IndexError):
+            return None
+        return gitdir.parent.parent.resolve() if gitdir.parent.name == "worktrees" else None
+
+    def _evict_mirror(self, mirror: Path) -> bool:
+        if not self.mirrors:
+            return False
+        lock = self.mirrors.mirror_lock(mirror)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            if self.git_service:
+                git = self.git_service
+                git._run_git_command([git.git_cmd, "worktree", "prune"], cwd=mirror, timeout=60)
+            admin = mirror / "worktrees"
+            if admin.is_dir() and any(admin.iterdir()):
+                return False  # still checked out somewhere
+            shutil.rmtree(mirror, ignore_errors=True)
+            return not mirror.exists()
+        finally:
+            lock.release()
+
+    def start(self, is_idle: Callable[[], bool]):
+        """Run git maintenance on recently used repositories whenever the builder has been idle a while"""
+        self.is_idle = is_idle
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._maintenance_loop, name="workspace-maintenance",
+                                           daemon=True)
+            self.thread.start()
+
+    def pause(self):
+        """A batch is starting: stop any maintenance now, its locks and I/O are needed"""
+        self.last_busy = time.time()
+        token = self.maintenance_token
+        if token is not None:
+            token.cancel()
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if not self.is_idle():
+                self.last_busy = time.time()
+                continue
+            if time.time() - self.last_busy < self.idle_after:
+                continue
+            try:
+                self.maintain()
+            except Exception as e:
+                self.log(f"⚠️ Workspace maintenance failed: {e}")
+
+    def maintain(self) -> int:
+        """One idle round: measure, repack active repositories, enforce the quota; repos maintained"""
+        token = self.maintenance_token = CancelToken()
+        try:
+            with self.evict_lock:
+                self.refresh()
+            now = time.time()
+            due = []
+            for key, entry in self.store.items("copy/") + self.store.items("mirror/"):
+                if not entry.get("present") or now - entry.get("maintained", 0) < self.maintenance_interval:
+                    continue
+                # Active: fetched or built into since the last maintenance
+                if entry.get("last_used", 0) > entry.get("maintained", 0):
+                    due.append((entry.get("last_used", 0), key))
+
+            done = 0
+            for _, key in sorted(due, reverse=True):
+                if token.cancelled or not self.is_idle():
+                    break
+                if self._maintain_repo(key, token):
+                    done += 1
+            if done:
+                self.log(f"🔧 Git maintenance on {done} repositories")
+            if not token.cancelled and self.is_idle():
+                self.ensure_space(())
+            return done
+        finally:
+            self.maintenance_token = None
+
+    def _maintain_repo(self, key: str, token: CancelToken) -> bool:
+        path = self._path(key)
+        if key.startswith("mirror/"):
+            if not self.mirrors:
+                return False
+            lock = self.mirrors.mirror_lock(path)
+        else:
+            if not (path / ".git").is_dir():
+                return False  # worktrees share their mirror's objects
+            lock = self.repo_lock(path)
+        if not self.git_service or not lock.acquire(blocking=False):
+            return False
+        try:
+            git = self.git_service
+            with cancel_scope(token):
+                if key.startswith("mirror/"):
+                    git._run_git_command([git.git_cmd, "worktree", "prune"], cwd=path, timeout=60)
+                result = git._run_git_command([git.git_cmd, "maintenance", "run", "--task=gc", "--quiet"],
+                                              cwd=path, timeout=1800)
+                if result.returncode != 0 and "maintenance" in result.stderr and not token.cancelled:
+                    # git < 2.29 has no maintenance command
+                    result = git._run_git_command([git.git_cmd, "gc", "--quiet"], cwd=path, timeout=1800)
+            if token.cancelled or result.returncode != 0:
+                return False
+            size, target = dir_size(path)
+            self.store.update(key, lambda entry: dict(entry or {}, maintained=time.time(), bytes=size,
+                                                      target_bytes=target, measured=time.time()))
+            return True
+        finally:
+            lock.release()
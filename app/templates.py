@@ -908,6 +908,11 @@ HTML_TEMPLATE = r"""
             logOutput.innerHTML += `<span style="color: #4CAF50;">✅ Success: ${data.success}</span><br>`;
             logOutput.innerHTML += `<span style="color: #f44336;">❌ Failed: ${data.failed}</span><br>`;
             logOutput.innerHTML += `<span style="color: #FF9800;">⭐ Skipped: ${data.skipped}</span><br>`;
+            if (data.analysis && data.analysis.services) {
+                const a = data.analysis;
+                logOutput.innerHTML += `<span>🔬 Makespan ${a.makespan_s}s (best ${a.best_makespan_s}s), build slots ${Math.round(a.build_utilization * 100)}% busy</span><br>`;
+                logOutput.innerHTML += `<span>🔬 Bottleneck: ${a.bottleneck} - ${a.advice}</span><br>`;
+            }
             logOutput.innerHTML += '<span style="color: #4CAF50; font-weight: bold;">========================================</span><br>';
             logOutput.scrollTop = logOutput.scrollHeight;
         });
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Orchestrator benchmark - end-to-end builds of a synthetic fleet
+Generates local bare repos, puts stub mvn/git first on PATH and reports
+orchestrator overhead per service, throughput per worker count and the cost
+of the log pipeline; needs git but no network and no Maven
+
+    python benchmark.py --services 20 --modules 4 --workers 1,2,4
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from benchmarks.fleet import FleetSpec
+from benchmarks.harness import format_report, run_benchmark
+
+
+def parse_range(value: str) -> tuple:
+    low, _, high = value.partition("-")
+    return (float(low), float(high or low))
+
+
+def parse_args(argv=None):
+    defaults = FleetSpec()
+    parser = argparse.ArgumentParser(description="Benchmark build_services on a synthetic fleet")
+    parser.add_argument("--dir", help="benchmark directory (default: a new temporary directory)")
+    parser.add_argument("--services", type=int, default=defaults.services)
+    parser.add_argument("--modules", type=int, default=defaults.modules, help="Maven modules per service")
+    parser.add_argument("--max-deps", type=int, default=defaults.max_dependencies,
+                        help="upstream services per service at most")
+    parser.add_argument("--dep-probability", type=float, default=defaults.dependency_probability)
+    parser.add_argument("--build-seconds", default="1-4", help="stub Maven duration range, e.g. 1-4")
+    parser.add_argument("--memory-mb", default="64-256", help="stub Maven allocation range, e.g. 64-256")
+    parser.add_argument("--log-lines", type=int, default=defaults.log_lines, help="output lines per stub build")
+    parser.add_argument("--git-latency", type=float, default=defaults.git_latency_s,
+                        help="seconds added to every remote git operation")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated build worker counts")
+    parser.add_argument("--json", help="also write the full report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spec = FleetSpec(
+        services=args.services,
+        modules=max(1, args.modules),
+        max_dependencies=args.max_deps,
+        dependency_probability=args.dep_probability,
+        build_seconds=parse_range(args.build_seconds),
+        memory_mb=parse_range(args.memory_mb),
+        log_lines=args.log_lines,
+        git_latency_s=args.git_latency,
+        seed=args.seed,
+    )
+    root = Path(args.dir or tempfile.mkdtemp(prefix="build-bench-"))
+    workers = [int(w) for w in args.workers.split(",")]
+
+    try:
+        report = run_benchmark(root, spec, workers)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print()
+    for line in format_report(report):
+        print(line)
+    print(f"\nBuilder log: {root / 'builder.log'}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"Report: {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
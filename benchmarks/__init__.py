@@ -0,0 +1,5 @@
+"""
+Benchmarks for the build orchestrator
+Synthetic microservice fleets, stub git/Maven executables and an end-to-end
+harness around MicroserviceBuilder.build_services
+"""
@@ -0,0 +1,177 @@
+"""
+Synthetic microservice fleet
+Generates local bare git repos with multi-module Maven reactors and
+inter-service dependencies, plus a stub mvn that sleeps, allocates and logs
+according to a per-service profile and a git wrapper that adds network latency
+"""
+
+import json
+import os
+import random
+import shutil
+import stat
+import subprocess
+import sys
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List
+
+GROUP_ID = "bench.fleet"
+
+
+@dataclass
+class FleetSpec:
+    """Shape of a generated fleet; the same seed always gives the same fleet"""
+    services: int = 12
+    modules: int = 3
+    max_dependencies: int = 2
+    dependency_probability: float = 0.4
+    build_seconds: tuple = (1.0, 4.0)
+    memory_mb: tuple = (64, 256)
+    log_lines: int = 200
+    git_latency_s: float = 0.05
+    seed: int = 42
+
+
+def service_name(idx: int) -> str:
+    return f"svc-{idx:03d}"
+
+
+def _pom(artifact_id: str, dependencies: List[str], modules: List[str], parent: str = None) -> str:
+    deps = "".join(f"<dependency><groupId>{GROUP_ID}</groupId><artifactId>{d}</artifactId>"
+                   f"<version>1.0-SNAPSHOT</version></dependency>" for d in dependencies)
+    mods = "".join(f"<module>{m}</module>" for m in modules)
+    parent_xml = (f"<parent><groupId>{GROUP_ID}</groupId><artifactId>{parent}</artifactId>"
+                  f"<version>1.0-SNAPSHOT</version></parent>") if parent else ""
+    return (f'<project xmlns="http://maven.apache.org/POM/4.0.0">'
+            f"<modelVersion>4.0.0</modelVersion>{parent_xml}"
+            f"<groupId>{GROUP_ID}</groupId><artifactId>{artifact_id}</artifactId>"
+            f"<version>1.0-SNAPSHOT</version><packaging>{'pom' if modules else 'jar'}</packaging>"
+            f"<modules>{mods}</modules><dependencies>{deps}</dependencies></project>\n")
+
+
+def _git(args: List[str], cwd: Path):
+    subprocess.run(["git"] + args, cwd=str(cwd), check=True, capture_output=True)
+
+
+def generate_fleet(root: Path, spec: FleetSpec) -> Dict:
+    """
+    Create root/src/<svc> working trees and root/remotes/<svc>.git bare repos
+
+    Service i may depend on the API module of services before it, so the
+    graph is always acyclic. Returns the profile the stubs read.
+    """
+    rng = random.Random(spec.seed)
+    src_root = root / "src"
+    remotes = root / "remotes"
+    for path in (src_root, remotes):
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+    services = {}
+    for idx in range(spec.services):
+        name = service_name(idx)
+        upstream = [service_name(j) for j in range(idx)
+                    if rng.random() < spec.dependency_probability][-spec.max_dependencies:] \
+            if spec.max_dependencies else []
+        modules = [f"{name}-api"] + [f"{name}-mod{m}" for m in range(1, spec.modules)]
+
+        repo = src_root / name
+        repo.mkdir()
+        (repo / "pom.xml").write_text(_pom(name, [], modules))
+        for module in modules:
+            deps = [f"{u}-api" for u in upstream] if module.endswith("-api") else [f"{name}-api"]
+            (repo / module / "src" / "main" / "java").mkdir(parents=True)
+            (repo / module / "pom.xml").write_text(_pom(module, deps, [], parent=name))
+            (repo / module / "src" / "main" / "java" / "App.java").write_text(
+                f"class App {{ String name = \"{module}\"; }}\n")
+        (repo / ".gitignore").write_text("target/\n")
+
+        _git(["init", "-q", "-b", "main"], repo)
+        _git(["add", "-A"], repo)
+        _git(["-c", "user.email=bench@localhost", "-c", "user.name=bench", "commit", "-q", "-m", "init"], repo)
+        _git(["clone", "-q", "--bare", str(repo), str(remotes / f"{name}.git")], root)
+
+        services[name] = {
+            "upstream": upstream,
+            "modules": len(modules),
+            "build_seconds": round(rng.uniform(*spec.build_seconds), 2),
+            "memory_mb": int(rng.uniform(*spec.memory_mb)),
+            "log_lines": spec.log_lines,
+        }
+
+    profile = {"spec": asdict(spec), "services": services}
+    (root / "profile.json").write_text(json.dumps(profile, indent=2))
+    return profile
+
+
+MVN_STUB = r'''
+import json, os, re, sys, time
+from pathlib import Path
+
+if "--version" in sys.argv or "-v" in sys.argv:
+    print("Apache Maven 3.9.6 (benchmark stub)")
+    sys.exit(0)
+
+cwd = Path.cwd()
+profile = json.loads(Path(os.environ["BENCH_PROFILE"]).read_text())
+# Working copies are named <service> or <service>@<branch>
+service = next((p.split("@")[0] for p in reversed(cwd.parts) if p.split("@")[0] in profile["services"]), None)
+entry = profile["services"].get(service, {})
+
+# Hold the profiled amount of memory, touching every page so it counts as RSS
+block = bytearray(int(entry.get("memory_mb", 64)) * 1024 * 1024)
+for i in range(0, len(block), 4096):
+    block[i] = 1
+
+seconds = entry.get("build_seconds", 1.0)
+lines = max(1, entry.get("log_lines", 0))
+for i in range(lines):
+    print(f"[INFO] Compiling {service} unit {i + 1}/{lines}", flush=True)
+    time.sleep(seconds / lines)
+
+repo_local = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("-Dmaven.repo.local=")), None)
+pom_file = next((sys.argv[i + 1] for i, a in enumerate(sys.argv[:-1]) if a in ("-f", "--file")), "pom.xml")
+poms = [cwd] + [cwd / m for m in re.findall(r"<module>([^<]+)</module>", (cwd / pom_file).read_text())]
+for module in poms:
+    artifact_id = module.name  # generated modules live in a directory named after their artifactId
+    (module / "target").mkdir(exist_ok=True)
+    (module / "target" / f"{artifact_id}-1.0-SNAPSHOT.jar").write_bytes(b"PK" + os.urandom(1024))
+    if repo_local:
+        installed = Path(repo_local).joinpath(*GROUP_ID.split("."), artifact_id, "1.0-SNAPSHOT")
+        installed.mkdir(parents=True, exist_ok=True)
+        (installed / f"{artifact_id}-1.0-SNAPSHOT.jar").write_bytes(b"PK")
+print("[INFO] BUILD SUCCESS")
+'''
+
+# Remote operations pay the simulated network latency, everything else goes straight to git
+GIT_STUB_SH = """#!/bin/sh
+case "$1" in clone|fetch|ls-remote|pull|push) sleep {latency} ;; esac
+exec "{git}" "$@"
+"""
+
+GIT_STUB_CMD = """@echo off
+for %%c in (clone fetch ls-remote pull push) do if "%1"=="%%c" ping -n 1 -w {latency_ms} 192.0.2.1 >nul
+"{git}" %*
+"""
+
+
+def write_stubs(bin_dir: Path, git_latency_s: float) -> Path:
+    """Stub mvn and a latency-adding git wrapper; put bin_dir first on PATH to use them"""
+    real_git = shutil.which("git")
+    if real_git is None:
+        raise RuntimeError("git must be installed to generate the benchmark fleet")
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    mvn = f"GROUP_ID = {GROUP_ID!r}\n" + MVN_STUB
+    if sys.platform.startswith('win'):
+        (bin_dir / "mvn_stub.py").write_text(mvn)
+        (bin_dir / "mvn.cmd").write_text(f'@"{sys.executable}" "{bin_dir / "mvn_stub.py"}" %*\n')
+        (bin_dir / "git.cmd").write_text(GIT_STUB_CMD.format(git=real_git, latency_ms=int(git_latency_s * 1000)))
+    else:
+        (bin_dir / "mvn").write_text(f"#!{sys.executable}\n" + mvn)
+        (bin_dir / "git").write_text(GIT_STUB_SH.format(git=real_git, latency=git_latency_s))
+        for name in ("mvn", "git"):
+            path = bin_dir / name
+            path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return bin_dir
@@ -0,0 +1,313 @@
+"""
+Git sync strategy benchmark
+Builds bare repos with realistic history and many branches, then times cold
+(empty workspace) and warm (remote moved on) syncs for the current GitService
+path and for alternative strategies over the file:// pack protocol
+"""
+
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+WORDS = ("service", "request", "handler", "config", "client", "build", "cache", "event",
+         "stream", "order", "account", "payment", "index", "query", "result", "token")
+
+
+@dataclass
+class RepoSpec:
+    """Shape of each generated repo"""
+    commits: int = 1500
+    files: int = 400
+    file_kb: int = 4
+    files_per_commit: int = 3
+    branches: int = 40
+    branch_commits: int = 5
+    seed: int = 7
+
+
+class Git:
+    """Runs git, counting processes; raises on failure unless check is False"""
+
+    def __init__(self, git_cmd: str = "git"):
+        self.git_cmd = git_cmd
+        self.commands = 0
+
+    def __call__(self, *args, cwd: Optional[Path] = None, check: bool = True,
+                 stdin: Optional[bytes] = None) -> subprocess.CompletedProcess:
+        self.commands += 1
+        result = subprocess.run([self.git_cmd] + [str(a) for a in args], cwd=str(cwd) if cwd else None,
+                                input=stdin, capture_output=True)
+        if check and result.returncode != 0:
+            raise RuntimeError(f"git {' '.join(str(a) for a in args)} failed: "
+                               f"{result.stderr.decode('utf-8', 'replace').strip()}")
+        return result
+
+
+def _text_blob(rng: random.Random, size: int) -> bytes:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS) + (str(rng.randint(0, 999)) if rng.random() < 0.3 else "")
+        words.append(word)
+        length += len(word) + 1
+    return (" ".join(words) + "\n").encode()
+
+
+def _commit(stream: List[bytes], ref: str, mark: int, parent: Optional[str], files: Dict[str, bytes],
+            message: str, when: int):
+    stream.append(f"commit {ref}\nmark :{mark}\n"
+                  f"committer Bench <bench@localhost> {when} +0000\n".encode())
+    msg = message.encode()
+    stream.append(f"data {len(msg)}\n".encode() + msg + b"\n")
+    if parent:
+        stream.append(f"from {parent}\n".encode())
+    for path, content in files.items():
+        stream.append(f"M 100644 inline {path}\ndata {len(content)}\n".encode() + content + b"\n")
+    stream.append(b"\n")
+
+
+def generate_repo(git: Git, bare: Path, spec: RepoSpec, seed: int):
+    """Linear main history plus short-lived feature branches, written with fast-import"""
+    rng = random.Random(seed)
+    git("init", "-q", "--bare", "-b", "main", bare)
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=bare)
+
+    size = spec.file_kb * 1024
+    paths = [f"module{i % 8}/src/main/java/pkg{i % 40}/File{i}.java" for i in range(spec.files)]
+    stream: List[bytes] = []
+    when = 1_600_000_000
+    _commit(stream, "refs/heads/main", 1, None, {"pom.xml": b"<project/>\n",
+                                                 **{p: _text_blob(rng, size) for p in paths}}, "initial", when)
+    mark = main_tip = 1
+    branch_points = sorted(rng.sample(range(2, spec.commits + 1), min(spec.branches, spec.commits - 1)))
+    for idx in range(2, spec.commits + 1):
+        mark += 1
+        when += 600
+        changed = {p: _text_blob(rng, size) for p in rng.sample(paths, spec.files_per_commit)}
+        _commit(stream, "refs/heads/main", mark, f":{main_tip}", changed, f"change {idx}", when)
+        main_tip = mark
+        while branch_points and branch_points[0] == idx:
+            branch_points.pop(0)
+            ref = f"refs/heads/feature/f{main_tip:05d}"
+            parent = f":{main_tip}"
+            for step in range(spec.branch_commits):
+                mark += 1
+                changed = {p: _text_blob(rng, size) for p in rng.sample(paths, spec.files_per_commit)}
+                _commit(stream, ref, mark, parent, changed, f"feature work {step}", when + step)
+                parent = f":{mark}"
+    git("fast-import", "--quiet", cwd=bare, stdin=b"".join(stream))
+    git("gc", "-q", cwd=bare)
+
+
+def advance_remote(git: Git, bare: Path, branch: str, rng: random.Random, commits: int = 3):
+    """Push a few new commits onto branch, as a teammate would between two builds"""
+    tip = git("rev-parse", f"refs/heads/{branch}", cwd=bare).stdout.decode().strip()
+    stream: List[bytes] = []
+    parent = tip
+    for idx in range(commits):
+        _commit(stream, f"refs/heads/{branch}", idx + 1, parent,
+                {f"module0/src/main/java/pkg0/New{rng.randint(0, 10 ** 6)}.java": _text_blob(rng, 2048)},
+                f"new work {idx}", int(time.time()))
+        parent = f":{idx + 1}"
+    git("fast-import", "--quiet", "--force", cwd=bare, stdin=b"".join(stream))
+
+
+# --- strategies: sync(git, url, dest, branch, cache_dir) leaves dest checked out at the remote tip ---
+
+def _current(git_cmd: str) -> Callable:
+    """The live GitService path, so the benchmark follows whatever the builder does today"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+    from services.git_service import GitService
+
+    class CountingGitService(GitService):
+        def __init__(self, counter: Git):
+            super().__init__(git_cmd)
+            self.counter = counter
+            self.set_log_callback(lambda message: None)
+
+        def _run_git_command(self, args, *a, **kw):
+            self.counter.commands += 1
+            return super()._run_git_command(args, *a, **kw)
+
+    def sync(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+        if not CountingGitService(git).clone_or_update_repo(url, dest, branch):
+            raise RuntimeError("GitService sync failed")
+    return sync
+
+
+def full_clone(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+    if not (dest / ".git").exists():
+        git("clone", "-q", "--no-tags", "--branch", branch, url, dest)
+        return
+    git("fetch", "-q", "--prune", "origin", cwd=dest)
+    git("checkout", "-q", "-f", "-B", branch, f"origin/{branch}", cwd=dest)
+
+
+def partial_clone(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+    if not (dest / ".git").exists():
+        git("clone", "-q", "--no-tags", "--filter=blob:none", "--single-branch", "--branch", branch, url, dest)
+        return
+    git("fetch", "-q", "--filter=blob:none", "origin", branch, cwd=dest)
+    git("checkout", "-q", "-f", "-B", branch, "FETCH_HEAD", cwd=dest)
+
+
+def mirror_worktree(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+    mirror = cache_dir / (Path(url).stem + ".git")
+    if not mirror.exists():
+        git("clone", "-q", "--mirror", url, mirror)
+    else:
+        git("fetch", "-q", "--prune", cwd=mirror)
+    if not (dest / ".git").exists():
+        git("worktree", "add", "-q", "--force", "--detach", dest, branch, cwd=mirror)
+    else:
+        git("checkout", "-q", "-f", "--detach", branch, cwd=dest)
+
+
+def refspec_fetch(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+    if not (dest / ".git").exists():
+        git("init", "-q", dest)
+        git("remote", "add", "origin", url, cwd=dest)
+    git("fetch", "-q", "--no-tags", "origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}", cwd=dest)
+    git("checkout", "-q", "-f", "-B", branch, "FETCH_HEAD", cwd=dest)
+
+
+def refspec_fetch_shallow(git: Git, url: str, dest: Path, branch: str, cache_dir: Path):
+    if not (dest / ".git").exists():
+        git("init", "-q", dest)
+        git("remote", "add", "origin", url, cwd=dest)
+    git("fetch", "-q", "--no-tags", "--depth", "1", "origin",
+        f"+refs/heads/{branch}:refs/remotes/origin/{branch}", cwd=dest)
+    git("checkout", "-q", "-f", "-B", branch, "FETCH_HEAD", cwd=dest)
+
+
+STRATEGIES: Dict[str, Callable] = {
+    "full-clone": full_clone,
+    "partial-clone": partial_clone,
+    "mirror-worktree": mirror_worktree,
+    "refspec-fetch": refspec_fetch,
+    "refspec-fetch-shallow": refspec_fetch_shallow,
+}
+
+
+def _disk_mb(*paths: Path) -> float:
+    total = 0
+    for path in paths:
+        if path.exists():
+            for root, _, files in os.walk(path):
+                for name in files:
+                    try:
+                        total += os.lstat(os.path.join(root, name)).st_size
+                    except OSError:
+                        pass
+    return total / (1024 ** 2)
+
+
+def _timed(git: Git, fn: Callable, *args) -> Dict:
+    git.commands = 0
+    start = time.perf_counter()
+    fn(git, *args)
+    return {"seconds": time.perf_counter() - start, "commands": git.commands}
+
+
+def run(root: Path, repos: int, spec: RepoSpec, strategies: List[str], repeats: int = 3,
+        branch: str = "main", git_cmd: str = "git", log: Callable[[str], None] = print) -> Dict:
+    """
+    Time every strategy cold and warm on every repo, repeats times
+
+    Cold starts from an empty workspace (and empty mirror cache); warm
+    re-syncs the same workspace after the remote branch gained commits.
+    """
+    root = Path(root).resolve()
+    git = Git(git_cmd)
+    remotes = root / "remotes"
+    if remotes.exists():
+        shutil.rmtree(remotes)
+    remotes.mkdir(parents=True)
+
+    log(f"🏭 Generating {repos} repos: {spec.commits} commits, {spec.files} files, {spec.branches} branches each")
+    start = time.perf_counter()
+    bares = []
+    for idx in range(repos):
+        bare = remotes / f"repo{idx:02d}.git"
+        generate_repo(git, bare, spec, spec.seed + idx)
+        bares.append(bare)
+    log(f"   generated in {time.perf_counter() - start:.1f}s, {_disk_mb(remotes) / repos:.1f} MB per repo")
+
+    available = dict(STRATEGIES, current=_current(git_cmd))
+    rng = random.Random(spec.seed)
+    results: Dict[str, Dict] = {}
+    for name in strategies:
+        sync = available[name]
+        samples = {"cold": [], "warm": [], "cold_commands": [], "warm_commands": [], "disk_mb": []}
+        for attempt in range(repeats):
+            for bare in bares:
+                url = bare.as_uri()  # file:// uses the pack protocol, like a real remote
+                work = root / "work" / name
+                if work.exists():
+                    shutil.rmtree(work)
+                dest, cache_dir = work / "checkout", work / "mirrors"
+                cache_dir.mkdir(parents=True)
+
+                cold = _timed(git, sync, url, dest, branch, cache_dir)
+                advance_remote(git, bare, branch, rng)
+                warm = _timed(git, sync, url, dest, branch, cache_dir)
+
+                expected = git("rev-parse", f"refs/heads/{branch}", cwd=bare).stdout
+                actual = git("rev-parse", "HEAD", cwd=dest).stdout
+                if expected != actual:
+                    raise RuntimeError(f"{name} left {dest} at {actual.decode().strip()}, "
+                                       f"expected {expected.decode().strip()}")
+                samples["cold"].append(cold["seconds"])
+                samples["warm"].append(warm["seconds"])
+                samples["cold_commands"].append(cold["commands"])
+                samples["warm_commands"].append(warm["commands"])
+                samples["disk_mb"].append(_disk_mb(dest, cache_dir))
+        results[name] = {
+            "cold_s": round(statistics.median(samples["cold"]), 3),
+            "warm_s": round(statistics.median(samples["warm"]), 3),
+            "cold_p90_s": round(sorted(samples["cold"])[int(0.9 * (len(samples["cold"]) - 1))], 3),
+            "warm_p90_s": round(sorted(samples["warm"])[int(0.9 * (len(samples["warm"]) - 1))], 3),
+            "cold_commands": max(samples["cold_commands"]),
+            "warm_commands": max(samples["warm_commands"]),
+            "disk_mb": round(statistics.median(samples["disk_mb"]), 2),
+        }
+        log(f"   {name:<22} cold {results[name]['cold_s']:.3f}s  warm {results[name]['warm_s']:.3f}s")
+    shutil.rmtree(root / "work", ignore_errors=True)
+
+    return {
+        "created": time.time(),
+        "git_version": git("--version").stdout.decode().strip(),
+        "platform": sys.platform,
+        "cpu_count": os.cpu_count(),
+        "repos": repos,
+        "repeats": repeats,
+        "branch": branch,
+        "spec": asdict(spec),
+        "strategies": results,
+    }
+
+
+def format_report(report: Dict, baseline: Optional[Dict] = None) -> List[str]:
+    """Table of strategies; with a baseline report, cold/warm change is shown per strategy"""
+    lines = [f"{report['git_version']}, {report['repos']} repos × {report['repeats']} runs, "
+             f"{report['spec']['commits']} commits / {report['spec']['branches']} branches each",
+             f"{'strategy':<22} {'cold':>8} {'warm':>8} {'cmds cold/warm':>15} {'disk MB':>8}"]
+    if baseline and baseline.get("spec") != report.get("spec"):
+        lines.append("⚠️ Baseline was generated with a different repo spec")
+    for name, row in report["strategies"].items():
+        line = (f"{name:<22} {row['cold_s']:>7.3f}s {row['warm_s']:>7.3f}s "
+                f"{row['cold_commands']:>7}/{row['warm_commands']:<7} {row['disk_mb']:>8.2f}")
+        before = (baseline or {}).get("strategies", {}).get(name)
+        if before:
+            line += (f"  (cold {(row['cold_s'] / before['cold_s'] - 1) * 100:+.0f}%, "
+                     f"warm {(row['warm_s'] / before['warm_s'] - 1) * 100:+.0f}%)")
+        lines.append(line)
+    return lines
@@ -0,0 +1,175 @@
+"""
+End-to-end orchestrator benchmark
+Runs MicroserviceBuilder.build_services against a synthetic fleet with stub
+git/Maven, and separates the time spent in git and Maven processes from the
+time the orchestrator spends around them
+"""
+
+import contextlib
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .fleet import FleetSpec, GROUP_ID, generate_fleet, write_stubs
+
+
+class LogMeter:
+    """Wraps builder.log to count calls and the time spent in them, callbacks included"""
+
+    def __init__(self, log):
+        self.inner = log
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, message: str):
+        start = time.perf_counter()
+        try:
+            self.inner(message)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.calls += 1
+
+    def reset(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+def _external_seconds(trace: Dict) -> Dict[str, Dict[str, float]]:
+    """Seconds and commands each service spent in git and Maven processes, from the batch trace"""
+    per_service: Dict[str, Dict[str, float]] = {}
+    for event in trace.get("traceEvents", []):
+        if event.get("ph") != "X" or event.get("cat") not in ("git", "maven"):
+            continue
+        # Only spans of single processes; "git sync" wraps the commands it runs
+        if event["cat"] == "git" and "cmd" not in event.get("args", {}):
+            continue
+        service = event.get("args", {}).get("service")
+        entry = per_service.setdefault(service, {"git": 0.0, "maven": 0.0, "git_commands": 0})
+        entry[event["cat"]] += event["dur"] / 1e6
+        if event["cat"] == "git":
+            entry["git_commands"] += 1
+    return per_service
+
+
+def _run_batch(builder, configs, meter: LogMeter, force: bool, workers: Optional[int]) -> Dict:
+    meter.reset()
+    start = time.perf_counter()
+    results = builder.build_services(configs, force=force, max_workers=workers)
+    wall = time.perf_counter() - start
+    job_id = builder.history.traces(limit=1)[0]["job_id"]
+    external = _external_seconds(builder.history.get_trace(job_id) or {})
+
+    # Time inside a service's stages that no git or Maven process accounts for
+    overheads = []
+    statuses: Dict[str, int] = {}
+    for result in results:
+        stages = result.get("stages") or {}
+        spent = external.get(result["service"], {})
+        in_stages = sum(v for v in stages.values() if v)
+        overheads.append(max(0.0, in_stages - spent.get("git", 0.0) - spent.get("maven", 0.0)))
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    overheads.sort()
+
+    return {
+        "job_id": job_id,
+        "workers": workers,
+        "force": force,
+        "wall_s": round(wall, 2),
+        "services_per_min": round(len(results) / wall * 60, 1),
+        "statuses": statuses,
+        "maven_s": round(sum(s["maven"] for s in external.values()), 2),
+        "git_s": round(sum(s["git"] for s in external.values()), 2),
+        "git_commands": sum(s["git_commands"] for s in external.values()),
+        "overhead_per_service_s": {
+            "median": round(statistics.median(overheads), 3) if overheads else 0.0,
+            "p90": round(overheads[int(0.9 * (len(overheads) - 1))], 3) if overheads else 0.0,
+            "max": round(overheads[-1], 3) if overheads else 0.0,
+        },
+        "log": {
+            "calls": meter.calls,
+            "seconds": round(meter.seconds, 3),
+            "us_per_call": round(meter.seconds / meter.calls * 1e6, 1) if meter.calls else 0.0,
+            "share_of_wall": round(meter.seconds / wall, 4),
+        },
+    }
+
+
+def run_benchmark(root: Path, spec: FleetSpec, worker_counts: List[int],
+                  log: Callable[[str], None] = print) -> Dict:
+    """
+    Generate the fleet under root, then run one warm-up batch, one forced
+    batch per worker count and one cached batch
+
+    The builder runs with root/run as its working directory, so its
+    workspace, cache and history never touch the real ones.
+    """
+    root = Path(root).resolve()
+    root.mkdir(parents=True, exist_ok=True)
+    log(f"🏭 Generating {spec.services} services × {spec.modules} modules in {root}")
+    profile = generate_fleet(root, spec)
+    bin_dir = write_stubs(root / "bin", spec.git_latency_s)
+
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+    os.environ["BENCH_PROFILE"] = str(root / "profile.json")
+    run_dir = root / "run"
+    run_dir.mkdir(exist_ok=True)
+    os.chdir(run_dir)
+
+    # Imported late: the app creates its cache and workspace relative to the working directory
+    from app.services.builder import BuildConfig, MicroserviceBuilder
+
+    builder = MicroserviceBuilder("workspace")
+    builder.max_workers = max(builder.max_workers, max(worker_counts))
+    # What the web UI pays per line: one JSON payload per connected client
+    builder.add_log_callback(lambda message: json.dumps({'message': message}))
+    meter = LogMeter(builder.log)
+    builder.log = meter
+    if builder.git_service:
+        builder.git_service.set_log_callback(meter)
+
+    # The opt-in sync and cache modes are what the benchmark measures
+    configs = [BuildConfig(name, GROUP_ID, str(root / "remotes" / f"{name}.git"), "main", "", [], "",
+                           artifact_cache=True, fast_sync=True, worktrees=True, preflight=True)
+               for name in profile["services"]]
+
+    runs = []
+    log(f"⏱️ Warm-up batch, then {len(worker_counts)} measured batches and a cached one "
+        f"(builder output in {root / 'builder.log'})")
+    with open(root / "builder.log", 'w', encoding='utf-8') as out, contextlib.redirect_stdout(out):
+        warmup = _run_batch(builder, configs, meter, force=True, workers=max(worker_counts))
+        for workers in worker_counts:
+            runs.append(_run_batch(builder, configs, meter, force=True, workers=workers))
+        cached = _run_batch(builder, configs, meter, force=False, workers=max(worker_counts))
+
+    return {
+        "fleet": profile["spec"],
+        "root": str(root),
+        "cpu_count": os.cpu_count(),
+        "edges": sum(len(s["upstream"]) for s in profile["services"].values()),
+        "stub_build_s": round(sum(s["build_seconds"] for s in profile["services"].values()), 2),
+        "warmup": warmup,
+        "runs": runs,
+        "cached": cached,
+    }
+
+
+def format_report(report: Dict) -> List[str]:
+    """Table of the measured batches"""
+    fleet = report["fleet"]
+    lines = [
+        f"Fleet: {fleet['services']} services × {fleet['modules']} modules, {report['edges']} edges, "
+        f"{report['stub_build_s']:.0f}s of stub Maven work, git latency {fleet['git_latency_s']}s, "
+        f"{report['cpu_count']} CPUs",
+        f"{'workers':>7} {'wall':>7} {'svc/min':>8} {'maven':>7} {'git':>6} {'cmds':>5} "
+        f"{'overhead/svc p50':>17} {'p90':>6} {'log calls':>10} {'µs/call':>8} {'log %':>6}",
+    ]
+    for label, run in [(str(r["workers"]), r) for r in report["runs"]] + [("cached", report["cached"])]:
+        overhead = run["overhead_per_service_s"]
+        lines.append(
+            f"{label:>7} {run['wall_s']:>6.1f}s {run['services_per_min']:>8.1f} {run['maven_s']:>6.1f}s "
+            f"{run['git_s']:>5.1f}s {run['git_commands']:>5} {overhead['median']:>16.3f}s {overhead['p90']:>5.2f}s "
+            f"{run['log']['calls']:>10} {run['log']['us_per_call']:>8.1f} {run['log']['share_of_wall'] * 100:>5.1f}%")
+    return lines
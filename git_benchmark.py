@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Git sync strategy benchmark
+Times the current clone/update path against full clone, partial clone,
+mirror + worktree and targeted refspec fetches on generated local repos,
+cold and warm, and writes a JSON report that later runs can be compared to
+
+    python git_benchmark.py --repos 3 --commits 3000 --json git-sync.json
+    python git_benchmark.py --baseline git-sync.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from benchmarks.git_strategies import STRATEGIES, RepoSpec, format_report, run
+
+
+def parse_args(argv=None):
+    defaults = RepoSpec()
+    parser = argparse.ArgumentParser(description="Benchmark git sync strategies on local repos")
+    parser.add_argument("--dir", help="benchmark directory (default: a new temporary directory)")
+    parser.add_argument("--repos", type=int, default=2)
+    parser.add_argument("--commits", type=int, default=defaults.commits)
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--file-kb", type=int, default=defaults.file_kb)
+    parser.add_argument("--branches", type=int, default=defaults.branches)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--strategies", default=",".join(["current"] + list(STRATEGIES)),
+                        help="comma-separated strategies")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    strategies = [s.strip() for s in args.strategies.split(",")]
+    unknown = [s for s in strategies if s != "current" and s not in STRATEGIES]
+    if unknown:
+        print(f"❌ Unknown strategies: {', '.join(unknown)}")
+        return 1
+    spec = RepoSpec(commits=args.commits, files=args.files, file_kb=args.file_kb,
+                    branches=args.branches, seed=args.seed)
+    root = Path(args.dir or tempfile.mkdtemp(prefix="git-bench-"))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    try:
+        report = run(root, args.repos, spec, strategies, repeats=args.repeats)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print()
+    for line in format_report(report, baseline):
+        print(line)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"\nReport: {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
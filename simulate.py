@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Scheduler simulator - replay recorded builds offline
+Compares scheduling policies and worker counts using the durations and memory
+peaks in the build history; needs neither git nor Maven
+
+    python simulate.py                         # every service with history
+    python simulate.py --job 20240101-120000   # the services and edges of one traced batch
+    python simulate.py --workers 2,4,8 --memory-mb 16000 --json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import psutil
+
+# Import the services package on its own so the web app is not initialised
+sys.path.insert(0, str(Path(__file__).parent / "app"))
+
+from services.build_history import BuildHistory
+from services.dependency_graph import DependencyGraph
+from services.mirror_store import branch_slug
+from services.simulator import (POLICIES, compare, format_table, graph_from_edges,
+                                profiles_from_history, profiles_from_trace)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded builds through scheduling policies")
+    parser.add_argument("--db", default=".build_cache/history.db", help="build history database")
+    parser.add_argument("--job", help="replay the services, durations and edges of this traced batch")
+    parser.add_argument("--services", help="comma-separated services (default: all with history)")
+    parser.add_argument("--workspace", default="workspace",
+                        help="workspace whose poms give the dependency edges when no trace is used")
+    parser.add_argument("--workers", help="comma-separated build worker counts (default: 1, 2, 4 ... cores)")
+    parser.add_argument("--policies", default=",".join(POLICIES), help="comma-separated policies")
+    parser.add_argument("--memory-mb", type=float,
+                        help="memory budget for builds (default: total RAM minus 1 GB)")
+    parser.add_argument("--percentile", type=float, default=50, help="duration percentile from history")
+    parser.add_argument("--sync-workers", type=int, default=8)
+    parser.add_argument("--check-workers", type=int, default=2)
+    parser.add_argument("--record-workers", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def workspace_graph(workspace: Path, names, branches: Optional[Dict[str, str]] = None) -> DependencyGraph:
+    """
+    Edges from the poms of repos already in the workspace
+
+    Working copies are workspace/<group>/<service>@<branch> with worktrees
+    (the default) and workspace/<group>/<service> without. The copy of the
+    branch last built according to branches is preferred, then the most
+    recently modified copy of the service.
+    """
+    branches = branches or {}
+    repos = {}
+    for name in names:
+        preferred = [p for p in workspace.glob(f"*/{name}@{branch_slug(branches[name])}")] if name in branches else []
+        others = sorted(list(workspace.glob(f"*/{name}@*")) + list(workspace.glob(f"*/{name}")),
+                        key=lambda p: p.stat().st_mtime, reverse=True)
+        matches = [p for p in preferred + others if (p / "pom.xml").exists()]
+        if matches:
+            repos[name] = matches[0]
+    graph = DependencyGraph.from_repos(repos)
+    for name in names:
+        if name not in graph.upstream:
+            graph.add_service(name, [])
+    return graph
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db = Path(args.db)
+    if not db.exists():
+        print(f"❌ No build history at {db}")
+        return 1
+    history = BuildHistory(str(db))
+    services = [s.strip() for s in args.services.split(",")] if args.services else None
+
+    if args.job:
+        trace = history.get_trace(args.job)
+        if trace is None:
+            print(f"❌ No trace recorded for job {args.job}")
+            return 1
+        profiles = profiles_from_trace(trace)
+        if services:
+            profiles = {n: p for n, p in profiles.items() if n in services}
+        # Memory peaks aren't in the trace; take them from history
+        for name, recorded in profiles_from_history(history, profiles, args.percentile).items():
+            profiles[name].peak_rss_mb = recorded.peak_rss_mb
+        graph = graph_from_edges(profiles, trace.get("otherData", {}).get("edges", []))
+    else:
+        profiles = profiles_from_history(history, services, args.percentile)
+        # The branch each service was last built from picks its worktree
+        branches = {}
+        for name in profiles:
+            latest = history.builds(name, limit=1)
+            if latest and latest[0].get("branch"):
+                branches[name] = latest[0]["branch"]
+        graph = workspace_graph(Path(args.workspace), profiles, branches)
+
+    if not profiles:
+        print("❌ No successful builds recorded for the selected services")
+        return 1
+
+    memory_mb = args.memory_mb or psutil.virtual_memory().total / (1024 ** 2) - 1024
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+    else:
+        cores = psutil.cpu_count(logical=True) or 1
+        worker_counts = sorted({1, 2} | {w for w in (4, 6, 8, 12, 16) if w <= max(4, cores)})
+    policies = [p.strip() for p in args.policies.split(",")]
+    stage_workers = {"sync": args.sync_workers, "check": args.check_workers, "record": args.record_workers}
+
+    try:
+        rows = compare(profiles, graph, policies, worker_counts, memory_mb, stage_workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps({"services": len(profiles), "memory_mb": round(memory_mb), "results": rows}, indent=2))
+        return 0
+
+    edges = sum(len(graph.upstream[n]) for n in graph.nodes)
+    print(f"\n🧪 Simulating {len(profiles)} services, {edges} edges, memory budget {memory_mb:.0f} MB")
+    for line in format_table(rows, memory_mb):
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
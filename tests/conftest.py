@@ -0,0 +1,34 @@
+"""
+Shared test setup
+The services package is imported on its own (as simulate.py does), so the
+tests never initialise the web app or create a workspace in the cwd
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+sys.path.insert(0, str(APP_DIR))
+
+# builder.py imports ..utils, so it needs the app package; register it without
+# running app/__init__.py, which would start the web app and its builder
+if "app" not in sys.modules:
+    package = types.ModuleType("app")
+    package.__path__ = [str(APP_DIR)]
+    sys.modules["app"] = package
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    """A MicroserviceBuilder whose workspace and .build_cache live in tmp_path"""
+    from app.services.builder import MicroserviceBuilder
+
+    monkeypatch.chdir(tmp_path)
+    builder = MicroserviceBuilder(str(tmp_path / "workspace"))
+    builder.log_callbacks.clear()
+    monkeypatch.setattr(builder, "log", lambda message: None)
+    return builder
@@ -0,0 +1,104 @@
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from services.artifact_store import ArtifactStore
+
+
+def make_repo(root, jar=b"jar-v1"):
+    (root / "target").mkdir(parents=True)
+    (root / "pom.xml").write_text("<project><groupId>g</groupId><artifactId>svc</artifactId>"
+                                  "<version>1.0-SNAPSHOT</version></project>")
+    (root / "target" / "svc.jar").write_bytes(jar)
+    return root
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "store"))
+
+
+def test_save_and_restore_round_trip(tmp_path, store):
+    repo = make_repo(tmp_path / "built")
+    m2 = tmp_path / "m2"
+    installed = m2 / "g" / "svc" / "1.0-SNAPSHOT"
+    installed.mkdir(parents=True)
+    (installed / "svc-1.0-SNAPSHOT.jar").write_bytes(b"installed")
+    assert store.save("k" * 64, repo, m2, "svc")
+
+    fresh, fresh_m2 = tmp_path / "fresh", tmp_path / "fresh-m2"
+    (fresh / "target").mkdir(parents=True)
+    (fresh / "pom.xml").write_text((repo / "pom.xml").read_text())
+    assert store.restore("k" * 64, fresh, fresh_m2)
+    assert (fresh / "target" / "svc.jar").read_bytes() == b"jar-v1"
+    assert (fresh_m2 / "g" / "svc" / "1.0-SNAPSHOT" / "svc-1.0-SNAPSHOT.jar").read_bytes() == b"installed"
+    assert store.stats()["hits"] == 1
+
+
+def test_unknown_key_is_a_miss(tmp_path, store):
+    assert not store.restore("0" * 64, tmp_path, tmp_path / "m2")
+    assert store.stats()["misses"] == 1
+
+
+@pytest.fixture
+def keyed(builder):
+    from app.services.builder import BuildConfig
+
+    builder.maven_cmd = "mvn"
+    builder.toolchain_versions["mvn"] = "Apache Maven 3.9.6"
+
+    def key(upstream=None, jvm_options="-Xmx1g"):
+        config = BuildConfig("app", "g", "https://example/app.git", "main", "", [], jvm_options)
+        ctx = builder.new_context(config)
+        ctx.source_hash = "sources-unchanged"
+        ctx.upstream = upstream or {}
+        return builder.artifact_key(ctx)
+    return key
+
+
+def test_rebuilt_upstream_makes_the_downstream_miss(tmp_path, builder, keyed):
+    repo = make_repo(tmp_path / "app")
+    before = keyed({"lib": {"status": "success", "artifact_key": "lib-v1"}})
+    assert builder.artifact_store.save(before, repo, builder.local_repo, "app")
+    assert builder.artifact_store.restore(before, repo, builder.local_repo)
+
+    after = keyed({"lib": {"status": "success", "artifact_key": "lib-v2"}})
+    assert after != before
+    assert not builder.artifact_store.restore(after, repo, builder.local_repo)
+
+
+def test_upstream_without_a_key_disables_the_cache(keyed):
+    assert keyed({"lib": {"status": "skipped", "artifact_key": None}}) is None
+    assert keyed() is not None
+
+
+def test_system_properties_count_but_heap_sizes_do_not(keyed):
+    assert keyed(jvm_options="-Xmx1g") == keyed(jvm_options="-Xmx4g -Xms1g")
+    assert keyed(jvm_options="-Xmx1g -Drevision=2") != keyed(jvm_options="-Xmx1g")
+
+
+@pytest.mark.parametrize("damage", ["truncate", "garbage", "delete"])
+def test_unusable_archive_is_a_miss_and_leaves_the_outputs_alone(tmp_path, store, monkeypatch, damage):
+    repo = make_repo(tmp_path / "built", jar=b"j" * 100_000)
+    assert store.save("k" * 64, repo, tmp_path / "m2", "svc")
+    archive = store._archive("k" * 64)
+    if damage == "truncate":
+        archive.write_bytes(archive.read_bytes()[:60_000])
+    elif damage == "garbage":
+        archive.write_bytes(b"not a tar archive" * 100)
+    else:
+        # Evicted by a concurrent save between the index lookup and the open
+        real_open = tarfile.open
+
+        def evicted(path, *args, **kwargs):
+            Path(path).unlink()
+            return real_open(path, *args, **kwargs)
+        monkeypatch.setattr(tarfile, "open", evicted)
+
+    (repo / "target" / "svc.jar").write_bytes(b"current")
+    assert not store.restore("k" * 64, repo, tmp_path / "m2")
+    assert (repo / "target" / "svc.jar").read_bytes() == b"current"
+    assert [p.name for p in (repo / "target").iterdir()] == ["svc.jar"]
+    assert not store.contains("k" * 64)
+    assert store.stats()["misses"] == 1
@@ -0,0 +1,129 @@
+import itertools
+import os
+
+import pytest
+
+import services.build_cache as build_cache_module
+from services.build_cache import BuildCache
+
+
+class Clock:
+    """Strictly increasing time so LRU order never depends on timer resolution"""
+
+    def __init__(self):
+        self.ticks = itertools.count(1000)
+
+    def time(self):
+        return float(next(self.ticks))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    (path / "src").mkdir(parents=True)
+    (path / "pom.xml").write_text("<project><artifactId>svc</artifactId></project>")
+    (path / "src" / "A.java").write_text("class A {}")
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_cache_module, "time", Clock())
+    return lambda **kwargs: BuildCache(str(tmp_path / "cache"), **kwargs)
+
+
+def build(cache, service, repo, branch, copy=None):
+    key = BuildCache.make_key(branch, "c0ffee", [])
+    cache.mark_built(service, str(repo), branch=branch, key=key, commit="c0ffee", copy=copy)
+    return key
+
+
+def keys(cache):
+    return {(e["service"], e["branch"]) for e in cache.entries()}
+
+
+def test_switching_branches_keeps_both_entries(cache, repo):
+    cache = cache()
+    main = build(cache, "svc", repo, "main")
+    build(cache, "svc", repo, "feature")
+    assert keys(cache) == {("svc", "main"), ("svc", "feature")}
+    # main's outputs are no longer in the working copy, so it needs a build but has an entry
+    assert cache.should_build("svc", str(repo), main)
+    assert cache.lookup("svc", main, cache.get_source_hash(str(repo))) is not None
+
+
+def test_source_change_is_a_miss(cache, repo):
+    cache = cache()
+    key = build(cache, "svc", repo, "main")
+    assert not cache.should_build("svc", str(repo), key)
+    (repo / "src" / "A.java").write_text("class A { int x; }")
+    assert cache.should_build("svc", str(repo), key)
+
+
+def test_least_recently_used_entry_of_a_service_goes_first(cache, repo):
+    cache = cache(max_entries_per_service=2)
+    main = build(cache, "svc", repo, "main")
+    build(cache, "svc", repo, "a")
+    cache.lookup("svc", main, cache.get_source_hash(str(repo)))  # main is used again
+    build(cache, "svc", repo, "b")
+    assert keys(cache) == {("svc", "main"), ("svc", "b")}
+
+
+def test_global_limit_evicts_across_services(cache, repo):
+    cache = cache(max_entries=2)
+    build(cache, "one", repo, "main")
+    build(cache, "two", repo, "main")
+    build(cache, "three", repo, "main")
+    assert keys(cache) == {("two", "main"), ("three", "main")}
+    assert cache.get_cache_info("one") is None
+
+
+def test_entries_survive_a_restart(cache, repo):
+    key = build(cache(), "svc", repo, "main")
+    reopened = cache()
+    assert reopened.is_current("svc", key)
+    assert keys(reopened) == {("svc", "main")}
+
+
+def test_forget_copy_only_clears_that_worktree(cache, repo):
+    cache = cache()
+    main = build(cache, "svc", repo, "main", copy="main")
+    feature = build(cache, "svc", repo, "feature", copy="feature")
+    cache.forget_copy("svc", "main")
+    assert not cache.is_current("svc", main, "main")
+    assert cache.is_current("svc", feature, "feature")
+    assert len(cache.entries()) == 2
+
+
+def test_mark_built_takes_the_source_hash_it_is_given(cache, repo, monkeypatch):
+    cache = cache()
+    monkeypatch.setattr(cache.hasher, "hash_tree", lambda path: pytest.fail("tree walked again"))
+    key = BuildCache.make_key("main", "c0ffee", [])
+    cache.mark_built("svc", str(repo), branch="main", key=key, commit="c0ffee", source_hash="abc")
+    assert cache.lookup("svc", key, "abc") is not None
+
+
+def test_stat_cache_is_stored_per_tree(cache, repo, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "pom.xml").write_text("<project><artifactId>other</artifactId></project>")
+    # Files modified within the last couple of seconds are never cached
+    for path in [repo / "pom.xml", repo / "src" / "A.java", other / "pom.xml"]:
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+
+    first = cache()
+    first.get_source_hash(str(repo))
+    first.get_source_hash(str(other))
+    files = sorted((tmp_path / "cache" / "stat_cache").iterdir())
+    assert len(files) == 2
+    before = {f.name: f.read_text() for f in files}
+
+    (other / "pom.xml").write_text("<project><artifactId>renamed</artifactId></project>")
+    os.utime(other / "pom.xml", (1_000_000_100, 1_000_000_100))
+    first.get_source_hash(str(other))
+    after = {f.name: f.read_text() for f in files}
+    changed = [name for name in before if before[name] != after[name]]
+    assert len(changed) == 1 and changed[0].startswith("other-")
+
+    # A restart reads the saved digests instead of the files
+    assert cache().hasher.hash_tree(repo).hashed == 0
@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from services.build_queue import BuildQueue
+
+
+@dataclass
+class Config:
+    service_name: str
+
+
+class FakeBuilder:
+    """build_services blocks until released, so tests control when jobs end"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+        self.lock = threading.Lock()
+
+    def log(self, message):
+        pass
+
+    def build_services(self, configs, force=False, job_id=None, cancel_event=None, max_workers=None):
+        with self.lock:
+            self.started.append(job_id)
+        while not self.release.is_set() and not cancel_event.is_set():
+            time.sleep(0.01)
+        status = "cancelled" if cancel_event.is_set() else "success"
+        return [{"service": c.service_name, "status": status} for c in configs]
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def make_queue(tmp_path, **kwargs):
+    builder = FakeBuilder()
+    return builder, BuildQueue(builder, history_file=str(tmp_path / "jobs.json"), config_type=Config, **kwargs)
+
+
+def test_jobs_beyond_the_limit_wait_their_turn(tmp_path):
+    builder, jobs = make_queue(tmp_path, max_running_jobs=1)
+    first = jobs.submit("g", [Config("a")])
+    second = jobs.submit("g", [Config("b")])
+    wait_for(lambda: first.status == "running")
+    time.sleep(0.05)
+    assert second.status == "queued"
+
+    builder.release.set()
+    wait_for(lambda: second.status == "completed")
+    assert builder.started == [first.job_id, second.job_id]
+    assert second.summary()["success"] == 1
+
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+    builder, jobs = make_queue(tmp_path, max_running_jobs=1)
+    running = jobs.submit("g", [Config("a")])
+    queued = jobs.submit("g", [Config("b"), Config("c")])
+    wait_for(lambda: running.status == "running")
+
+    assert jobs.cancel(queued.job_id)
+    assert queued.status == "cancelled"
+    assert [r["status"] for r in queued.results] == ["cancelled", "cancelled"]
+
+    assert jobs.cancel(running.job_id)
+    wait_for(lambda: running.status == "cancelled")
+    assert not jobs.cancel(running.job_id)
+    assert queued.job_id not in builder.started
+
+
+def test_unfinished_jobs_come_back_as_interrupted(tmp_path):
+    builder, jobs = make_queue(tmp_path)
+    done = jobs.submit("g", [Config("a")])
+    builder.release.set()
+    wait_for(lambda: done.status == "completed")
+    records = json.loads((tmp_path / "jobs.json").read_text())
+    records.append(dict(records[0], job_id="lost", status="running"))
+    (tmp_path / "jobs.json").write_text(json.dumps(records))
+
+    _, reloaded = make_queue(tmp_path)
+    assert reloaded.get(done.job_id).results == [{"service": "a", "status": "success"}]
+    assert reloaded.get("lost").status == "interrupted"
+
+
+def test_queued_jobs_run_after_a_restart_and_running_ones_are_interrupted(tmp_path):
+    builder, jobs = make_queue(tmp_path, max_running_jobs=1)
+    running = jobs.submit("g", [Config("a")])
+    queued = jobs.submit("g", [Config("b"), Config("c")])
+    wait_for(lambda: running.status == "running")
+
+    restarted_builder, restarted = make_queue(tmp_path)
+    try:
+        assert restarted.get(running.job_id).status == "interrupted"
+        restarted_builder.release.set()
+        wait_for(lambda: restarted.get(queued.job_id).status == "completed")
+        assert restarted_builder.started == [queued.job_id]
+        assert [r["service"] for r in restarted.get(queued.job_id).results] == ["b", "c"]
+    finally:
+        builder.release.set()
+
+
+def test_listener_errors_go_to_the_builder_log(tmp_path):
+    builder, jobs = make_queue(tmp_path)
+    logged = []
+    builder.log = logged.append
+
+    def broken(job):
+        raise RuntimeError("boom")
+    jobs.add_listener(broken)
+    builder.release.set()
+    job = jobs.submit("g", [Config("a")])
+    wait_for(lambda: any("boom" in line for line in logged))
+    assert job.status == "completed"
@@ -0,0 +1,89 @@
+from services.dependency_graph import DependencyGraph, PomInfo, collect_reactor, parse_pom_text
+
+
+def pom(artifact, deps=(), parent=None, group="com.acme"):
+    return PomInfo(group_id=group, artifact_id=artifact, parent=parent,
+                   dependencies=[(group, d) for d in deps])
+
+
+def graph_of(services):
+    graph = DependencyGraph()
+    for name, poms in services.items():
+        graph.add_service(name, poms)
+    graph.link()
+    return graph
+
+
+def test_parse_pom_text_reads_coordinates_dependencies_and_bom_imports():
+    info = parse_pom_text("""
+        <project xmlns="http://maven.apache.org/POM/4.0.0">
+          <parent><groupId>com.acme</groupId><artifactId>parent</artifactId><version>1</version></parent>
+          <artifactId>orders</artifactId>
+          <dependencies>
+            <dependency><groupId>com.acme</groupId><artifactId>common</artifactId></dependency>
+            <dependency><groupId>${project.groupId}</groupId><artifactId>self</artifactId></dependency>
+          </dependencies>
+          <dependencyManagement><dependencies>
+            <dependency><groupId>com.acme</groupId><artifactId>bom</artifactId><scope>import</scope></dependency>
+            <dependency><groupId>com.acme</groupId><artifactId>managed</artifactId></dependency>
+          </dependencies></dependencyManagement>
+          <modules><module>api</module></modules>
+        </project>""")
+    assert info.coordinate == ("com.acme", "orders")
+    assert info.parent == ("com.acme", "parent")
+    assert info.version == "1"
+    assert info.modules == ["api"]
+    assert ("com.acme", "managed") in info.dependencies
+    assert info.requires == [("com.acme", "common"), ("com.acme", "bom")]
+
+
+def test_parse_pom_text_rejects_broken_xml():
+    assert parse_pom_text("<project>") is None
+
+
+def test_link_turns_consumed_artifacts_into_edges():
+    graph = graph_of({
+        "common": [pom("common")],
+        "orders": [pom("orders", deps=["common"])],
+        "billing": [pom("billing", parent=("com.acme", "common"))],
+    })
+    assert graph.upstream["orders"] == {"common"}
+    assert graph.upstream["billing"] == {"common"}
+    assert graph.downstream["common"] == {"orders", "billing"}
+    assert graph.levels() == [["common"], ["orders", "billing"]]
+
+
+def test_cycles_are_reported_and_their_edges_dropped():
+    graph = graph_of({
+        "a": [pom("a", deps=["b"])],
+        "b": [pom("b", deps=["a"])],
+        "c": [pom("c", deps=["a"])],
+    })
+    assert graph.cycles == [["a", "b"]]
+    assert graph.upstream["a"] == set() and graph.upstream["b"] == set()
+    assert graph.upstream["c"] == {"a"}
+    assert set(graph.topological_order()) == {"a", "b", "c"}
+
+
+def test_critical_path_prefers_the_longest_weighted_chain():
+    graph = graph_of({
+        "base": [pom("base")],
+        "slow": [pom("slow", deps=["base"])],
+        "fast": [pom("fast", deps=["base"])],
+        "leaf": [pom("leaf")],
+    })
+    lengths = graph.critical_path_lengths({"base": 1, "slow": 10, "fast": 2, "leaf": 5})
+    assert lengths == {"base": 11, "slow": 10, "fast": 2, "leaf": 5}
+    # Restricted to unfinished services, finished ones no longer count
+    assert graph.critical_path_lengths({"base": 1, "slow": 10}, only={"base", "fast"})["base"] == 2
+
+
+def test_collect_reactor_follows_modules(tmp_path):
+    (tmp_path / "api").mkdir()
+    (tmp_path / "pom.xml").write_text(
+        "<project><groupId>g</groupId><artifactId>root</artifactId><modules><module>api</module></modules></project>")
+    (tmp_path / "api" / "pom.xml").write_text(
+        "<project><parent><groupId>g</groupId><artifactId>root</artifactId></parent><artifactId>api</artifactId></project>")
+    poms = {p.path: p for p in collect_reactor(tmp_path)}
+    assert set(poms) == {"", "api"}
+    assert poms["api"].coordinate == ("g", "api")
@@ -0,0 +1,31 @@
+import pytest
+
+from app.services.builder import BuildConfig, MavenExecutor, MvndExecutor
+
+
+def config(jvm_options="", backend="mvnd"):
+    return BuildConfig("svc", "g", "https://example/svc.git", "main", "", [], jvm_options, maven_backend=backend)
+
+
+@pytest.fixture
+def mvnd_builder(builder):
+    builder.mvnd = MvndExecutor("mvnd", heap_mb=2048)
+    return builder
+
+
+@pytest.mark.parametrize("jvm_options", ["", "-Xmx1g -Dfoo=bar", "-Xmx2048m"])
+def test_builds_that_fit_the_daemon_run_on_mvnd_and_are_admitted_at_its_heap(mvnd_builder, jvm_options):
+    assert mvnd_builder.select_executor(config(jvm_options)) is mvnd_builder.mvnd
+    estimate = mvnd_builder.admission.estimate("svc", mvnd_builder.admission_jvm_options(config(jvm_options)))
+    assert estimate.heap_mb == 2048
+
+
+def test_a_heap_larger_than_the_daemon_falls_back_to_mvn(mvnd_builder):
+    big = config("-Xmx4g")
+    executor = mvnd_builder.select_executor(big)
+    assert type(executor) is MavenExecutor
+    assert mvnd_builder.admission.estimate("svc", mvnd_builder.admission_jvm_options(big)).heap_mb == 4096
+
+
+def test_mvn_builds_keep_their_own_heap(mvnd_builder):
+    assert mvnd_builder.admission_jvm_options(config("-Xmx512m", backend="mvn")) == "-Xmx512m"
@@ -0,0 +1,97 @@
+import asyncio
+import subprocess
+import time
+
+import pytest
+
+from services.git_engine import CANCELLED, CancelToken, GitEngine, _Limiter, cancel_scope, subcommand
+
+
+def test_subcommand_skips_global_options():
+    assert subcommand(["git", "fetch", "origin"]) == "fetch"
+    assert subcommand(["git", "-c", "a.b=c", "-C", "/repo", "--no-pager", "ls-remote", "x"]) == "ls-remote"
+    assert subcommand(["git", "--version"]) == ""
+
+
+def test_limiter_queues_beyond_the_limit_and_follows_limit_changes():
+    async def scenario():
+        limiter = _Limiter(1)
+        await limiter.acquire()
+        waiters = [asyncio.ensure_future(limiter.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert len(limiter.waiters) == 2 and not any(w.done() for w in waiters)
+        limiter.set_limit(3)
+        await asyncio.gather(*waiters)
+        assert limiter.active == 3
+    asyncio.run(scenario())
+
+
+def test_limiter_cancel_while_queued_gives_up_the_place():
+    async def scenario():
+        limiter = _Limiter(1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter.waiters
+        limiter.release()
+        assert limiter.active == 0
+    asyncio.run(scenario())
+
+
+def test_limiter_cancel_after_hand_off_returns_the_slot():
+    async def scenario():
+        limiter = _Limiter(1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()  # the slot goes to the waiter, which hasn't run yet
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.active == 0
+        await asyncio.wait_for(limiter.acquire(), 1)
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def engine():
+    return GitEngine(network_limit=1)
+
+
+def test_run_captures_output_and_timings(engine):
+    lines = []
+    result = engine.run(["sh", "-c", "echo out; echo err >&2; exit 3"],
+                        on_line=lambda stream, line: lines.append((stream, line)))
+    assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+    assert sorted(lines) == [("stderr", "err"), ("stdout", "out")]
+    assert result.started <= result.ended
+
+
+def test_network_commands_share_the_limit(engine, tmp_path):
+    (tmp_path / "fetch").write_text("sleep 0.2\n")
+    futures = [engine.submit(["sh", "fetch"], cwd=str(tmp_path)) for _ in range(2)]
+    first, second = sorted((f.result() for f in futures), key=lambda r: r.started)
+    assert second.started >= first.ended
+
+
+def test_timeout_kills_the_process(engine):
+    started = time.time()
+    with pytest.raises(subprocess.TimeoutExpired):
+        engine.run(["sh", "-c", "echo partial; sleep 10"], timeout=0.3)
+    assert time.time() - started < 5
+    assert engine.stats()["running"] == 0
+
+
+def test_cancel_token_stops_running_and_later_commands(engine):
+    token = CancelToken()
+    with cancel_scope(token):
+        future = engine.submit(["sh", "-c", "sleep 10"])
+    time.sleep(0.2)
+    started = time.time()
+    token.cancel()
+    assert future.result(timeout=5).returncode == CANCELLED
+    assert time.time() - started < 5
+    assert engine.run(["sh", "-c", "echo never"], cancel=token).returncode == CANCELLED
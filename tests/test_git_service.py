@@ -0,0 +1,112 @@
+import subprocess
+
+import pytest
+
+from services.git_service import GitService
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, message, name="pom.xml"):
+    (repo / name).write_text(f"<project><!-- {message} --></project>")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", message, cwd=repo)
+    return git("rev-parse", "HEAD", cwd=repo)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    git("init", "-q", "-b", "main", str(repo))
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=repo)
+    for n in range(3):
+        commit(repo, f"commit {n}")
+    git("checkout", "-q", "-b", "other", cwd=repo)
+    commit(repo, "other branch")
+    git("checkout", "-q", "main", cwd=repo)
+    return repo
+
+
+@pytest.fixture
+def service():
+    service = GitService()
+    service.set_log_callback(lambda _: None)
+    return service
+
+
+def test_clone_then_update_to_the_new_tip(tmp_path, upstream, service):
+    work = tmp_path / "work"
+    url = upstream.as_uri()
+    assert service.sync_repo(url, work, "main") == git("rev-parse", "HEAD", cwd=upstream)
+    assert git("branch", "--show-current", cwd=work) == "main"
+    # Single branch: the other branch is never downloaded
+    assert "other" not in git("branch", "-a", cwd=work)
+
+    head = commit(upstream, "new tip")
+    (work / "pom.xml").write_text("local edit")
+    assert service.sync_repo(url, work, "main") == head
+    assert "new tip" in (work / "pom.xml").read_text()
+    assert git("rev-parse", "HEAD", cwd=work) == head
+
+
+def test_unknown_branch_fails(tmp_path, upstream, service):
+    assert service.sync_repo(upstream.as_uri(), tmp_path / "work", "missing") is None
+    work = tmp_path / "existing"
+    service.sync_repo(upstream.as_uri(), work, "main")
+    assert service.sync_repo(upstream.as_uri(), work, "missing") is None
+
+
+def test_read_ref_follows_symbolic_and_packed_refs(tmp_path, upstream, service):
+    head = git("rev-parse", "HEAD", cwd=upstream)
+    assert service.read_ref(upstream, "HEAD") == head
+    git("pack-refs", "--all", cwd=upstream)
+    assert service.read_ref(upstream, "refs/heads/main") == head
+    assert service.read_ref(upstream, "refs/heads/missing") is None
+
+
+def commits(repo):
+    return int(git("rev-list", "--count", "HEAD", cwd=repo))
+
+
+def test_depth_is_kept_on_update(tmp_path, upstream, service):
+    work = tmp_path / "work"
+    service.sync_repo(upstream.as_uri(), work, "main", depth=1)
+    assert service.is_shallow(work) and commits(work) == 1
+    commit(upstream, "four")
+    commit(upstream, "five")
+    service.sync_repo(upstream.as_uri(), work, "main", depth=1)
+    assert service.is_shallow(work) and commits(work) == 1
+
+
+def test_full_history_request_unshallows(tmp_path, upstream, service):
+    work = tmp_path / "work"
+    service.sync_repo(upstream.as_uri(), work, "main", depth=1)
+    assert service.sync_repo(upstream.as_uri(), work, "main", depth=None) is not None
+    assert not service.is_shallow(work)
+    assert commits(work) == commits(upstream)
+
+
+def test_full_history_is_never_truncated(tmp_path, upstream, service):
+    work = tmp_path / "work"
+    service.sync_repo(upstream.as_uri(), work, "main", depth=None)
+    commit(upstream, "four")
+    service.sync_repo(upstream.as_uri(), work, "main", depth=1)
+    assert not service.is_shallow(work)
+    assert commits(work) == commits(upstream) == 4
+
+
+def test_missing_base_commit_is_fetched_by_sha(tmp_path, upstream, service):
+    from services.incremental import IncrementalPlanner
+
+    base = git("rev-parse", "HEAD", cwd=upstream)
+    commit(upstream, "changed", name="README.md")
+    work = tmp_path / "work"
+    service.sync_repo(upstream.as_uri(), work, "main", depth=1)
+    planner = IncrementalPlanner(service)
+    # Without a URL there is nothing to fetch the base from
+    assert planner.changed_files(work, base) is None
+    assert planner.changed_files(work, base, repo_url=upstream.as_uri()) == ["README.md"]
+    assert service.is_shallow(work)
@@ -0,0 +1,89 @@
+import subprocess
+
+import pytest
+
+from services.incremental import IncrementalPlanner
+
+
+class FakeGit:
+    """Answers git diff with a fixed file list; fails until fetch_commit is called if missing"""
+
+    git_cmd = "git"
+
+    def __init__(self, changed, missing=False):
+        self.changed = changed
+        self.missing = missing
+        self.fetched = []
+
+    def _run_git_command(self, args, cwd=None, timeout=None):
+        if self.missing:
+            return subprocess.CompletedProcess(args, 128, "", "fatal: bad revision\n")
+        return subprocess.CompletedProcess(args, 0, "".join(f"{p}\n" for p in self.changed), "")
+
+    def fetch_commit(self, repo_url, repo_dir, commit):
+        self.fetched.append(commit)
+        self.missing = False
+        return True
+
+
+@pytest.fixture
+def reactor(tmp_path):
+    """Root aggregator with modules api, core and core/impl"""
+    def write(rel, artifact, modules=()):
+        path = tmp_path / rel / "pom.xml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        mods = "".join(f"<module>{m}</module>" for m in modules)
+        path.write_text(f"<project><groupId>g</groupId><artifactId>{artifact}</artifactId>"
+                        f"<modules>{mods}</modules></project>")
+    write(".", "root", ["api", "core"])
+    write("api", "api")
+    write("core", "core", ["impl"])
+    write("core/impl", "impl")
+    return tmp_path
+
+
+def plan(repo, changed, **kwargs):
+    return IncrementalPlanner(FakeGit(changed)).plan(repo, "0123456789abcdef", **kwargs)
+
+
+def test_no_previous_build_means_full(reactor):
+    assert IncrementalPlanner(FakeGit([])).plan(reactor, None).mode == "full"
+
+
+def test_changes_map_to_the_deepest_owning_module(reactor):
+    result = plan(reactor, ["api/src/main/java/A.java", "core/impl/src/main/java/B.java"])
+    assert result.mode == "modules"
+    assert result.modules == ["api", "core/impl"]
+
+
+def test_root_level_change_forces_a_full_build(reactor):
+    assert plan(reactor, ["pom.xml", "api/pom.xml"]).mode == "full"
+
+
+def test_docs_and_skipped_tests_are_not_build_relevant(reactor):
+    changed = ["README.md", "api/docs/guide.adoc", "core/src/test/java/T.java"]
+    assert plan(reactor, changed).mode == "skip"
+    # Without skipping tests the test source counts
+    assert plan(reactor, changed, skip_tests=False).modules == ["core"]
+
+
+def test_resources_under_src_main_are_always_relevant(reactor):
+    assert plan(reactor, ["api/src/main/resources/notes.txt"]).modules == ["api"]
+
+
+def test_changes_outside_the_sparse_cone_are_ignored(reactor):
+    result = plan(reactor, ["api/src/main/java/A.java", "core/src/main/java/C.java"], cone=["core"])
+    assert result.modules == ["core"]
+
+
+def test_missing_base_commit_is_fetched_by_sha(reactor):
+    git = FakeGit(["api/pom.xml"], missing=True)
+    result = IncrementalPlanner(git).plan(reactor, "0123456789abcdef", repo_url="https://example/repo.git")
+    assert git.fetched == ["0123456789abcdef"]
+    assert result.modules == ["api"]
+
+
+def test_undiffable_history_falls_back_to_full(reactor):
+    result = IncrementalPlanner(FakeGit([], missing=True)).plan(reactor, "0123456789abcdef")
+    assert result.mode == "full"
+    assert "history missing" in result.reason
@@ -0,0 +1,78 @@
+import threading
+
+from services.journal_store import JournalStore
+
+
+def reopen(store: JournalStore) -> JournalStore:
+    store.close()
+    return JournalStore(str(store.path), compact_min_records=10_000)
+
+
+def test_replay_restores_puts_updates_and_deletes(tmp_path):
+    store = JournalStore(str(tmp_path / "j.journal"))
+    store.put("a", {"n": 1})
+    store.put("b", [1, 2])
+    store.update("a", lambda v: {"n": v["n"] + 1})
+    store.delete("b")
+    store.update("c", lambda v: None)  # nothing to delete, nothing written
+
+    store = reopen(store)
+    assert store.get("a") == {"n": 2}
+    assert store.get("b") is None
+    assert store.stats()["records"] == 4
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    store = JournalStore(str(tmp_path / "j.journal"))
+    store.put("kept", 1)
+    store.close()
+    with open(store.path, "ab") as f:
+        f.write(b'deadbeef ["put","torn",')
+    store = JournalStore(str(store.path))
+    assert store.get("kept") == 1 and store.get("torn") is None
+    store.put("after", 2)
+    assert reopen(store).get("after") == 2
+
+
+def test_corrupt_record_stops_replay(tmp_path):
+    store = JournalStore(str(tmp_path / "j.journal"))
+    store.put("first", 1)
+    store.put("second", 2)
+    store.close()
+    lines = store.path.read_bytes().splitlines(keepends=True)
+    store.path.write_bytes(lines[0] + lines[1].replace(b"2]", b"3]"))
+    store = JournalStore(str(store.path))
+    assert store.items() == [("first", 1)]
+
+
+def test_compaction_keeps_one_record_per_live_key(tmp_path):
+    store = JournalStore(str(tmp_path / "j.journal"), compact_min_records=10_000)
+    for i in range(50):
+        store.put(f"k/{i % 5}", i)
+    store.put("gone", 0)
+    store.delete("gone")
+    store.compact()
+    assert store.stats()["records"] == 5
+    assert store.stats()["compactions"] == 1
+
+    store.put("k/0", "new")
+    store = reopen(store)
+    assert dict(store.items("k/")) == {"k/0": "new", "k/1": 46, "k/2": 47, "k/3": 48, "k/4": 49}
+
+
+def test_background_compaction_under_concurrent_writes(tmp_path):
+    store = JournalStore(str(tmp_path / "j.journal"), compact_min_records=20)
+
+    def writer(n):
+        for i in range(200):
+            store.update(f"count/{n}", lambda v: (v or 0) + 1)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.compact()
+    assert store.stats()["compactions"] >= 1
+    store = reopen(store)
+    assert dict(store.items("count/")) == {f"count/{n}": 200 for n in range(4)}
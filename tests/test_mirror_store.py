@@ -0,0 +1,74 @@
+import subprocess
+
+import pytest
+
+from services.git_service import GitService
+from services.mirror_store import MirrorStore, branch_slug
+
+
+def test_branch_slug_is_directory_safe_and_stable():
+    slug = branch_slug("feature/JIRA-12 fix:colon")
+    assert "/" not in slug and ":" not in slug and " " not in slug
+    assert slug.startswith("feature-JIRA-12-fix-colon-")
+    assert branch_slug("feature/JIRA-12 fix:colon") == slug
+
+
+def test_branch_slug_separates_names_with_the_same_readable_form():
+    names = ["feature/x", "feature-x", "feature_x/", "feature//x"]
+    assert len({branch_slug(n) for n in names}) == len(names)
+
+
+def test_branch_slug_of_unusable_names():
+    assert branch_slug("///").startswith("HEAD-")
+
+
+def git(*args, cwd=None):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                   check=True, capture_output=True)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    git("init", "-q", "-b", "main", str(repo))
+    (repo / "pom.xml").write_text("<project/>")
+    git("add", ".", cwd=repo)
+    git("commit", "-q", "-m", "one", cwd=repo)
+    git("checkout", "-q", "-b", "feature/x", cwd=repo)
+    (repo / "feature.txt").write_text("x")
+    git("add", ".", cwd=repo)
+    git("commit", "-q", "-m", "two", cwd=repo)
+    git("checkout", "-q", "main", cwd=repo)
+    return repo
+
+
+def head(path):
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True).stdout.strip()
+
+
+def test_branches_share_one_mirror_and_get_their_own_worktrees(tmp_path, upstream):
+    service = GitService()
+    service.set_log_callback(lambda _: None)
+    store = MirrorStore(service, tmp_path / "mirrors")
+    url = upstream.as_uri()
+
+    main = tmp_path / "work" / f"svc@{branch_slug('main')}"
+    feature = tmp_path / "work" / f"svc@{branch_slug('feature/x')}"
+    assert store.sync(url, "main", main) == head(upstream)
+    assert store.sync(url, "feature/x", feature) is not None
+    assert (feature / "feature.txt").exists() and not (main / "feature.txt").exists()
+    assert [p.name for p in (tmp_path / "mirrors").iterdir()] == [store.mirror_path(url).name]
+
+    # A new upstream commit reaches the existing worktree, local edits are discarded
+    (upstream / "pom.xml").write_text("<project><!-- two --></project>")
+    git("commit", "-q", "-am", "three", cwd=upstream)
+    (main / "pom.xml").write_text("local edit")
+    assert store.sync(url, "main", main) == head(upstream)
+    assert "two" in (main / "pom.xml").read_text()
+
+
+def test_unknown_branch_fails_cleanly(tmp_path, upstream):
+    service = GitService()
+    service.set_log_callback(lambda _: None)
+    store = MirrorStore(service, tmp_path / "mirrors")
+    assert store.sync(upstream.as_uri(), "missing", tmp_path / "work" / "svc") is None
@@ -0,0 +1,177 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from services.dependency_graph import DependencyGraph, PomInfo
+from services.pipeline import BuildPipeline
+
+
+@dataclass
+class Config:
+    service_name: str
+
+
+@dataclass
+class Context:
+    config: Config
+    result: Dict
+    start_time: float = field(default_factory=time.time)
+    repo_dir: Optional[str] = None
+    done: bool = False
+    cancelled: bool = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeBuilder:
+    """Runs the stages instantly, failing the build of the services in fail"""
+
+    def __init__(self, fail=(), slow=(), slow_sync=()):
+        self.fail = set(fail)
+        self.slow = set(slow)
+        self.slow_sync = set(slow_sync)
+        self.built: List[str] = []
+        self.events: List[str] = []
+        self.locked = set()
+        self.lock = threading.Lock()
+
+    def new_context(self, config, force=False, tracer=None):
+        return Context(config, {"service": config.service_name, "status": "pending"})
+
+    def try_lock_repo(self, ctx):
+        with self.lock:
+            if ctx.config.service_name in self.locked:
+                return False
+            self.locked.add(ctx.config.service_name)
+            return True
+
+    def unlock_repo(self, ctx):
+        with self.lock:
+            self.locked.discard(ctx.config.service_name)
+
+    def run_stage(self, stage, ctx):
+        name = ctx.config.service_name
+        if stage == "sync":
+            if name in self.slow_sync:
+                time.sleep(0.3)
+            with self.lock:
+                self.events.append(f"synced {name}")
+        elif stage == "build":
+            with self.lock:
+                self.built.append(name)
+                self.events.append(f"built {name}")
+            while name in self.slow and not ctx.cancelled:
+                time.sleep(0.01)
+            if ctx.cancelled:
+                ctx.result["status"] = "cancelled"
+                ctx.done = True
+            elif name in self.fail:
+                ctx.result["status"] = "failed"
+                ctx.done = True
+        elif stage == "record":
+            ctx.result["status"] = "success"
+            ctx.done = True
+        return ctx
+
+
+def graph_of(deps: Dict[str, List[str]]) -> DependencyGraph:
+    graph = DependencyGraph()
+    for name, upstream in deps.items():
+        graph.add_service(name, [PomInfo("g", name, dependencies=[("g", u) for u in upstream])])
+    graph.link()
+    return graph
+
+
+def run(deps, builder, build_workers=1, weights=None, **kwargs):
+    pipeline = BuildPipeline(builder, graph_of(deps), {"sync": 2, "check": 2, "build": build_workers},
+                             log=lambda _: None, weights=weights)
+    results = pipeline.run([Config(n) for n in deps], **kwargs)
+    return {r["service"]: r["status"] for r in results}
+
+
+def test_services_build_after_their_upstreams():
+    builder = FakeBuilder()
+    statuses = run({"app": ["lib"], "lib": ["core"], "core": []}, builder, build_workers=3)
+    assert statuses == {"core": "success", "lib": "success", "app": "success"}
+    assert builder.built == ["core", "lib", "app"]
+    assert builder.locked == set()
+
+
+def test_failed_upstream_blocks_its_dependents_only():
+    builder = FakeBuilder(fail={"core"})
+    statuses = run({"core": [], "app": ["core"], "other": []}, builder)
+    assert statuses == {"core": "failed", "app": "blocked", "other": "success"}
+    assert "app" not in builder.built
+
+
+def test_longest_remaining_chain_builds_first():
+    deps = {"quick": [], "base": [], "top": ["base"]}
+    builder = FakeBuilder()
+    run(deps, builder, weights={"quick": 5, "base": 2, "top": 10})
+    assert builder.built[0] == "base"
+    builder = FakeBuilder()
+    run(deps, builder, weights={"quick": 20, "base": 2, "top": 10})
+    assert builder.built[0] == "quick"
+
+
+def unknown_graph(known: Dict[str, List], unknown: List[str]) -> DependencyGraph:
+    """known: service → consumed coordinates; unknown services have no poms yet"""
+    graph = DependencyGraph()
+    for name, consumed in known.items():
+        graph.add_service(name, [PomInfo("g", name, dependencies=list(consumed))])
+    for name in unknown:
+        graph.add_service(name, [])
+    graph.link()
+    return graph
+
+
+def test_only_builds_that_may_need_an_unknown_service_wait_for_its_sync():
+    builder = FakeBuilder(slow_sync={"new"})
+    graph = unknown_graph({"plain": [], "external": [("org.other", "lib")]}, ["new"])
+    pipeline = BuildPipeline(builder, graph, {"sync": 3, "check": 2, "build": 2}, log=lambda _: None)
+    pipeline.run([Config("new"), Config("plain"), Config("external")])
+    # plain consumes nothing new could produce; external might consume new's artifacts
+    assert builder.events.index("built plain") < builder.events.index("synced new")
+    assert builder.events.index("built external") > builder.events.index("synced new")
+
+
+def test_a_service_locked_by_another_job_does_not_stall_the_batch():
+    builder = FakeBuilder()
+    builder.locked.add("busy")  # another job is building this repo
+    graph = unknown_graph({"app": [("org.other", "lib")]}, ["busy"])
+    threading.Timer(0.3, builder.locked.discard, args=("busy",)).start()
+    pipeline = BuildPipeline(builder, graph, {"sync": 2, "check": 2, "build": 2}, log=lambda _: None)
+    statuses = {r["service"]: r["status"] for r in pipeline.run([Config("busy"), Config("app")])}
+    assert statuses == {"busy": "success", "app": "success"}
+    assert builder.built == ["app", "busy"]
+
+
+def test_build_stage_sees_the_results_of_its_upstreams():
+    builder = FakeBuilder()
+    seen = {}
+    run_stage = builder.run_stage
+
+    def record_upstream(stage, ctx):
+        if stage == "build":
+            seen[ctx.config.service_name] = dict(getattr(ctx, "upstream", {}))
+        return run_stage(stage, ctx)
+    builder.run_stage = record_upstream
+
+    graph = graph_of({"app": ["lib", "base"], "lib": [], "base": []})
+    pipeline = BuildPipeline(builder, graph, {"sync": 2, "check": 2, "build": 2}, log=lambda _: None)
+    preflight = {"base": {"service": "base", "status": "skipped", "artifact_key": "base-key"}}
+    pipeline.run([Config("app"), Config("lib")], settled=preflight)
+    assert seen["lib"] == {}
+    assert seen["app"]["base"] == preflight["base"]
+    assert seen["app"]["lib"]["status"] == "success"
+
+
+def test_cancel_reports_the_rest_as_cancelled():
+    builder = FakeBuilder(slow={"core"})
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    statuses = run({"core": [], "app": ["core"]}, builder, cancel_event=cancel)
+    assert statuses == {"core": "cancelled", "app": "cancelled"}
+    assert builder.locked == set()
@@ -0,0 +1,69 @@
+import subprocess
+
+import pytest
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, message):
+    (repo / "pom.xml").write_text(f"<project><groupId>g</groupId><artifactId>svc</artifactId>"
+                                  f"<version>1</version><!-- {message} --></project>")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", message, cwd=repo)
+    return git("rev-parse", "HEAD", cwd=repo)
+
+
+@pytest.fixture
+def built(tmp_path, builder):
+    """A service synced and recorded as built, as the record stage leaves it"""
+    from app.services.builder import BuildConfig
+
+    upstream = tmp_path / "upstream"
+    git("init", "-q", "-b", "main", str(upstream))
+    sha = commit(upstream, "one")
+    config = BuildConfig("svc", "g", upstream.as_uri(), "main", "", [], "", fast_sync=True, preflight=True)
+    repo_dir = builder._repo_dir(config)
+    assert builder.git_service.sync_repo(config.repo_url, repo_dir, "main") == sha
+    (repo_dir / "target").mkdir()
+
+    ctx = builder.new_context(config)
+    ctx.repo_dir = repo_dir
+    ctx.result["commit"] = sha
+    ctx.cache_key = builder.cache_key(ctx)
+    builder.build_cache.mark_built("svc", str(repo_dir), "main", key=ctx.cache_key, commit=sha,
+                                   copy=builder._working_copy(config))
+    return builder, config, upstream
+
+
+def test_remote_head_equal_to_the_built_commit_is_skipped(built):
+    builder, config, _ = built
+    skipped = builder.preflight([config])
+    assert skipped["svc"]["status"] == "skipped"
+    assert skipped["svc"]["build_mode"] == "preflight"
+
+
+def test_new_remote_commit_goes_through_the_pipeline(built):
+    builder, config, upstream = built
+    commit(upstream, "two")
+    assert builder.preflight([config]) == {}
+
+
+def test_missing_build_outputs_go_through_the_pipeline(built):
+    builder, config, _ = built
+    (builder._repo_dir(config) / "target").rmdir()
+    assert builder.preflight([config]) == {}
+
+
+def test_local_changes_go_through_the_pipeline(built):
+    builder, config, _ = built
+    (builder._repo_dir(config) / "pom.xml").write_text("<project>edited</project>")
+    assert builder.preflight([config]) == {}
+
+
+def test_unreachable_remote_goes_through_the_pipeline(built, tmp_path):
+    builder, config, _ = built
+    config.repo_url = (tmp_path / "gone").as_uri()
+    assert builder.preflight([config]) == {}
@@ -0,0 +1,136 @@
+import subprocess
+
+import pytest
+
+from services.dependency_graph import reactor_from_files
+from services.git_service import GitService
+from services.incremental import IncrementalPlanner
+from services.sparse import PARENTS_DIR, REACTOR_FILE, SparseCheckout, in_checkout, plan_sparse, write_reactor
+
+
+def pom(artifact, parent=None, modules=(), deps=()):
+    parent_xml = f"<parent><groupId>g</groupId><artifactId>{parent}</artifactId><version>1</version></parent>" \
+        if parent else ""
+    modules_xml = "".join(f"<module>{m}</module>" for m in modules)
+    deps_xml = "".join(f"<dependency><groupId>g</groupId><artifactId>{d}</artifactId></dependency>" for d in deps)
+    return (f"<project>{parent_xml}<groupId>g</groupId><artifactId>{artifact}</artifactId><version>1</version>"
+            f"<modules>{modules_xml}</modules><dependencies>{deps_xml}</dependencies></project>")
+
+
+def monorepo(orders_deps=("core",)):
+    """Root and two aggregators; orders sits under services but needs platform/core"""
+    return {
+        "": pom("root", modules=["platform", "services"]),
+        "platform": pom("platform", "root", ["core", "util"]),
+        "platform/core": pom("core", "platform"),
+        "platform/util": pom("util", "platform"),
+        "services": pom("services", "root", ["orders", "billing"]),
+        "services/orders": pom("orders", "services", deps=orders_deps),
+        "services/billing": pom("billing", "services", deps=["util"]),
+    }
+
+
+def test_plan_follows_dependencies_and_keeps_aggregator_parents_out_of_the_reactor():
+    plan = plan_sparse(reactor_from_files(monorepo()), ["orders"])
+    assert plan.modules == ["platform/core", "services/orders"]
+    # core's parent is an aggregator outside the cone: only its pom is needed
+    assert plan.parents == ["", "platform", "services"]
+    assert plan.cone == ["platform/core", "services/orders"]
+    assert in_checkout("platform/pom.xml", plan.cone)
+    assert not in_checkout("platform/util/pom.xml", plan.cone)
+
+
+def test_plan_by_path_and_unknown_targets():
+    assert plan_sparse(reactor_from_files(monorepo()), ["platform/util"]).modules == ["platform/util"]
+    with pytest.raises(ValueError):
+        plan_sparse(reactor_from_files(monorepo()), ["missing"])
+
+
+def test_plan_needing_the_root_reactor_checks_out_everything():
+    plan = plan_sparse(reactor_from_files(monorepo()), ["root"])
+    assert plan.modules == [""] and plan.cone == []
+
+
+def test_reactor_lists_members_and_stripped_parent_copies(tmp_path):
+    texts = monorepo()
+    plan = plan_sparse(reactor_from_files(texts), ["orders"])
+    assert write_reactor(tmp_path, plan, texts, "my repo") == REACTOR_FILE
+
+    reactor = (tmp_path / REACTOR_FILE).read_text()
+    modules = reactor.split("<modules>")[1].split("</modules>")[0].split()
+    assert modules == ["<module>platform/core</module>", "<module>services/orders</module>",
+                       f"<module>{PARENTS_DIR}</module>", f"<module>{PARENTS_DIR}/platform</module>",
+                       f"<module>{PARENTS_DIR}/services</module>"]
+    assert "<artifactId>my-repo-sparse-reactor</artifactId>" in reactor
+    copy = (tmp_path / PARENTS_DIR / "platform" / "pom.xml").read_text()
+    assert "<module>" not in copy and "<artifactId>platform</artifactId>" in copy
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, texts, message):
+    for path, text in texts.items():
+        module = repo / path
+        (module / "src" / "main" / "java").mkdir(parents=True, exist_ok=True)
+        (module / "pom.xml").write_text(text)
+        (module / "src" / "main" / "java" / "Main.java").write_text(f"// {message}\n")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", message, cwd=repo)
+    return git("rev-parse", "HEAD", cwd=repo)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    git("init", "-q", "-b", "main", str(repo))
+    # What a hosting server allows: blob-less clones and fetching blobs by id
+    git("config", "uploadpack.allowFilter", "true", cwd=repo)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=repo)
+    commit(repo, monorepo(), "one")
+    return repo
+
+
+def test_sparse_sync_and_a_resync_that_changes_the_module_set(tmp_path, upstream):
+    service = GitService()
+    service.set_log_callback(lambda _: None)
+    sparse = SparseCheckout(service)
+    work = tmp_path / "work"
+
+    first = sparse.sync(upstream.as_uri(), work, "main", ["orders"])
+    assert first is not None and first.cone == ["platform/core", "services/orders"]
+    assert "partialclone" in (work / ".git" / "config").read_text()
+    assert (work / "services" / "orders" / "src").is_dir()
+    assert not (work / "platform" / "util" / "src").exists()
+    assert not (work / "services" / "billing").exists()
+    assert (work / REACTOR_FILE).is_file()
+
+    # orders now needs util as well; billing changes outside the cone
+    texts = monorepo(orders_deps=("core", "util"))
+    head = commit(upstream, {m: texts[m] for m in ("services/orders", "services/billing")}, "two")
+    second = sparse.sync(upstream.as_uri(), work, "main", ["orders"])
+    assert second.commit == head
+    assert second.modules == ["platform/core", "platform/util", "services/orders"]
+    assert second.cone == ["platform/core", "platform/util", "services/orders"]
+    assert (work / "platform" / "util" / "src").is_dir()
+    assert "<module>platform/util</module>" in (work / REACTOR_FILE).read_text()
+
+    # Incremental builds ignore the billing change: it can't affect what is checked out
+    plan = IncrementalPlanner(service).plan(work, first.commit, repo_url=upstream.as_uri(), cone=second.cone)
+    assert plan.mode == "modules"
+    assert plan.modules == ["services/orders"]
+    assert not any(path.startswith("services/billing/") for path in plan.changed_files)
+
+
+def test_unchanged_poms_reuse_the_stored_plan(tmp_path, upstream):
+    service = GitService()
+    service.set_log_callback(lambda _: None)
+    sparse = SparseCheckout(service)
+    work = tmp_path / "work"
+    sparse.sync(upstream.as_uri(), work, "main", ["orders"])
+    reads = []
+    sparse._read_blobs = lambda *args: reads.append(args)
+    assert sparse.sync(upstream.as_uri(), work, "main", ["orders"]).cone == ["platform/core", "services/orders"]
+    assert reads == []
@@ -0,0 +1,83 @@
+import pytest
+
+from services.workspace_manager import WorkspaceManager, dir_size
+
+
+class FakeCache:
+    def __init__(self):
+        self.forgotten = []
+
+    def forget_copy(self, service, copy=None):
+        self.forgotten.append((service, copy))
+
+
+def make_copy(workspace, rel, size=1000):
+    path = workspace / rel
+    path.mkdir(parents=True)
+    (path / "data.bin").write_bytes(b"x" * size)
+    return path
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "workspace"
+    copies = [make_copy(root, name) for name in ("g/old@main", "g/middle", "g/recent")]
+    manager = WorkspaceManager(root, str(tmp_path / "usage.journal"), FakeCache(),
+                               log=lambda _: None, min_free_gb=0)
+    for path in copies:
+        manager.touch(path)
+    manager.free_bytes = lambda: 10 ** 12
+    return manager, copies
+
+
+def present(manager):
+    return sorted(p.name for p in manager.workspace_dir.joinpath("g").iterdir())
+
+
+def test_dir_size_counts_target_only_next_to_a_pom(tmp_path):
+    (tmp_path / "target").mkdir()
+    (tmp_path / "target" / "a.jar").write_bytes(b"x" * 10)
+    (tmp_path / "pom.xml").write_bytes(b"x" * 5)
+    (tmp_path / "src" / "target").mkdir(parents=True)
+    (tmp_path / "src" / "target" / "A.java").write_bytes(b"x" * 3)
+    assert dir_size(tmp_path) == (18, 10)
+
+
+def test_quota_evicts_least_recently_built_first(workspace):
+    manager, _ = workspace
+    manager.quota_bytes = 2500
+    assert manager.ensure_space(()) is None
+    assert present(manager) == ["middle", "recent"]
+    assert manager.build_cache.forgotten == [("old", "main")]
+    assert manager.usage()["total_bytes"] == 2000
+
+
+def test_copies_of_the_batch_are_kept(workspace):
+    manager, copies = workspace
+    manager.quota_bytes = 1500
+    assert manager.ensure_space([copies[0]]) is None
+    assert present(manager) == ["old@main"]
+
+
+def test_free_space_floor_evicts_until_enough_is_free(workspace):
+    manager, _ = workspace
+    manager.free_bytes = lambda: 500 + 1000 * (3 - len(present(manager)))
+    manager.min_free_bytes = 1000
+    assert manager.ensure_space((), expected_bytes=1000) is None
+    assert present(manager) == ["recent"]
+
+
+def test_unreachable_floor_keeps_everything(workspace):
+    manager, _ = workspace
+    manager.free_bytes = lambda: 500
+    manager.min_free_bytes = 10 ** 9
+    assert "Not enough disk space" in manager.ensure_space(())
+    assert present(manager) == ["middle", "old@main", "recent"]
+    assert manager.evictions == 0
+
+
+def test_evicted_copies_count_towards_expected_growth(workspace):
+    manager, copies = workspace
+    manager.quota_bytes = 2500
+    manager.ensure_space(())
+    assert manager.expected_growth(copies) == 1000